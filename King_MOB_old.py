@@ -9,7 +9,8 @@ import pdb
 import random
 import sys
 ROOT = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
-sys.path.append(ROOT)
+if ROOT not in sys.path: # players are imported once, but avoid growing sys.path if reloaded
+    sys.path.append(ROOT)
 import utils
 import math
 import copy
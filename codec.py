@@ -0,0 +1,91 @@
+# codec.py
+# Canonical packed encoding of "Hand of the King" game states.
+#
+# A state (board, rows, cols, turn, cards, banners) is packed into WIDTH bytes, or
+# equivalently one Python int, so it can be stored, compared, hashed, and sent between
+# processes without pickling lists. The encoding is reversible and canonical (equal
+# states always have equal keys), and it is fixed-width and big-endian, so the order of
+# the byte strings is the order of the ints: sorted files of keys can be binary-searched
+# with plain byte comparisons.
+#
+# Layout (most significant byte first):
+#   byte  0      rows (high nibble), cols (low nibble)
+#   byte  1      number of color sets (bits 1-3), turn (bit 0)
+#   bytes 2-19   board, 4 bits per square (the 1-card is the square holding 1),
+#                first square in the high nibble, padded with empty squares to SQUARES
+#   bytes 20-26  cards: player 1's count of each color set (high nibble) and player 2's
+#                (low nibble), padded to SETS sets
+#   bytes 27-28  banner owner of each set, 2 bits each (0 nobody, 1 player 1, 2 player 2),
+#                first set in the highest bits
+
+SQUARES = 36 # the largest (8-color, 6x6) board
+SETS = 7 # color sets of the largest board
+WIDTH = 2 + SQUARES // 2 + SETS + 2
+
+_NIBBLES = [(byte >> 4, byte & 0xF) for byte in range(256)] # unpacked squares for every packed byte
+
+def pack_bytes(board, rows, cols, turn, cards=[], banners=[]):
+    """Pack a game state into WIDTH bytes.
+
+    Parameters
+    ----------
+    board : sequence of ints
+        A flattened version of the board.
+    rows : int
+        Number of rows on the board.
+    cols : int
+        Number of columns on the board.
+    turn : int {0, 1}
+        Whose turn is it?
+    cards : sequence of sequences of ints, optional (default=[])
+        How many cards does each player own? The syntax cards[i][j] = k
+        indicates that the ith player owns k cards of the jth color set.
+    banners : sequence of sequences of ints, optional (default=[])
+        Which banners does each player own? The syntax banners[i][j] = 1
+        indicates that the ith player owns the banner of the jth color set.
+
+    Returns
+    -------
+    key : bytes
+        The packed state (see the layout at the top of this file).
+    """
+    sets = len(cards[0]) if cards else 0
+    board = tuple(board) + (0,) * (SQUARES - len(board))
+    packed = bytes([(a << 4) | b for a, b in zip(board[0::2], board[1::2])])
+    counts = bytes([(a << 4) | b for a, b in zip(cards[0], cards[1])]) + bytes(SETS - sets) if cards else bytes(SETS)
+    owners = 0
+    for j in range(len(banners[0]) if banners else 0):
+        owners |= (banners[0][j] | (banners[1][j] << 1)) << (2 * (SETS - 1 - j))
+    return bytes(((rows << 4) | cols, (sets << 1) | turn)) + packed + counts + owners.to_bytes(2, 'big')
+
+def pack(board, rows, cols, turn, cards=[], banners=[]):
+    """Pack a game state into one int (see pack_bytes); ints order like their byte strings."""
+    return int.from_bytes(pack_bytes(board, rows, cols, turn, cards, banners), 'big')
+
+def unpack(key):
+    """Unpack a state packed by pack or pack_bytes.
+
+    Parameters
+    ----------
+    key : bytes or int
+        The packed state.
+
+    Returns
+    -------
+    state : tuple
+        The game state as (board, rows, cols, turn, cards, banners), using the same
+        list-based representation as the rest of the game.
+    """
+    if isinstance(key, int):
+        key = key.to_bytes(WIDTH, 'big')
+    rows, cols = _NIBBLES[key[0]]
+    sets, turn = key[1] >> 1, key[1] & 1
+    board = [square for byte in key[2:2 + (rows * cols + 1) // 2] for square in _NIBBLES[byte]]
+    del board[rows * cols:]
+    if sets == 0:
+        return board, rows, cols, turn, [], []
+    counts = key[2 + SQUARES // 2:2 + SQUARES // 2 + sets]
+    cards = [[byte >> 4 for byte in counts], [byte & 0xF for byte in counts]]
+    owners = int.from_bytes(key[-2:], 'big')
+    banners = [[(owners >> (2 * (SETS - 1 - j) + i)) & 1 for j in range(sets)] for i in range(2)]
+    return board, rows, cols, turn, cards, banners
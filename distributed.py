@@ -0,0 +1,248 @@
+# distributed.py
+# Coordinator/worker execution of "Hand of the King" tournaments across machines.
+#
+# The coordinator owns the schedule and the results. Workers (on the same machine or on
+# other hosts) connect to it over TCP, lease small batches of scheduled games, play them,
+# and submit the final banners. A lease that is not renewed in time (because the worker
+# crashed or lost its connection) expires, and its games are handed to another worker.
+#
+# Security: managers exchange pickles, and unpickling runs arbitrary code, so anyone who
+# knows the authkey can run code on the coordinator and its workers. The coordinator
+# listens on the loopback interface unless told otherwise, and any other address requires
+# an explicit authkey (the built-in one is only accepted on the loopback interface).
+
+from collections import deque
+import ipaddress
+from multiprocessing.managers import BaseManager
+import os
+import queue
+import socket
+import threading
+import time
+
+DEFAULT_HOST = '127.0.0.1'
+LOCAL_AUTHKEY = 'hotk' # only for coordinators and workers on the loopback interface
+
+class Coordinator:
+    """Thread-safe queue of scheduled games with leases, shared with remote workers.
+
+    Parameters
+    ----------
+    lease_time : float, optional (default=120)
+        Seconds a worker may hold a game without renewing its lease (see heartbeat).
+    timeout : float, optional (default=600)
+        Seconds run waits without hearing from any worker before giving up.
+    """
+    def __init__(self, lease_time=120, timeout=600):
+        self.lease_time = lease_time
+        self.timeout = timeout
+        self.last_contact = time.time() # of any worker (or of the start, before the first one connects)
+        self.lock = threading.Lock()
+        self.todo = deque() # games waiting for a worker
+        self.leases = {} # game index -> [worker, deadline, spec]
+        self.results = queue.Queue() # (spec, banners, moves) of finished games
+        self.closed = False
+
+    def add(self, specs):
+        """Queue scheduled games for the workers."""
+        with self.lock:
+            self.todo.extend(specs)
+
+    def lease(self, worker, n):
+        """Hand out up to n games to a worker.
+
+        Parameters
+        ----------
+        worker : str
+            Unique name of the worker (e.g. host:pid).
+        n : int
+            Maximum number of games to lease.
+
+        Returns
+        -------
+        specs : list of dicts
+            Scheduled games; empty if there is nothing to do right now.
+        """
+        with self.lock:
+            self.last_contact = time.time()
+            self._expire()
+            specs = []
+            deadline = time.time() + self.lease_time
+            while self.todo and len(specs) < n:
+                spec = self.todo.popleft()
+                self.leases[spec['game']] = [worker, deadline, spec]
+                specs.append(spec)
+            return specs
+
+    def heartbeat(self, worker):
+        """Renew all leases held by a worker."""
+        with self.lock:
+            self.last_contact = time.time()
+            deadline = self.last_contact + self.lease_time
+            for lease in self.leases.values():
+                if lease[0] == worker:
+                    lease[1] = deadline
+
+    def submit(self, worker, game, banners, moves):
+        """Report the final banners and moves of a leased game. Duplicate reports are ignored."""
+        with self.lock:
+            self.last_contact = time.time()
+            if game in self.leases:
+                spec = self.leases.pop(game)[2]
+            else: # the lease expired, but the game may not have been handed out again yet
+                spec = next((spec for spec in self.todo if spec['game'] == game), None)
+                if spec is None:
+                    return
+                self.todo.remove(spec)
+            self.results.put((spec, banners, moves))
+
+    def is_closed(self):
+        """Has the tournament finished (so workers should exit)?"""
+        return self.closed
+
+    def close(self):
+        """Tell the workers that there will be no more games."""
+        self.closed = True
+
+    def run(self, specs, poll=1):
+        """Play games on the workers, yielding (spec, banners, moves) as each one finishes.
+
+        Raises TimeoutError if no worker has leased, renewed or submitted a game for
+        timeout seconds (e.g. none ever connected, or all of them died).
+        """
+        self.add(specs)
+        for _ in range(len(specs)):
+            while True:
+                try:
+                    yield self.results.get(timeout=poll)
+                    break
+                except queue.Empty:
+                    with self.lock:
+                        silence = time.time() - self.last_contact
+                    if silence > self.timeout:
+                        raise TimeoutError(f"no worker has contacted the coordinator for {silence:.0f} seconds")
+
+    def _expire(self):
+        """Re-queue the games of leases that were not renewed in time (lock must be held)."""
+        now = time.time()
+        for game, (worker, deadline, spec) in list(self.leases.items()):
+            if deadline < now:
+                print(f"\tWARNING: worker {worker} did not finish game {game} in time; re-queueing it")
+                del self.leases[game]
+                self.todo.appendleft(spec)
+
+class CoordinatorManager(BaseManager):
+    """Manager that exposes a Coordinator to remote workers."""
+    pass
+
+def parse_address(address):
+    """Convert a 'host:port' (or 'port', on the loopback interface) string into a (host, port) tuple."""
+    host, _, port = address.rpartition(':')
+    return host or DEFAULT_HOST, int(port)
+
+def is_local(address):
+    """Is the host of a 'host:port' address on the loopback interface?"""
+    host = parse_address(address)[0]
+    try:
+        return ipaddress.ip_address(socket.gethostbyname(host)).is_loopback
+    except (OSError, ValueError):
+        return False
+
+def check_authkey(address, authkey):
+    """Return the authkey to use at an address (as bytes); None is only allowed on the loopback interface."""
+    if authkey is None:
+        if not is_local(address):
+            raise ValueError(f"an explicit authkey is required to use {address}, which is not on the loopback interface")
+        authkey = LOCAL_AUTHKEY
+    return authkey.encode()
+
+def serve(address, authkey=None, lease_time=120, timeout=600):
+    """Start a coordinator that listens for workers in a background thread.
+
+    Parameters
+    ----------
+    address : str
+        'host:port' to listen on (use 0.0.0.0 to accept workers from other machines), or
+        'port' to listen on the loopback interface only.
+    authkey : str, optional (default=None)
+        Shared secret that workers must present to connect; required unless the address
+        is on the loopback interface.
+    lease_time : float, optional (default=120)
+        Seconds a worker may hold a game without renewing its lease.
+    timeout : float, optional (default=600)
+        Seconds to wait without hearing from any worker before giving up.
+
+    Returns
+    -------
+    coordinator : Coordinator
+        The coordinator, whose run method plays games on the connected workers.
+    """
+    authkey = check_authkey(address, authkey)
+    coordinator = Coordinator(lease_time, timeout)
+    CoordinatorManager.register('coordinator', callable=lambda: coordinator)
+    manager = CoordinatorManager(address=parse_address(address), authkey=authkey)
+    server = manager.get_server()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    print(f"Coordinator listening on {address}")
+    return coordinator
+
+def _heartbeat(coordinator, worker, stop, interval):
+    """Renew a worker's leases every interval seconds until stop is set."""
+    while not stop.wait(interval):
+        try:
+            coordinator.heartbeat(worker)
+        except (EOFError, ConnectionError):
+            break
+
+def work(address, authkey, play, batch=1, poll=1, heartbeat=10):
+    """Run a worker: lease games from a coordinator, play them, and submit the results.
+
+    Parameters
+    ----------
+    address : str
+        'host:port' of the coordinator (or 'port', on the loopback interface).
+    authkey : str or None
+        Shared secret of the coordinator; None only on the loopback interface.
+    play : function
+        Called as play(spec) for each leased game; must return (spec, banners, moves).
+    batch : int, optional (default=1)
+        Number of games to lease at a time.
+    poll : float, optional (default=1)
+        Seconds to wait before asking again when there is nothing to do.
+    heartbeat : float, optional (default=10)
+        Seconds between lease renewals (must be well below the coordinator's lease time).
+
+    Returns
+    -------
+    played : int
+        Number of games played by this worker.
+    """
+    authkey = check_authkey(address, authkey)
+    CoordinatorManager.register('coordinator')
+    manager = CoordinatorManager(address=parse_address(address), authkey=authkey)
+    manager.connect()
+    coordinator = manager.coordinator()
+    worker = f"{socket.gethostname()}:{os.getpid()}"
+
+    # Keep the leases alive while games are being played
+    stop = threading.Event()
+    threading.Thread(target=_heartbeat, args=(coordinator, worker, stop, heartbeat), daemon=True).start()
+
+    played = 0
+    try:
+        while True:
+            specs = coordinator.lease(worker, batch)
+            if not specs:
+                if coordinator.is_closed():
+                    break
+                time.sleep(poll)
+                continue
+            for spec in specs:
+                _, banners, moves = play(spec)
+                coordinator.submit(worker, spec['game'], banners, moves)
+                played += 1
+    except (EOFError, ConnectionError):
+        pass # the coordinator has shut down
+    finally:
+        stop.set()
+    return played
@@ -0,0 +1,212 @@
+# engine_bench.py
+# Search benchmark for "Hand of the King" AI players.
+#
+# Runs a player's search over a fixed corpus of 8-color opening, middlegame and endgame
+# positions, both at fixed depths (time-to-depth) and with a fixed time per move, and
+# records the nodes searched, nodes per second, the move chosen and its score. The
+# results can be saved as JSON and compared with a saved baseline: slowdowns beyond a
+# noise threshold are reported as regressions, and different node counts or moves at a
+# fixed depth are reported as changes in the search itself.
+#
+# Players control the benchmark through optional module attributes: DEPTH (fixed search
+# depth, None for the player's default), TIME_LIMIT (seconds per move), and STATS (a
+# dict that receives the statistics of each search, including 'nodes'; see
+# math_nerds_final.new_stats). Players without them are only timed.
+#
+# Usage:
+#   python engine_bench.py math_nerds_final --out baseline.json
+#   python engine_bench.py math_nerds_final --baseline baseline.json
+
+import argparse
+import codec
+import json
+import math
+import platform
+import registry
+import sys
+import time
+import tournament
+import utils
+
+CORPUS = [ # (name, phase, packed state; see codec.py)
+    ('opening-1', 'opening', '660e688671237885883655443757785727466684000000000000000000'),
+    ('opening-2', 'opening', '660e247877874866355325561478368674886875000000000000000000'),
+    ('opening-3', 'opening', '660e746836678527682870876835314500685544000000000002100009'),
+    ('opening-4', 'opening', '660e386425755863477670837568671680848478010000100000002040'),
+    ('middlegame-1', 'middlegame', '660e14286008058578005685500007687706767010302100010102152a'),
+    ('middlegame-2', 'middlegame', '660e666747002000684868360047080287355501001001200003300649'),
+    ('middlegame-3', 'middlegame', '660e656462503400687557878870786310707400010110100100212961'),
+    ('middlegame-4', 'middlegame', '660e867858038266888456000006076215073477000111020020100a85'),
+    ('endgame-1', 'endgame', '660e000070030005003000041057000027000004010111214240352956'),
+    ('endgame-2', 'endgame', '660e0000000048010000250000000080740000001021201324242415aa'),
+    ('endgame-3', 'endgame', '660f006000008000002000806035304010005000100112122243421a95'),
+    ('endgame-4', 'endgame', '660f30002500006007767003701800060504000001013012301234299a'),
+]
+
+def run_position(player, state, depth=None, time_limit=None, repeat=1):
+    """Search one position and measure it.
+
+    Parameters
+    ----------
+    player : module
+        AI player (see the module comment for the attributes it may provide).
+    state : tuple
+        (board, rows, cols, turn, cards, banners).
+    depth : int, optional (default=None)
+        Fixed search depth (None for the player's default).
+    time_limit : float, optional (default=None)
+        Seconds per move (None for the player's default).
+    repeat : int, optional (default=1)
+        Number of runs; the fastest one is reported.
+
+    Returns
+    -------
+    result : dict
+        nodes (None if the player does not count them), seconds, nps, move, and score
+        (None if the player does not report one, or the search ran out of time before
+        scoring any move).
+    """
+    settings = {'DEPTH': depth, 'TIME_LIMIT': time_limit if time_limit is not None else getattr(player, 'TIME_LIMIT', None)}
+    saved = {name: getattr(player, name) for name in ('DEPTH', 'TIME_LIMIT', 'STATS') if hasattr(player, name)}
+    best = None
+    try:
+        for name in saved.keys() & settings.keys():
+            setattr(player, name, settings[name])
+        for _ in range(repeat):
+            if 'STATS' in saved:
+                player.STATS = {'nodes': 0} # reset by the search itself if it collects statistics
+            start = time.perf_counter()
+            if getattr(player, 'SUPPORTS_SCORE', False):
+                move, score = utils.call_player(player, *state, search=True)
+            else:
+                move, score = utils.call_player(player, *state), None
+            seconds = time.perf_counter() - start
+            if score is not None and not math.isfinite(score): # a search cut short by the time limit
+                score = None
+            if best is None or seconds < best['seconds']:
+                nodes = player.STATS['nodes'] if 'STATS' in saved else None
+                best = {'nodes': nodes, 'seconds': seconds, 'nps': nodes / seconds if nodes is not None and seconds else None,
+                        'move': move, 'score': score}
+    finally:
+        for name, value in saved.items():
+            setattr(player, name, value)
+    return best
+
+def benchmark(player, depths, time_limit, repeat=1, phases=None):
+    """Run the corpus at each fixed depth and at a fixed time per move.
+
+    Returns
+    -------
+    positions : list of dicts
+        For every corpus position: name, phase, 'depths' (one run_position result per
+        depth, with its depth) and 'fixed_time' (a run_position result).
+    """
+    positions = []
+    for name, phase, key in CORPUS:
+        if phases and phase not in phases:
+            continue
+        state = codec.unpack(bytes.fromhex(key))
+        results = [dict(run_position(player, state, depth, float('inf'), repeat), depth=depth) for depth in depths]
+        fixed_time = run_position(player, state, None, time_limit, repeat) if time_limit else None
+        positions.append({'name': name, 'phase': phase, 'depths': results, 'fixed_time': fixed_time})
+    return positions
+
+def compare(current, baseline, threshold=0.1, min_seconds=0.01):
+    """Compare benchmark results with a baseline.
+
+    Parameters
+    ----------
+    current, baseline : lists of dicts
+        Results of benchmark.
+    threshold : float, optional (default=0.1)
+        Relative slowdown tolerated as noise.
+    min_seconds : float, optional (default=0.01)
+        Runs faster than this in the baseline are too noisy to time.
+
+    Returns
+    -------
+    regressions : list of str
+        Fixed-depth runs that became slower beyond the threshold, and fixed-time runs
+        whose node rate dropped beyond it.
+    changes : list of str
+        Fixed-depth runs that now search a different number of nodes or choose a
+        different move (the search itself changed).
+    """
+    regressions = []
+    changes = []
+    old_positions = {position['name']: position for position in baseline}
+    for position in current:
+        old = old_positions.get(position['name'])
+        if old is None:
+            continue
+        old_depths = {result['depth']: result for result in old['depths']}
+        for result in position['depths']:
+            before = old_depths.get(result['depth'])
+            if before is None:
+                continue
+            where = f"{position['name']} depth {result['depth']}"
+            if before['seconds'] >= min_seconds and result['seconds'] > before['seconds'] * (1 + threshold):
+                regressions.append(f"{where}: {before['seconds']:.4f} s -> {result['seconds']:.4f} s")
+            if result['nodes'] != before['nodes'] or result['move'] != before['move']:
+                changes.append(f"{where}: {before['nodes']} nodes, move {before['move']} -> {result['nodes']} nodes, move {result['move']}")
+        if position['fixed_time'] and old['fixed_time'] and position['fixed_time']['nps'] and old['fixed_time']['nps']:
+            if position['fixed_time']['nps'] < old['fixed_time']['nps'] / (1 + threshold):
+                regressions.append(f"{position['name']} fixed time: {old['fixed_time']['nps']:.0f} -> {position['fixed_time']['nps']:.0f} nodes/s")
+    return regressions, changes
+
+def print_results(positions):
+    """Print the benchmark results as a table."""
+    print(f"{'position':<14} {'depth':>5} {'nodes':>10} {'seconds':>9} {'nodes/s':>9} {'move':>5} {'score':>8}")
+    for position in positions:
+        runs = [(str(result['depth']), result) for result in position['depths']]
+        if position['fixed_time']:
+            runs.append(('time', position['fixed_time']))
+        for depth, result in runs:
+            nodes = result['nodes'] if result['nodes'] is not None else '-'
+            nps = round(result['nps']) if result['nps'] else '-'
+            score = round(result['score'], 3) if isinstance(result['score'], (int, float)) else '-'
+            print(f"{position['name']:<14} {depth:>5} {nodes:>10} {result['seconds']:>9.4f} {nps:>9} {result['move']:>5} {score:>8}")
+
+parser = argparse.ArgumentParser(description="Benchmark the search of an AI player on a fixed position corpus")
+parser.add_argument('player', type=str, help="Name of the AI player")
+parser.add_argument('--depths', type=int, nargs='*', help="Fixed search depths to time (default=1 2 3 4)", default=[1, 2, 3, 4])
+parser.add_argument('--time', type=float, help="Seconds per move for the fixed-time run (0 to skip; default=1)", default=1)
+parser.add_argument('--repeat', type=int, help="Runs per measurement; the fastest is kept (default=3)", default=3)
+parser.add_argument('--phases', type=str, nargs='+', choices=['opening', 'middlegame', 'endgame'], help="Only benchmark these phases", default=None)
+parser.add_argument('--out', type=str, help="Save the results as JSON", default=None)
+parser.add_argument('--baseline', type=str, help="Compare with results saved by --out (exits with status 1 on regressions)", default=None)
+parser.add_argument('--threshold', type=float, help="Relative slowdown treated as noise when comparing (default=0.1)", default=0.1)
+
+def main(args):
+    player = utils.load_player(args.player)
+    if not player:
+        sys.exit(1)
+    positions = benchmark(player, args.depths, args.time, args.repeat, args.phases)
+    print_results(positions)
+    nodes = sum(result['nodes'] or 0 for position in positions for result in position['depths'])
+    seconds = sum(result['seconds'] for position in positions for result in position['depths'])
+    print(f"Fixed depths: {nodes} nodes in {seconds:.3f} s ({round(nodes / seconds) if seconds else 0} nodes/s)")
+
+    if args.out:
+        tournament.write_json(args.out, {
+            'player': args.player,
+            'hash': registry.REGISTRY.info(args.player)['hash'],
+            'python': platform.python_version(),
+            'machine': platform.machine(),
+            'settings': {'depths': args.depths, 'time': args.time, 'repeat': args.repeat},
+            'positions': positions,
+        })
+    if args.baseline:
+        with open(args.baseline, "r") as f:
+            baseline = json.load(f)
+        regressions, changes = compare(positions, baseline['positions'], args.threshold)
+        for change in changes:
+            print(f"CHANGED: {change}")
+        for regression in regressions:
+            print(f"REGRESSION: {regression}")
+        print(f"{len(regressions)} regressions and {len(changes)} search changes against {args.baseline}")
+        if regressions:
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main(parser.parse_args())
@@ -0,0 +1,339 @@
+# gui_utils.py
+# Python library of graphical user interface functions related to "A Game of Thrones: Hand of the King".
+#
+# These functions depend on the graphics library (and therefore tkinter and a display),
+# so they are kept apart from the pure game logic in utils.py. Importing this module is
+# what creates the hidden Tk root window.
+#
+# The game window is created with autoflush off, so changing a card does not redraw the
+# window by itself: each function makes all of its canvas changes and then flushes once.
+#
+# Author: Matthew Eicholtz
+
+from graphics import *
+import threading
+import time
+import tkinter as tk
+import traceback
+import utils
+
+def ask_human(gui):
+    """Query human player to make a choice.
+
+    Parameters
+    ----------
+    gui : GraphWin object
+        The main graphical user interface object (relies on graphics library).
+
+    Returns
+    -------
+    which_card : int
+        The linear index of the card to choose. If there are any errors (or the human
+        presses Escape or Ctrl+e, or closes the window), the output will be -1.
+
+    Notes
+    -----
+    This waits for Tk events (without polling), so it uses no CPU while the human thinks.
+    """
+    if not gui.isOpen():
+        return -1
+    answer = tk.IntVar(gui, value=-2) # -2 until the human answers
+
+    def on_click(pt):
+        x, y = int(pt.getX()), int(pt.getY())
+        row = max(0, min(gui.rows - 1, (y - gui.margin // 2) // (gui.card_size + gui.margin)))
+        col = max(0, min(gui.cols - 1, (x - gui.margin // 2) // (gui.card_size + gui.margin)))
+        # print(f'(x,y)=({x},{y}), (row,col)=({row},{col})')
+        answer.set(utils.sub2ind(row, col, gui.rows, gui.cols))
+
+    def on_key(event):
+        if event.keysym == "Escape" or (event.keysym == "e" and event.state & 0x4): # Escape or Ctrl+e
+            answer.set(-1)
+
+    gui.setMouseHandler(on_click)
+    key_binding = gui.master.bind("<Key>", on_key, add="+")
+    close_binding = gui.bind("<Destroy>", lambda event: answer.set(-1), add="+") # the window was closed
+    gui.wait_variable(answer) # handles events until a callback sets the answer
+    if gui.isOpen():
+        gui.setMouseHandler(None)
+        gui.master.unbind("<Key>", key_binding)
+        gui.unbind("<Destroy>", close_binding)
+    return answer.get()
+
+def ask_ai(gui, label, decide, args=(), kwargs=None, delay=0, stats=None):
+    """Let an AI player choose a move in a background thread while the window stays responsive.
+
+    Parameters
+    ----------
+    gui : GraphWin object
+        The main graphical user interface object (relies on graphics library).
+    label : str
+        Name of the player, for the status message.
+    decide : function
+        Called as decide(*args, **kwargs) in the background thread; returns the player's choice.
+    args : tuple, optional (default=())
+        Positional arguments of decide.
+    kwargs : dict, optional (default=None)
+        Keyword arguments of decide.
+    delay : float, optional (default=0)
+        Minimum time (in seconds) before the choice is returned, so fast players can be followed.
+    stats : dict, optional (default=None)
+        The player's search statistics (see math_nerds_final.new_stats), updated while it
+        searches. If given, the best move found so far is shown.
+
+    Returns
+    -------
+    which_card : int or None
+        The linear index of the card chosen, -1 if the player raised an error, or None if
+        the game was aborted with Escape or Ctrl+e, or by closing the window. The player
+        cannot be interrupted, so its thread is left to finish in the background.
+    """
+    if not gui.isOpen():
+        return None
+    result = [] # the player's choice, once it has made it
+    answer = [] # the value to return, once it is known
+    start = time.perf_counter()
+    timer = [None]
+
+    def finish(value):
+        if not answer:
+            answer.append(value)
+            gui.quit() # leave the event loop below
+
+    def deliver():
+        """Return the choice as soon as it is made (and the delay is over); runs in the event loop."""
+        remaining = delay - (time.perf_counter() - start)
+        if remaining > 0:
+            gui.after(int(1000 * remaining) + 1, deliver)
+        else:
+            finish(result[0])
+
+    def run():
+        try:
+            result.append(decide(*args, **(kwargs or {})))
+        except Exception:
+            traceback.print_exc()
+            result.append(-1)
+        try:
+            gui.after_idle(deliver) # tkinter hands this call over to the thread running the event loop
+        except (RuntimeError, tk.TclError): # the game was aborted and the event loop is gone
+            pass
+
+    def tick():
+        if answer:
+            return
+        if result and time.perf_counter() - start >= delay: # in case the thread could not schedule deliver
+            finish(result[0])
+            return
+        message = f'{label} is thinking... {time.perf_counter() - start:.1f} s'
+        if stats and stats.get('best_move') is not None:
+            message += f' (best so far: {stats["best_move"]})'
+        status(gui, message)
+        timer[0] = gui.after(100, tick)
+
+    def on_key(event):
+        if event.keysym == "Escape" or (event.keysym == "e" and event.state & 0x4): # Escape or Ctrl+e
+            finish(None)
+
+    key_binding = gui.master.bind("<Key>", on_key, add="+")
+    close_binding = gui.bind("<Destroy>", lambda event: finish(None), add="+") # the window was closed
+    threading.Thread(target=run, daemon=True).start()
+    tick()
+    if not answer: # (the player may have answered already)
+        gui.mainloop() # handles events (and ticks) until the player answers or the game is aborted
+    if timer[0]:
+        gui.after_cancel(timer[0])
+    if gui.isOpen():
+        gui.master.unbind("<Key>", key_binding)
+        gui.unbind("<Destroy>", close_binding)
+    return answer[0] if answer else None
+
+def get_winner(gui, players, banners):
+    """Determine the winner based on total number of banners and display result.
+
+    Parameters
+    ----------
+    gui : GraphWin object
+        The main graphical user interface object (relies on graphics library).
+    players : list of str
+        List of player names.
+    banners : list of lists of ints
+        List identifying which player owns each banner. The syntax banners[i][j]
+        indicates the ith player has the jth banner.
+
+    Returns
+    -------
+    None
+    """
+    # Process player names (this is because "human def human" looks weirder than "Player 1 def Player 2")
+    player1 = "Player 1" if players[0] == "human" or players[0] == players[1] else players[0]
+    player2 = "Player 2" if players[1] == "human" or players[0] == players[1] else players[1]
+
+    # Compute the score for each player
+    score1 = sum(banners[0])
+    score2 = sum(banners[1])
+
+    # The player with the higher score wins
+    if score1 > score2:
+        status(gui, f"{player1} wins!")
+        print(f'{player1} def {player2} {score1}-{score2}')
+    elif score2 > score1:
+        status(gui, f"{player2} wins!")
+        print(f'{player2} def {player1} {score2}-{score1}')
+    else:
+        status(gui, "It's a tie!")
+        print(f'{player1} ties {player2} {score1}-{score2}')
+
+def make_gui(board, rows, cols, card_size=60, margin=10):
+    """Create the graphical user interface for the game.
+
+    Parameters
+    ----------
+    board : list of ints
+        A flattened version of the board.
+    rows : int
+        Number of rows on the board.
+    cols : int
+        Number of columns on the board.
+    card_size : int, optional (default=60)
+        Height and width of cards, in pixels.
+    margin : int, optional (default=10)
+        Space in between cards, in pixels.
+
+    Returns
+    -------
+    gui : GraphWin object
+        The main graphical user interface object (relies on graphics library).
+    """
+
+    # Read colors from file
+    colors = utils.load_colors()
+
+    # Make game window
+    wid = cols * card_size + margin * (cols + 1)
+    hei = rows * card_size + margin * (rows + 1) + 30 # the extra 30 is for instructions at the bottom
+    gui = GraphWin("A Game of Thrones: Hand of the King", wid, hei, autoflush=False) # drawn in one update below
+    
+    # Make card objects
+    for row in range(rows):
+        for col in range(cols):
+            # Compute position and color of card
+            x1 = margin * (col + 1) + card_size * col
+            y1 = margin * (row + 1) + card_size * row
+            x2 = x1 + card_size
+            y2 = y1 + card_size
+            whichcolor = board[cols * row + col] # index of the color for the card in the current (row, col)
+            # print(f'row={row}, col={col}, index={cols * row + col}, color={whichcolor}')
+            
+            # Create rectangle
+            card = Rectangle(Point(x1, y1), Point(x2, y2))
+            card.setFill(colors[whichcolor - 1][0])
+            card.setOutline(colors[whichcolor - 1][1])
+            card.setWidth(4)
+            card.draw(gui)
+
+            # Add text identifier
+            txt = Text(Point(x1 + 8, y1 + 6), whichcolor)
+            txt.setSize(18)
+            txt.setTextColor(colors[whichcolor - 1][1])
+            txt.draw(gui)
+
+    # Add text message at bottom
+    txt = Text(Point(wid // 2, hei - 20), "")
+    txt._reconfig("anchor", "c")
+    txt.setSize(12)
+    txt.draw(gui)
+
+    # Attach relevant properties to the gui
+    gui.rows = rows
+    gui.cols = cols
+    gui.card_size = card_size
+    gui.margin = margin
+
+    gui.update() # show the window with every card drawn at once
+    return gui
+
+def make_move(gui, board, x0, x, collection):
+    """Move the 1-card in the GUI to the position on the board specified by the input index,
+    capturing cards of the same color along the way. Update the player's card collection accordingly.
+    
+    Parameters
+    ----------
+    gui : GraphWin object
+        The main graphical user interface object (relies on graphics library).
+    board : list of ints
+        A flattened version of the board.
+    x0 : int
+        The initial (at the start of the game) linear index of the 1-card.
+        This is important because it defines where the card is in the list
+        of objects embedded in the GUI.
+    x : int
+        Linear index to move the 1-card to.
+    collection : list of ints
+        The array of card counts for each color set owned by the current player.
+
+    Returns
+    -------
+    None
+    """
+    # Get relevant data
+    items = gui.items[:-1]
+    cards = items[::2]
+    txt = items[1::2]
+
+    x1 = board.index(1) # index of the 1-card on the board
+    # print(f'moving from {x1} to {x}')
+
+    # Remove captured cards from board
+    d = gui.width + 100 # distance to move cards (the 100 ensures they move off the board)
+    color = board[x] # color of the main captured card
+    cards[x].move(d, 0)
+    txt[x].move(d, 0)
+    board[x] = 1 # the 1-card moves here
+    collection[color - 2] += 1 # index decreases by 2 due to 0-indexing and the first color set being 2 (not 1)
+    if abs(x - x1) < gui.cols: # move is either left or right
+        dx = (x - x1) * (gui.card_size + gui.margin)
+        dy = 0
+        if x < x1: # left
+            possible = range(x + 1, x1)
+        else: # right
+            possible = range(x1 + 1, x)
+    else: # move is either up or down
+        dx = 0
+        dy = ((x - x1) // gui.cols) * (gui.card_size + gui.margin)
+        if x < x1: # up
+            possible = range(x + gui.cols, x1, gui.cols)
+        else: # down
+            possible = range(x1 + gui.cols, x, gui.cols)
+
+    for i in possible:
+        if board[i] == color:
+            cards[i].move(d, 0)
+            txt[i].move(d, 0)
+            board[i] = 0  # there is no card in this position anymore
+            collection[color - 2] += 1
+
+    # Move the 1-card to the correct position
+    cards[x0].move(dx, dy)
+    txt[x0].move(dx, dy)
+    board[x1] = 0
+    gui.flush() # redraw the whole move at once
+
+def status(gui, msg):
+    """Update the text status in the GUI.
+
+    Parameters
+    ----------
+    gui : GraphWin object
+        The main graphical user interface object (relies on graphics library).
+    msg : str
+        The string message to display in the gui.
+
+    Returns
+    -------
+    None
+    """
+    if gui.isOpen():
+        txt = gui.items[-1] # the text to update should be the last object created
+        txt.setText(msg)
+        gui.flush()
@@ -9,10 +9,11 @@
 # declared the winner.
 
 import argparse
-from copy import deepcopy
 import os
 import pdb
+import profiling
 import random
+import sys
 import time
 import utils
 
@@ -22,9 +23,11 @@ parser = argparse.ArgumentParser(description="Play a Game of Thrones: Hand of th
 parser.add_argument('--player1', metavar='p1', type=str, help="either 'human' (default) or the name of an AI player file", default='human')
 parser.add_argument('--player2', metavar='p2', type=str, help="either 'human' (default) or the name of an AI player file", default='human')
 parser.add_argument('-b', '--board', type=str, help="file containing starting board setup (for repeatability)", default=None)
-parser.add_argument('-d', '--delay', type=float, help="time (in seconds) to wait between moves (default=1)", default=1)
+parser.add_argument('-d', '--delay', type=float, help="minimum time (in seconds) per AI move, so that the game can be followed (default=1)", default=1)
 parser.add_argument('-n', '--num_colors', type=int, help="number of color sets in the game (default=8)", default=8)
 parser.add_argument('-s', '--seed', metavar='n', type=int, help="seed for random number generator", default=None)
+parser.add_argument('--profile', action='store_true', help="profile the AI players' choices (not the GUI) with cProfile and stack sampling")
+parser.add_argument('--profile-out', metavar='prefix', type=str, help="prefix of the profile files: <prefix>.<player>.pstats and <prefix>.collapsed (default=profile)", default='profile')
 
 def main(args):
     print("Let's play a Game of Thrones: Hand of the King!")
@@ -44,6 +47,12 @@ def main(args):
     for i in range(2):
         if players[i] != "human":
             ai[i] = utils.load_player(players[i])
+            if not ai[i]:
+                sys.exit(1)
+            if getattr(ai[i], 'SUPPORTS_STATS', False) and ai[i].STATS is None:
+                ai[i].STATS = {} # to show the best move found so far while it thinks
+
+    profiler = profiling.ChoiceProfiler(args.profile_out) if args.profile else None
 
     # Play the game
     if any(item is not None for item in ai): # if any player is AI, then wait for user to manually start game
@@ -67,11 +76,17 @@ def main(args):
             if which_card == -1:
                 break
 
-        else: # the player is an AI agent
-            utils.status(gui, f'Player {turn + 1} ({players[turn]}) is thinking...')
-            time.sleep(args.delay)
+        else: # the player is an AI agent, which thinks in the background while the window stays responsive
             # which_card = ai[turn].choice(board.copy(), rows, cols, turn, cards.copy(), banners.copy())
-            which_card = ai[turn].choice(deepcopy(board), rows, cols, turn, deepcopy(cards), deepcopy(banners))
+            context = profiler.profile(players[turn]) if profiler else None # profile the choice only, not the GUI
+            stats = ai[turn].STATS if getattr(ai[turn], 'SUPPORTS_STATS', False) else None
+            which_card = utils.ask_ai(gui, f'Player {turn + 1} ({players[turn]})', utils.call_player, # read-only views or private copies
+                                      (ai[turn], board, rows, cols, turn, cards, banners), {'context': context}, args.delay, stats)
+            if which_card is None: # Escape or the window was closed
+                break
+            if which_card == -1:
+                print(f'ERROR: AI player {players[turn]} failed to choose a move. Game over.')
+                break
 
         # Make the move if it is valid
         if which_card in valid_moves:
@@ -106,6 +121,9 @@ def main(args):
     if gameover:
         utils.get_winner(gui, players, banners)
         time.sleep(args.delay)
+    if profiler:
+        for file in profiler.close():
+            print(f"Wrote {file}")
 
 if __name__ == "__main__":
     main(parser.parse_args())
\ No newline at end of file
@@ -2,64 +2,97 @@
 # Simulation-only version of "Hand of the King"
 
 import argparse
-from copy import deepcopy
+import distributed
+import latency
+import multiprocessing
+import profiling
 import random
+import records
+import registry
+import results_db
+import scheduler
+import sys
+import time
+import tournament
 import utils
-from players import joel
+import workers
 
 parser = argparse.ArgumentParser(description="Simulate Hand of the King without GUI or human input")
-parser.add_argument('--player1', type=str, help="Name of AI player 1", required=True)
-parser.add_argument('--player2', type=str, help="Name of AI player 2", required=True)
+parser.add_argument('--player1', type=str, help="Name of AI player 1", default=None)
+parser.add_argument('--player2', type=str, help="Name of AI player 2", default=None)
+parser.add_argument('--league', type=str, nargs='+', help="Names of AI players to play a round robin (instead of --player1/--player2)", default=None)
 parser.add_argument('--board', type=str, help="Starting board setup file", default=None)
 parser.add_argument('--num_colors', type=int, help="Number of color sets (default=8)", default=8)
 parser.add_argument('--seed', type=int, help="Random seed", default=None)
 parser.add_argument('--delay', type=float, help="Optional delay between moves (default=0)", default=0)
+parser.add_argument('--isolate', action='store_true', help="Run each AI player in its own long-lived worker process")
+parser.add_argument('--timeout', type=float, help="Time limit (in seconds) per move for isolated players (default=None)", default=None)
+parser.add_argument('--games', type=int, help="Number of games to play (default=5, or 1000 per measurement with --benchmark)", default=None)
+parser.add_argument('--alternate', action='store_true', help="Swap seats every other game")
+parser.add_argument('--checkpoint', type=str, help="File used to save progress and resume an interrupted tournament", default=None)
+parser.add_argument('--cache', type=str, help="File of cached game results, reused across runs when players are unchanged (requires --seed)", default=None)
+parser.add_argument('-j', '--jobs', type=int, help="Number of games to play in parallel (default=1)", default=1)
+parser.add_argument('--adaptive', action='store_true', help="With --league, schedule games where the ratings are still uncertain instead of a flat round robin")
+parser.add_argument('--precision', type=float, help="Adaptive mode: target confidence interval half-width, in Elo points (default=50)", default=50)
+parser.add_argument('--batch', type=int, help="Adaptive mode: games scheduled per batch (default=4 per job)", default=None)
+parser.add_argument('--max_games', type=int, help="Adaptive mode: maximum number of games (default=1000)", default=1000)
+parser.add_argument('--serve', metavar='HOST:PORT', type=str, help="Coordinate the tournament, letting workers (see --connect) play the games; a bare PORT listens on 127.0.0.1 only", default=None)
+parser.add_argument('--connect', metavar='HOST:PORT', type=str, help="Act as a worker for the coordinator at this address (with --jobs worker processes)", default=None)
+parser.add_argument('--authkey', type=str, help="Shared secret between the coordinator and its workers; required unless HOST is a loopback address, since anyone who has it can run code on them", default=None)
+parser.add_argument('--lease', type=float, help="Seconds before a silent worker's games are re-queued (default=120)", default=120)
+parser.add_argument('--worker_timeout', type=float, help="Seconds the coordinator waits without hearing from any worker before giving up (default=600)", default=600)
+parser.add_argument('--db', type=str, help="SQLite file in which to store games, moves, and move timings (see results_db.py)", default=None)
+parser.add_argument('--record', type=str, help="Archive every game played in this compact record file, in the order the games finish (see records.py and replay.py)", default=None)
+parser.add_argument('--record_compression', choices=['zlib', 'lzma'], help="Compress the record file in blocks", default=None)
+parser.add_argument('--list_players', action='store_true', help="List the registered AI players and their declared capabilities, then exit")
+parser.add_argument('--search_stats', action='store_true', help="Collect per-move search statistics from players that support them (SUPPORTS_STATS) and summarize them")
+parser.add_argument('--benchmark', action='store_true', help="Measure games per second for 3 to 8 colors and 1 to --jobs workers, separating engine and player time (players default to randy and greedy)")
+parser.add_argument('--latency', action='store_true', help="Report percentiles of the wall-clock and CPU time per move of each player, by game phase")
+parser.add_argument('--budget', type=float, help="Seconds a move may take; slower moves are counted in the latency report (default=5)", default=5)
+parser.add_argument('--profile', action='store_true', help="Profile the AI players' choices (not the simulator) with cProfile and stack sampling")
+parser.add_argument('--profile_out', '--profile-out', type=str, help="Prefix of the profile files: <prefix>.<player>.pstats and <prefix>.collapsed (default=profile)", default='profile')
+parser.add_argument('--memory', action='store_true', help="Trace the memory the AI players allocate while choosing (peak, held blocks, top allocation sites) and summarize it")
+parser.add_argument('--memory_out', '--memory-out', type=str, help="With --memory, write the measurements of every move to this JSON lines file", default=None)
 
-player1_wins = 0
-player1_win_points = 0
-player1_losses = 0
-player1_losses_points = 0
-player1_ties = 0
+SEARCH_STATS = False # collect search statistics (set by --search_stats, in every process that plays games)
+PROFILER = None # profiling.ChoiceProfiler of the players' choices (set by --profile; games played in this process only)
+MEMORY = None # profiling.MemoryProfiler of the players' choices (set by --memory; games played in this process only)
 
-player2_wins = 0
-player2_win_points = 0
-player2_losses = 0
-player2_losses_points = 0
-player2_ties = 0
 
+def play_game(spec, ai):
+    """Play one scheduled game between two AI players.
 
-def main(args):
-    # global time
-    global player1_wins
-    global player1_win_points
-    global player1_losses
-    global player1_losses_points
-    global player1_ties
-
-    global player2_wins
-    global player2_win_points
-    global player2_losses
-    global player2_losses_points
-    global player2_ties
-
-
-    # print("Simulating Hand of the King...")
+    Parameters
+    ----------
+    spec : dict
+        Scheduled game (see tournament.make_schedule).
+    ai : list
+        The two AI players (modules or workers with a choice function), in seat order.
 
-    random.seed(args.seed)
-
-    # Load or create the board
-    board, rows, cols = (
-        utils.load_cards(args.board) if args.board else utils.shuffle_cards(args.num_colors)
-    )
+    Returns
+    -------
+    banners : list of lists of ints
+        Which banners does each player own at the end of the game?
+    moves : list of tuples
+        (turn, which_card, seconds, stats, cpu_seconds, cards_left) for every move
+        requested from a player, including invalid ones, where seconds and cpu_seconds are
+        the wall-clock and CPU time the player took to decide (cpu_seconds is None if an
+        isolated player failed to answer), stats is the player's search statistics for
+        the move (None unless SEARCH_STATS is set and the player supports them), and
+        cards_left is the number of cards on the board, not counting the 1-card.
+    """
+    board, rows, cols = initial_board(spec)
     num_colors = max(board)
-    x0 = board.index(1)  # Starting position of the 1-card
 
     cards = [[0] * (num_colors - 1) for _ in range(2)]  # Player card collections
     banners = [[0] * (num_colors - 1) for _ in range(2)]  # Player banner collections
+    board, cards, banners = utils.freeze(board, cards, banners)  # the state is read-only from here on
+    collect = [SEARCH_STATS and getattr(player, 'SUPPORTS_STATS', False) for player in ai]
+    for player, on in zip(ai, collect):
+        if on and player.STATS is None:
+            player.STATS = {}
 
-    # Load AI players
-    ai = [utils.load_player(args.player1), utils.load_player(args.player2)]
-
+    moves = []
     turn = 0
     while True:
         valid_moves = utils.get_valid_moves(board, rows, cols)
@@ -67,19 +100,26 @@ def main(args):
             # print("No more moves. Game over.")
             break
 
-        move = ai[turn].choice(deepcopy(board), rows, cols, turn, deepcopy(cards), deepcopy(banners))
+        if PROFILER:
+            context = PROFILER.profile(spec['players'][turn])
+        elif MEMORY:
+            context = MEMORY.profile(spec['players'][turn], spec['game'], len(moves))
+        else:
+            context = None
+        start, cpu_start = time.perf_counter(), time.thread_time()
+        move = utils.call_player(ai[turn], board, rows, cols, turn, cards, banners, context=context)
+        seconds, cpu_seconds = time.perf_counter() - start, time.thread_time() - cpu_start
+        if isinstance(ai[turn], workers.PlayerWorker): # the player ran in its own process
+            cpu_seconds = ai[turn].cpu_seconds
+        moves.append((turn, move, seconds, dict(ai[turn].STATS) if collect[turn] else None, cpu_seconds,
+                      len(board) - board.count(0) - 1))
 
         if move not in valid_moves:
             # print(f"Invalid move attempted by player {turn + 1}. Skipping turn.")
             turn = abs(turn - 1)
             continue
 
-        color = board[move]
-        # utils.make_move(None, board, x0, move, cards[turn])
-        new_game = joel.simulate_move([deepcopy(board), rows, cols, turn, deepcopy(cards), deepcopy(banners)], move, turn)
-        board = deepcopy(new_game[0])
-        cards = deepcopy(new_game[4])
-        utils.update_banners(turn, color, cards, banners)
+        board, cards, banners = utils.apply_move(board, cols, move, turn, cards, banners)
 
         # Print status
         # print(f"Player {turn + 1} played card {move} (color {color})")
@@ -89,10 +129,18 @@ def main(args):
 
         turn = abs(turn - 1)
 
-    # Final winner
-    # winner = utils.get_winner(None, [args.player1, args.player2], banners, print_result=True)
+    return banners, moves
+
+
+def initial_board(spec):
+    """Load or shuffle the starting board of a scheduled game (seeding the random number generator)."""
+    random.seed(spec['seed'])
+    return utils.load_cards(spec['board']) if spec['board'] else utils.shuffle_cards(spec['num_colors'])
+
+
+def print_result(players, banners):
+    """Print the final score of a game."""
     # Process player names (this is because "human def human" looks weirder than "Player 1 def Player 2")
-    players = [args.player1, args.player2]
     player1 = "Player 1" if players[0] == "human" or players[0] == players[1] else players[0]
     player2 = "Player 2" if players[1] == "human" or players[0] == players[1] else players[1]
 
@@ -102,45 +150,375 @@ def main(args):
 
     # The player with the higher score wins
     if score1 > score2:
-        # status(gui, f"{player1} wins!")
         print(f'{player1} def {player2} {score1}-{score2}')
-        player1_wins += 1
-        player1_win_points += score1
-        
-        player2_losses += 1
-        player2_losses_points += score2
     elif score2 > score1:
-        # status(gui, f"{player2} wins!")
         print(f'{player2} def {player1} {score2}-{score1}')
-        player1_losses += 1
-        player1_losses_points += score1
-
-        player2_wins += 1
-        player2_win_points += score2
     else:
-        # status(gui, "It's a tie!")
         print(f'{player1} ties {player2} {score1}-{score2}')
-        player1_ties += 1
-        player2_ties += 1
 
 
-if __name__ == "__main__":
-    matches_played = 0
-    for i in range(5): # 10
-        print(i)
-        main(parser.parse_args())
-        matches_played += 1
-    args = parser.parse_args()
+def print_statistics(names, stats, matches_played):
+    """Print the end-of-simulation statistics for both sides of a pairing."""
     print()
     print("---END OF SIMULATION STATISTICS---")
-    print(f"{args.player1} won {player1_wins} times with a total of {player1_win_points + player1_losses_points} points across {matches_played} games. They had {player1_win_points} total points in the wins, with an average of {round((player1_win_points / player1_wins), 3) if player1_wins != 0 else 0} points per win.")
-    print(f"{args.player1} lost {player1_losses} times with a total of {player1_win_points + player1_losses_points} points across {matches_played} games. They had {player1_losses_points} total points in the losses, with an average of {round((player1_losses_points / player1_losses), 3) if player1_losses != 0 else 0} points per loss.")
-    print(f"{args.player1} averaged {round(((player1_win_points + player1_losses_points)/matches_played), 3)} points per game.")
+    if matches_played == 0:
+        print("No games were played")
+        return
+    for name, s in zip(names, stats):
+        print(f"{name} won {s['wins']} times with a total of {s['win_points'] + s['loss_points']} points across {matches_played} games. They had {s['win_points']} total points in the wins, with an average of {round((s['win_points'] / s['wins']), 3) if s['wins'] != 0 else 0} points per win.")
+        print(f"{name} lost {s['losses']} times with a total of {s['win_points'] + s['loss_points']} points across {matches_played} games. They had {s['loss_points']} total points in the losses, with an average of {round((s['loss_points'] / s['losses']), 3) if s['losses'] != 0 else 0} points per loss.")
+        print(f"{name} averaged {round(((s['win_points'] + s['loss_points'])/matches_played), 3)} points per game.")
+        print()
+    print(f"There were {stats[0]['ties']} ties over the {matches_played} matches")
+    for name, s in zip(names, stats):
+        print(f"{name} won {round((s['wins'] / matches_played * 100), 3)}% of the time")
+
+
+def print_standings(table, ratings):
+    """Print the league table with Elo ratings (and 95% confidence intervals), best player first."""
+    print()
+    print("---END OF LEAGUE STATISTICS---")
+    print(f"{'player':<24} {'games':>6} {'wins':>6} {'losses':>6} {'ties':>6} {'win %':>8} {'pts/game':>9} {'elo':>7} {'+/-':>6}")
+    for name, row in sorted(table.items(), key=lambda item: -ratings[item[0]][0]):
+        elo, se = ratings[name]
+        print(f"{name:<24} {row['games']:>6} {row['wins']:>6} {row['losses']:>6} {row['ties']:>6} {round(row['wins'] / row['games'] * 100, 3):>8} {round(row['points'] / row['games'], 3):>9} {round(elo):>7} {round(1.96 * se):>6}")
+
+
+def add_search_stats(totals, name, stats):
+    """Add the search statistics of one move to a player's running totals."""
+    total = totals.setdefault(name, {'moves': 0, 'nodes': 0, 'leaves': 0, 'cutoffs': 0, 'first_move_cutoffs': 0,
+                                     'tt_probes': 0, 'tt_hits': 0, 'aborted': 0, 'depth': 0, 'completed_depth': 0,
+                                     'ebf': 0, 'ebf_moves': 0})
+    total['moves'] += 1
+    for key in ('nodes', 'leaves', 'cutoffs', 'first_move_cutoffs', 'tt_probes', 'tt_hits', 'depth'):
+        total[key] += stats.get(key, 0)
+    if stats.get('completed_depth') is None:
+        total['aborted'] += 1
+    else:
+        total['completed_depth'] += stats['completed_depth']
+    if stats.get('ebf') is not None:
+        total['ebf'] += stats['ebf']
+        total['ebf_moves'] += 1
+
+
+def print_search_stats(totals):
+    """Print the search statistics of each player, averaged over its moves."""
+    print()
+    print("---SEARCH STATISTICS---")
+    print(f"{'player':<24} {'moves':>6} {'nodes':>9} {'leaves':>9} {'cutoffs':>8} {'1st cut%':>8} {'ebf':>6} {'depth':>6} {'done':>6} {'aborted%':>8} {'tt hit%':>8}")
+    for name, t in sorted(totals.items()):
+        moves = t['moves']
+        completed = moves - t['aborted']
+        first = f"{100 * t['first_move_cutoffs'] / t['cutoffs']:.1f}" if t['cutoffs'] else '-'
+        ebf = f"{t['ebf'] / t['ebf_moves']:.2f}" if t['ebf_moves'] else '-'
+        done = f"{t['completed_depth'] / completed:.2f}" if completed else '-'
+        hits = f"{100 * t['tt_hits'] / t['tt_probes']:.1f}" if t['tt_probes'] else '-'
+        print(f"{name:<24} {moves:>6} {round(t['nodes'] / moves):>9} {round(t['leaves'] / moves):>9} {round(t['cutoffs'] / moves):>8} {first:>8} {ebf:>6} {t['depth'] / moves:>6.2f} {done:>6} {100 * t['aborted'] / moves:>8.1f} {hits:>8}")
+
+
+def add_latencies(report, players, moves):
+    """Add the decision times of a game's moves (see play_game) to a latency.LatencyReport."""
+    total_cards = moves[0][5] # the first move is made on the full board
+    for turn, _, seconds, _, cpu_seconds, cards_left in moves:
+        report.add(players[turn], latency.phase(cards_left, total_cards), seconds, cpu_seconds)
+
+
+def print_latency(report):
+    """Print the percentiles of each player's decision times, by game phase (in units that suit each time)."""
     print()
-    print(f"{args.player2} won {player2_wins} times with a total of {player2_win_points + player2_losses_points} points across {matches_played} games. They had {player2_win_points} total points in the wins, with an average of {round((player2_win_points / player2_wins), 3) if player2_wins != 0 else 0} points per win.")
-    print(f"{args.player2} lost {player2_losses} times with a total of {player2_win_points + player2_losses_points} points across {matches_played} games. They had {player2_losses_points} total points in the losses, with an average of {round((player2_losses_points / player2_losses), 3) if player2_losses != 0 else 0} points per loss.")
-    print(f"{args.player2} averaged {round(((player2_win_points + player2_losses_points)/matches_played), 3)} points per game.")
+    print("---DECISION TIMES---")
+    print(f"{'player':<24} {'phase':<10} {'moves':>6} {'wall p50':>9} {'p90':>8} {'p99':>8} {'max':>8} {'cpu p50':>9} {'p90':>8} {'p99':>8} {'max':>8} {'over ' + str(report.budget) + ' s':>10}")
+    for name, phase, entry in report.rows():
+        times = []
+        for sketch in entry['wall'], entry['cpu']:
+            for q in 0.5, 0.9, 0.99:
+                value = sketch.quantile(q)
+                times.append(latency.format_seconds(value) if value is not None else '-')
+            times.append(latency.format_seconds(sketch.max) if sketch.count else '-')
+        print(f"{name:<24} {phase:<10} {entry['wall'].count:>6} {times[0]:>9} {times[1]:>8} {times[2]:>8} {times[3]:>8} {times[4]:>9} {times[5]:>8} {times[6]:>8} {times[7]:>8} {entry['over']:>10}")
+
+
+def print_memory(summary):
+    """Print the memory allocated by each player while choosing (see profiling.MemoryProfiler.summary)."""
     print()
-    print(f"There were {player1_ties} ties over the {matches_played} matches")
-    print(f"{args.player1} won {round((player1_wins / matches_played * 100), 3)}% of the time")
-    print(f"{args.player2} won {round((player2_wins / matches_played * 100), 3)}% of the time")
+    print("---MEMORY---")
+    print(f"{'player':<24} {'moves':>6} {'mean peak KiB':>14} {'max peak KiB':>13} {'mean retained KiB':>18} {'blocks/move':>12}")
+    for name, t in sorted(summary.items()):
+        moves = t['moves']
+        print(f"{name:<24} {moves:>6} {t['peak'] / moves / 1024:>14.1f} {t['max_peak'] / 1024:>13.1f} {t['retained'] / moves / 1024:>18.1f} {round(t['blocks'] / moves):>12}")
+    for name, t in sorted(summary.items()):
+        print(f"Top allocation sites of {name} at the peak of its moves (KiB and blocks per move):")
+        for site, size, blocks in t['sites']:
+            print(f"\t{site:<40} {size / t['moves'] / 1024:>10.1f} {round(blocks / t['moves']):>8}")
+
+
+def set_search_stats(on):
+    """Turn search statistics on or off in this process (also used to initialize pool processes)."""
+    global SEARCH_STATS
+    SEARCH_STATS = on
+
+
+def get_player(ai, name, args):
+    """Return the AI player with the given name, loading it (or starting its worker) on first use."""
+    if name not in ai:
+        ai[name] = workers.PlayerWorker(name, args.timeout) if args.isolate else utils.load_player(name)
+    return ai[name]
+
+
+def play_in_pool(spec):
+    """Play one scheduled game in a pool process (each process imports each player once)."""
+    return (spec, *play_game(spec, [utils.load_player(name) for name in spec['players']]))
+
+
+def time_game(spec):
+    """Play one scheduled game and time it; returns (seconds, seconds inside the players, moves chosen)."""
+    ai = [utils.load_player(name) for name in spec['players']]
+    start = time.perf_counter()
+    _, moves = play_game(spec, ai)
+    return time.perf_counter() - start, sum(move[2] for move in moves), [move[1] for move in moves]
+
+
+def time_engine(spec, moves):
+    """Replay the moves of a game without its players, and return the seconds the engine took."""
+    board, rows, cols = initial_board(spec)
+    num_colors = max(board)
+    cards = [[0] * (num_colors - 1) for _ in range(2)]
+    banners = [[0] * (num_colors - 1) for _ in range(2)]
+    start = time.perf_counter()
+    board, cards, banners = utils.freeze(board, cards, banners)
+    turn = 0
+    for move in moves: # play_game asks for a move only while there are valid ones
+        if move in utils.get_valid_moves(board, rows, cols):
+            board, cards, banners = utils.apply_move(board, cols, move, turn, cards, banners)
+        turn = abs(turn - 1)
+    utils.get_valid_moves(board, rows, cols)
+    return time.perf_counter() - start
+
+
+def benchmark(players, games, colors, jobs, seed=None):
+    """Measure the throughput of the simulator for each board size and number of worker processes.
+
+    Parameters
+    ----------
+    players : list of str
+        The two AI players (fast ones, such as randy and greedy, measure the simulator itself).
+    games : int
+        Number of games per measurement.
+    colors : list of ints
+        Board sizes (numbers of color sets) to measure.
+    jobs : list of ints
+        Numbers of worker processes to measure (1 plays in this process).
+    seed : int, optional (default=None)
+        Seed of the schedules, the same for every number of workers.
+
+    Returns
+    -------
+    rows : list of dicts
+        For each board size and number of workers: num_colors, jobs, games, moves, seconds
+        (wall-clock), and the engine, player and other seconds summed over the games. The
+        engine (move generation and application) is timed by replaying each game's moves
+        without the players, after the wall-clock measurement; the players' seconds include
+        handing them the state (utils.call_player), and other is the rest of play_game.
+    """
+    rows = []
+    for num_colors in colors:
+        schedule = tournament.make_schedule([players], games, num_colors, None, seed, alternate=True)
+        for n in jobs:
+            pool = multiprocessing.Pool(n, set_search_stats, (False,)) if n > 1 else None
+            try:
+                if pool is not None: # start every process and import the players before timing
+                    pool.map(time_game, schedule[:1] * n, chunksize=1)
+                else:
+                    time_game(schedule[0])
+                start = time.perf_counter()
+                timings = pool.map(time_game, schedule) if pool is not None else [time_game(spec) for spec in schedule]
+                seconds = time.perf_counter() - start
+            finally:
+                if pool is not None:
+                    pool.terminate()
+            game_seconds = sum(timing[0] for timing in timings)
+            player_seconds = sum(timing[1] for timing in timings)
+            engine_seconds = sum(time_engine(spec, timing[2]) for spec, timing in zip(schedule, timings))
+            rows.append({'num_colors': num_colors, 'jobs': n, 'games': len(timings), 'moves': sum(len(timing[2]) for timing in timings),
+                         'seconds': seconds, 'engine_seconds': engine_seconds, 'player_seconds': player_seconds,
+                         'other_seconds': max(game_seconds - engine_seconds - player_seconds, 0.0)})
+    return rows
+
+
+def print_benchmark(rows):
+    """Print the results of benchmark."""
+    print(f"{'colors':>6} {'jobs':>4} {'games':>6} {'games/s':>9} {'moves/s':>10} {'engine us/move':>15} {'player us/move':>15} {'other us/move':>14} {'engine %':>9}")
+    for row in rows:
+        moves = max(row['moves'], 1)
+        busy = row['engine_seconds'] + row['player_seconds'] + row['other_seconds']
+        print(f"{row['num_colors']:>6} {row['jobs']:>4} {row['games']:>6} {row['games'] / row['seconds']:>9.1f} {row['moves'] / row['seconds']:>10.0f} "
+              f"{1e6 * row['engine_seconds'] / moves:>15.1f} {1e6 * row['player_seconds'] / moves:>15.1f} {1e6 * row['other_seconds'] / moves:>14.1f} "
+              f"{100 * row['engine_seconds'] / busy if busy else 0:>9.1f}")
+
+
+def play_games(specs, args, ai, cache, pool, coordinator):
+    """Play scheduled games, yielding (spec, banners, moves) as each one finishes.
+
+    Games found in the cache are not played again; their moves are reported as None.
+    """
+    todo = []
+    for spec in specs:
+        banners = cache.get(spec) if cache else None
+        if banners is None:
+            todo.append(spec)
+        else:
+            yield spec, banners, None
+
+    if coordinator is not None:
+        yield from coordinator.run(todo)
+    elif pool is not None:
+        yield from pool.imap_unordered(play_in_pool, todo)
+    else:
+        for spec in todo:
+            yield (spec, *play_game(spec, [get_player(ai, name, args) for name in spec['players']]))
+
+
+def run_worker(args):
+    """Play games for a remote coordinator until its tournament is over."""
+    set_search_stats(args.search_stats)
+    played = distributed.work(args.connect, args.authkey, play_in_pool)
+    print(f"Worker {multiprocessing.current_process().name} played {played} games")
+
+
+def main(args):
+    if args.list_players:
+        for name in registry.REGISTRY.names():
+            info = registry.REGISTRY.info(name)
+            capabilities = ', '.join(f"{key}={value}" for key, value in sorted(info['capabilities'].items()))
+            print(f"{name:<24} {info['hash'][:12]}  {capabilities}")
+        return
+    for address in (args.serve, args.connect):
+        if address and args.authkey is None and not distributed.is_local(address):
+            parser.error(f"--authkey is required to use {address}, which is not a loopback address")
+    if args.connect:
+        processes = [multiprocessing.Process(target=run_worker, args=(args,)) for _ in range(args.jobs)]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+        return
+    if args.benchmark:
+        players = [args.player1 or 'randy', args.player2 or 'greedy']
+        if not all(utils.load_player(name) for name in players):
+            sys.exit(1)
+        jobs = sorted({1, args.jobs} | {2 ** i for i in range(args.jobs.bit_length()) if 2 ** i < args.jobs})
+        print_benchmark(benchmark(players, args.games if args.games is not None else 1000, range(3, 9), jobs, args.seed))
+        return
+    if args.isolate and (args.jobs > 1 or args.serve):
+        parser.error("--isolate cannot be combined with --jobs or --serve")
+    if args.adaptive and not args.league:
+        parser.error("--adaptive requires --league")
+    if args.cache and args.seed is None:
+        parser.error("--cache requires --seed (without it every game gets a new random seed, so nothing is ever found in the cache)")
+    if (args.profile or args.memory) and (args.jobs > 1 or args.isolate or args.serve):
+        parser.error("--profile and --memory require the games to be played in this process (no --jobs, --isolate or --serve)")
+    if args.profile and args.memory:
+        parser.error("--profile and --memory distort each other's measurements; use one at a time")
+
+    # Resume from the checkpoint if there is one, otherwise schedule a new tournament
+    checkpoint = tournament.Checkpoint(args.checkpoint) if args.checkpoint else None
+    schedule, results = checkpoint.load() if checkpoint else (None, {})
+    if schedule is None:
+        if args.adaptive:
+            pairings = [] # games are scheduled batch by batch below
+        elif args.league:
+            pairings = tournament.round_robin(args.league)
+        elif args.player1 and args.player2:
+            pairings = [[args.player1, args.player2]]
+        else:
+            parser.error("either --player1 and --player2 or --league is required")
+        schedule = tournament.make_schedule(pairings, args.games if args.games is not None else 5, args.num_colors, args.board, args.seed, args.alternate)
+    else:
+        print(f"Resuming tournament from {args.checkpoint}: {len(results)} of {len(schedule)} games already played")
+    cache = tournament.ResultCache(args.cache) if args.cache else None
+    adaptive = None
+    if args.adaptive:
+        batch = args.batch if args.batch else 4 * args.jobs
+        adaptive = scheduler.AdaptiveScheduler(args.league, batch, args.precision, max_games=args.max_games,
+                                               num_colors=args.num_colors, board=args.board, seed=args.seed)
+
+    # AI players are loaded (in worker processes, if requested) the first time they are needed
+    ai = {}
+    store = results_db.ResultStore(args.db) if args.db else None
+    archive = records.RecordWriter(args.record, args.record_compression, append=bool(results)) if args.record else None # keep the games of a resumed run
+    coordinator = distributed.serve(args.serve, args.authkey, args.lease, args.worker_timeout) if args.serve else None
+    set_search_stats(args.search_stats)
+    pool = multiprocessing.Pool(args.jobs, set_search_stats, (args.search_stats,)) if args.jobs > 1 and coordinator is None else None
+    search_stats = {}
+    latencies = latency.LatencyReport(args.budget) if args.latency else None
+    global PROFILER, MEMORY
+    PROFILER = profiling.ChoiceProfiler(args.profile_out) if args.profile else None
+    MEMORY = profiling.MemoryProfiler(args.memory_out) if args.memory else None
+    memory = None
+    try:
+        pending = tournament.pending_games(schedule, results)
+        while True:
+            if not pending and adaptive is not None and not adaptive.done(results):
+                pending = adaptive.next_batch(schedule, results)
+            if not pending:
+                break
+            for spec, banners, moves in play_games(pending, args, ai, cache, pool, coordinator):
+                print(spec['game'])
+                if cache and moves is not None:
+                    cache.put(spec, banners)
+                print_result(spec['players'], banners)
+                results[spec['game']] = tournament.make_record(spec, banners)
+                if store and moves is not None: # cached games were stored by the run that played them
+                    store.add(results[spec['game']], moves)
+                if archive and moves is not None:
+                    archive.write(*initial_board(spec), [move[1] for move in moves])
+                for turn, _, _, stats, *_ in moves or []:
+                    if stats is not None:
+                        add_search_stats(search_stats, spec['players'][turn], stats)
+                if latencies and moves:
+                    add_latencies(latencies, spec['players'], moves)
+                if checkpoint:
+                    if store:
+                        store.flush() # never checkpoint a game the database does not have yet
+                    if archive:
+                        archive.flush() # nor one the record file does not have
+                    checkpoint.save(schedule, results)
+            pending = []
+    except TimeoutError as error: # the workers are gone; the checkpoint (if any) has every game they finished
+        print(f"ERROR: {error}")
+        sys.exit(1)
+    finally:
+        if store:
+            store.close()
+        if archive:
+            archive.close()
+        if coordinator is not None:
+            coordinator.close()
+        if pool is not None:
+            pool.terminate()
+        if args.isolate:
+            for worker in ai.values():
+                worker.close()
+        if PROFILER is not None:
+            for file in PROFILER.close():
+                print(f"Wrote {file}")
+        if MEMORY is not None:
+            memory = MEMORY.close()
+
+    if args.league or len({tuple(sorted(spec['players'])) for spec in schedule}) > 1:
+        names = sorted({name for spec in schedule for name in spec['players']})
+        ratings, _ = scheduler.fit_ratings(names, results)
+        print_standings(tournament.standings(results), ratings)
+    else:
+        names = schedule[0]['players'] if schedule else [args.player1, args.player2] # (game 0 is never swapped)
+        print_statistics(names, tournament.summarize(results), len(results))
+    if search_stats:
+        print_search_stats(search_stats)
+    if latencies:
+        print_latency(latencies)
+    if memory:
+        print_memory(memory)
+
+
+if __name__ == "__main__":
+    main(parser.parse_args())
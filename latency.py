@@ -0,0 +1,114 @@
+# latency.py
+# Decision latency statistics of "Hand of the King" AI players.
+#
+# Tail latency, not the average, is what gets a player disqualified, so the simulator
+# reports percentiles of the wall-clock and CPU time per move, by player and game phase,
+# and counts the moves over a time budget. Percentiles are estimated with a streaming
+# quantile sketch (log-spaced buckets with a fixed relative error, as in DDSketch), so
+# memory stays bounded however many moves are recorded, and sketches of different
+# processes or runs can be merged exactly.
+
+import math
+
+PHASES = ['opening', 'middlegame', 'endgame'] # thirds of the cards, by the number still on the board
+
+def format_seconds(value):
+    """Format a duration in the unit that shows its leading digits (e.g. '85 µs', '12.3 ms', '1.25 s')."""
+    if value == 0:
+        return '0'
+    if value < 1e-3:
+        return f"{value * 1e6:.0f} µs"
+    if value < 1:
+        return f"{value * 1e3:.1f} ms"
+    return f"{value:.2f} s"
+
+def phase(cards_left, total_cards):
+    """Return the game phase of a move from the cards still on the board (not counting the 1-card)."""
+    return PHASES[min(len(PHASES) - 1, (total_cards - cards_left) * len(PHASES) // max(total_cards, 1))]
+
+class QuantileSketch:
+    """Streaming quantile estimates of positive values with a bounded relative error.
+
+    Values are counted in buckets whose bounds grow geometrically, so every estimate is
+    within a factor (1 +- accuracy) of a value of the right rank. Values below min_value
+    share one bucket (and are estimated as 0). The count, sum and maximum are exact.
+
+    Parameters
+    ----------
+    accuracy : float, optional (default=0.01)
+        Relative accuracy of the quantile estimates.
+    min_value : float, optional (default=1e-6)
+        Smallest value distinguished from 0.
+    """
+    def __init__(self, accuracy=0.01, min_value=1e-6):
+        self.gamma = (1 + accuracy) / (1 - accuracy)
+        self.log_gamma = math.log(self.gamma)
+        self.min_value = min_value
+        self.buckets = {} # bucket index -> count
+        self.zeros = 0
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, value):
+        """Count one value."""
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+        if value < self.min_value:
+            self.zeros += 1
+        else:
+            i = math.ceil(math.log(value) / self.log_gamma)
+            self.buckets[i] = self.buckets.get(i, 0) + 1
+
+    def merge(self, other):
+        """Add the values counted by another sketch with the same accuracy."""
+        self.count += other.count
+        self.total += other.total
+        self.max = max(self.max, other.max)
+        self.zeros += other.zeros
+        for i, count in other.buckets.items():
+            self.buckets[i] = self.buckets.get(i, 0) + count
+
+    def quantile(self, q):
+        """Return an estimate of the q-quantile (0 <= q <= 1), or None if no values were counted."""
+        if not self.count:
+            return None
+        rank = q * (self.count - 1)
+        seen = self.zeros
+        if rank < seen:
+            return 0.0
+        for i in sorted(self.buckets):
+            seen += self.buckets[i]
+            if rank < seen:
+                return min(2 * self.gamma ** i / (self.gamma + 1), self.max)
+        return self.max
+
+class LatencyReport:
+    """Per-move decision times of each player, by game phase.
+
+    Parameters
+    ----------
+    budget : float, optional (default=5)
+        Seconds (wall-clock) a move may take; slower moves are counted.
+    """
+    def __init__(self, budget=5):
+        self.budget = budget
+        self.phases = {} # (player, phase) -> {'wall': sketch, 'cpu': sketch, 'over': count}
+
+    def add(self, player, phase, wall, cpu=None):
+        """Record one move (cpu is None if the player's CPU time is unknown)."""
+        for key in (player, phase), (player, 'all'):
+            entry = self.phases.get(key)
+            if entry is None:
+                entry = self.phases[key] = {'wall': QuantileSketch(), 'cpu': QuantileSketch(), 'over': 0}
+            entry['wall'].add(wall)
+            if cpu is not None:
+                entry['cpu'].add(cpu)
+            entry['over'] += wall > self.budget
+
+    def rows(self):
+        """Return (player, phase, entry) for every player and phase, players sorted, 'all' last."""
+        order = {name: i for i, name in enumerate(PHASES + ['all'])}
+        return [(player, phase, self.phases[player, phase])
+                for player, phase in sorted(self.phases, key=lambda key: (key[0], order[key[1]]))]
@@ -7,12 +7,24 @@
 import os
 import sys
 ROOT = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
-sys.path.append(ROOT)
+if ROOT not in sys.path: # players are imported once, but avoid growing sys.path if reloaded
+    sys.path.append(ROOT)
 import utils
+import json
 import math
 import copy
 import time
 
+SUPPORTS_READONLY = True # choice() never modifies its inputs (it thaws them into its own lists)
+SUPPORTS_SCORE = True # search() returns the chosen move together with its minimax utility
+SUPPORTS_STATS = True # when STATS is a dict, every search leaves its statistics in it
+DEPENDENCIES = ['math_nerds_final_weights.json'] # part of the player's hash (see registry.py), like this file
+
+# search settings (benchmarks change them; see engine_bench.py)
+TIME_LIMIT = 3 # seconds per move
+DEPTH = None # search depth; None picks one from the number of cards left
+STATS = None # set to a dict to collect search statistics into it (see new_stats); None costs nothing
+
 def choice(board, rows, cols, turn, cards=[], banners=[]):
     """Search for the best move based on the current game state.
      
@@ -38,22 +50,50 @@ def choice(board, rows, cols, turn, cards=[], banners=[]):
     which_card : int
         The linear index of the card to choose.
     """
+    return search(board, rows, cols, turn, cards, banners)[0]
+
+
+def search(board, rows, cols, turn, cards=[], banners=[], evaluator=None):
+    """Search for the best move and report how good the search thinks it is.
+
+    Takes the same parameters as choice, plus:
 
+    evaluator : function, optional (default=None)
+        Scores a list of game states at once (for the player in game[3]) in place of
+        evaluate. Sibling leaves are scored in one call (see value_net.py). It also
+        scores finished games, so their utilities are on the same scale as the rest.
+
+    Output
+    ------
+    which_card : int
+        The linear index of the card to choose.
+    utility : float
+        Minimax utility of that move for the player to move (None if time ran out
+        before any move was scored).
+    """
+
+    # the game may hand us read-only tuples, so make our own lists to simulate moves on
+    board, cards, banners = utils.thaw(board, cards, banners)
     # grab valid moves from utils function get_valid_moves(board, rows, cols):
     moves = utils.get_valid_moves(board, rows, cols)
     # send over everything, inlcuding list of valid moves to minimax
     initial_game = [board, rows, cols, turn, cards, banners]
     moves.sort(key=lambda m: -score_move(initial_game, m))
+    if STATS is not None:
+        STATS.clear()
+        STATS.update(new_stats())
     # send over everything, inlcuding list of valid moves to minimax
-    next_move = minimax(initial_game, moves)
+    next_move, utility = minimax(initial_game, moves, evaluator)
+    if STATS is not None:
+        finish_stats()
 
-    return next_move
+    return next_move, utility
     
 
 # board, rows, cols, turn, cards, banners, moves
-def minimax(initial_game, moves):
+def minimax(initial_game, moves, evaluator=None):
     # added time limit 
-    time_limit = 3
+    time_limit = TIME_LIMIT
     start_time = time.time()
     # initialize the "best" move and its utility right away    
     best_action = None
@@ -72,6 +112,12 @@ def minimax(initial_game, moves):
         depth = 7
     else:
         depth = 12
+    if DEPTH is not None:
+        depth = DEPTH
+    if STATS is not None:
+        STATS['depth'] = depth
+        STATS['root_moves'] = len(moves)
+        count_node(depth)
     
     # initialize alpha and beta
     alpha = -math.inf
@@ -84,9 +130,14 @@ def minimax(initial_game, moves):
     for move in moves:
         new_game = simulate_move(copy.deepcopy(beginning_game), move, beginning_game[3]) # simulate the new move
         if time.time() - start_time > time_limit:
+            if STATS is not None:
+                STATS['aborts'] += 1
             break
         # check if the new board is terminal, if so check who wins
-        if is_terminal_state(new_game):
+        terminal = is_terminal_state(new_game)
+        if terminal and evaluator is not None:
+            utility = evaluator([new_game])[0] # on the evaluator's scale, not 999 or the banner difference
+        elif terminal:
             # sum(game[board][turn]) --- your sum minus opponent sum
             score = sum(new_game[5][new_game[3]]) - sum(new_game[5][abs(new_game[3]-1)])
             if score > 0:
@@ -95,19 +146,24 @@ def minimax(initial_game, moves):
                 utility = score
 
         else:
-            utility = minvalue(new_game, alpha, beta, depth - 1, start_time)
+            utility = minvalue(new_game, alpha, beta, depth - 1, start_time, evaluator)
+        if STATS is not None:
+            STATS['root_moves_searched'] += 1
         
         if utility > best_utility:
             best_utility = utility
             best_action = move
+            if STATS is not None:
+                STATS['best_move'], STATS['best_utility'] = move, utility
     
     # resolves some errors
     if best_action == None:
         temp = utils.get_valid_moves(initial_game[0], initial_game[1], initial_game[2])
         best_action = temp[0]
-    return best_action
+        best_utility = None
+    return best_action, best_utility
 
-def minvalue(game, alpha, beta, max_search_depth, start_time):
+def minvalue(game, alpha, beta, max_search_depth, start_time, evaluator=None):
     '''Returns the minimum utility available from a given state in the tree.'''
     '''''
     if is_terminal_state(board, rows, cols, turn, cards, banners, moves): # or at desired depth and give it a value
@@ -125,56 +181,123 @@ def minvalue(game, alpha, beta, max_search_depth, start_time):
 
     
     '''
-    time_limit = 3
+    time_limit = TIME_LIMIT
+    if STATS is not None:
+        count_node(max_search_depth)
     game = copy.deepcopy(game)
     moves = utils.get_valid_moves(game[0], game[1], game[2])
     # refernce chatgpt at bottom
     moves.sort(key=lambda m: -score_move(game, m))
     if len(moves) == 0:
-        return evaluate(game)
+        if STATS is not None:
+            STATS['leaves'] += 1
+        return evaluate(game) if evaluator is None else evaluator([game])[0]
 
     # now check if the desired depth of search is found -- decrement this for every call
     if max_search_depth == 0:
-        return evaluate(game)
-    
+        if STATS is not None:
+            STATS['leaves'] += 1
+        return evaluate(game) if evaluator is None else evaluator([game])[0]
+
+    # every child is a leaf, so a batched evaluator scores them all at once
+    if max_search_depth == 1 and evaluator is not None:
+        if STATS is not None:
+            count_node(0, len(moves))
+            STATS['leaves'] += len(moves)
+        return min(evaluator([simulate_move(game, move, abs(game[3]-1)) for move in moves]))
+
     u = math.inf
     for move in moves:
         if time.time() - start_time > time_limit:
+            if STATS is not None:
+                STATS['aborts'] += 1
             break
         new_game = simulate_move(game, move, abs(game[3]-1))
-        u = min(u, maxvalue(new_game, alpha, beta, max_search_depth - 1, start_time))
+        u = min(u, maxvalue(new_game, alpha, beta, max_search_depth - 1, start_time, evaluator))
         beta = min(beta, u)
         if alpha >= beta:
+            if STATS is not None:
+                STATS['cutoffs'] += 1
+                STATS['first_move_cutoffs'] += move == moves[0]
             break
 
     return u
 
-def maxvalue(game, alpha, beta, max_search_depth, start_time):
+def maxvalue(game, alpha, beta, max_search_depth, start_time, evaluator=None):
     '''Returns the minimum utility available from a given state in the tree.'''
-    time_limit = 3
+    time_limit = TIME_LIMIT
+    if STATS is not None:
+        count_node(max_search_depth)
     game = copy.deepcopy(game)
     moves = utils.get_valid_moves(game[0], game[1], game[2])
     moves.sort(key=lambda m: -score_move(game, m))
 
     if len(moves) == 0:
-        return evaluate(game)
+        if STATS is not None:
+            STATS['leaves'] += 1
+        return evaluate(game) if evaluator is None else evaluator([game])[0]
     
     # now check if the desired depth of search is found -- decrement this for every call
     if max_search_depth == 0:
-        return evaluate(game)
-    
+        if STATS is not None:
+            STATS['leaves'] += 1
+        return evaluate(game) if evaluator is None else evaluator([game])[0]
+
+    # every child is a leaf, so a batched evaluator scores them all at once
+    if max_search_depth == 1 and evaluator is not None:
+        if STATS is not None:
+            count_node(0, len(moves))
+            STATS['leaves'] += len(moves)
+        return max(evaluator([simulate_move(game, move, game[3]) for move in moves]))
+
     u = -math.inf
     for move in moves:
         if time.time() - start_time > time_limit:
+            if STATS is not None:
+                STATS['aborts'] += 1
             break
         new_game = simulate_move(game, move, game[3])
-        u = max(u, minvalue(new_game, alpha, beta, max_search_depth - 1, start_time))
+        u = max(u, minvalue(new_game, alpha, beta, max_search_depth - 1, start_time, evaluator))
         alpha = max(alpha, u)
         if alpha >= beta:
+            if STATS is not None:
+                STATS['cutoffs'] += 1
+                STATS['first_move_cutoffs'] += move == moves[0]
             break
 
     return u
 
+def new_stats():
+    """Return empty search statistics.
+
+    nodes and nodes_per_ply count the positions visited (ply 0 is the root), leaves the
+    positions evaluated, cutoffs the alpha-beta cutoffs (first_move_cutoffs the ones on
+    the first move tried, a measure of move ordering), and aborts the nodes whose search
+    was cut short by the time limit. This player has no transposition table, so its
+    tt_probes and tt_hits stay 0. depth, root_moves, root_moves_searched, completed_depth,
+    and ebf (effective branching factor) are filled in by the search and finish_stats.
+    best_move and best_utility are the best root move found so far (updated during the
+    search, so a GUI can show them while the player is thinking).
+    """
+    return {'nodes': 0, 'nodes_per_ply': [], 'leaves': 0, 'cutoffs': 0, 'first_move_cutoffs': 0, 'aborts': 0,
+            'tt_probes': 0, 'tt_hits': 0, 'depth': 0, 'root_moves': 0, 'root_moves_searched': 0,
+            'completed_depth': None, 'ebf': None, 'best_move': None, 'best_utility': None}
+
+def count_node(max_search_depth, n=1):
+    """Count n nodes at the ply with max_search_depth plies left (only called if STATS is set)."""
+    per_ply = STATS['nodes_per_ply']
+    ply = STATS['depth'] - max_search_depth
+    while len(per_ply) <= ply:
+        per_ply.append(0)
+    per_ply[ply] += n
+    STATS['nodes'] += n
+
+def finish_stats():
+    """Fill in the statistics that summarize a whole search."""
+    per_ply = STATS['nodes_per_ply']
+    STATS['completed_depth'] = STATS['depth'] if STATS['aborts'] == 0 else None # None if time ran out
+    STATS['ebf'] = per_ply[-1] ** (1 / (len(per_ply) - 1)) if len(per_ply) > 1 else None
+
 # checks if a given board is terminal
 def is_terminal_state(game):
     return utils.get_valid_moves(game[0], game[1], game[2]) == []
@@ -201,13 +324,13 @@ def simulate_move(game, move, player):
 
     # find out if new move is above, below, left, or right of current location
     above = below = left = right = False
-    if (move < current_location and move % 6 == current_location % 6):
+    if (move < current_location and move % cols == current_location % cols):
         above = True
-    elif (move < current_location and move % 6 != current_location % 6):
+    elif (move < current_location and move % cols != current_location % cols):
         left = True
-    elif (move > current_location and move % 6 != current_location % 6):
+    elif (move > current_location and move % cols != current_location % cols):
         right = True
-    elif (move > current_location and move % 6 == current_location % 6):
+    elif (move > current_location and move % cols == current_location % cols):
         below = True
 
     if above:
@@ -253,7 +376,28 @@ def simulate_move(game, move, player):
     new_game[0] = new_board
     return new_game
 
-def evaluate(game):
+# evaluation features, all from the point of view of the player whose turn it is in game[3]
+FEATURES = ['banners', 'open_banners', 'guaranteed_banners',
+            *[f'cards_{color}' for color in range(2, 9)],
+            *[f'open_cards_{color}' for color in range(2, 9)],
+            'endgame_banners']
+# the original hand-picked weights
+DEFAULT_WEIGHTS = [2, 1, 4, *[8 / size for size in range(2, 9)], *[1] * 7, 8]
+# weights fitted by texel.py (if the file exists, it overrides the defaults feature by feature)
+WEIGHTS_FILE = os.path.join(os.path.dirname(os.path.realpath(__file__)), 'math_nerds_final_weights.json')
+
+def load_weights(file=WEIGHTS_FILE):
+    """Return the evaluation weights, in the order of FEATURES."""
+    weights = dict(zip(FEATURES, DEFAULT_WEIGHTS))
+    if os.path.exists(file):
+        with open(file, "r") as f:
+            weights.update(json.load(f)['weights'])
+    return [weights[name] for name in FEATURES]
+
+WEIGHTS = load_weights()
+
+def features(game):
+    """Return the evaluation features of a game state (see FEATURES)."""
     # ideas for total
     # sum of your banners - sum of opponent banners
     # + number of banners you could still get?
@@ -261,62 +405,65 @@ def evaluate(game):
     # something with total number of cards you own?
     # + your cards - their cards, but maybe only for colors that arent guaranteed
     # give more importance to lower numbers because they are easier to get
-    total = 0
-
-    your_banners = sum(game[5][game[3]])
-    opponent_banners = sum(game[5][abs(game[3]-1)])
-    
-    total += (your_banners * 2)
-    total -= (opponent_banners * 2)
+    your_cards = game[4][game[3]]
+    opponent_cards = game[4][abs(game[3]-1)]
+    banners = sum(game[5][game[3]]) - sum(game[5][abs(game[3]-1)])
 
     # check which banners are still obtainable based on number of remaining cards, enemy cards, and your cards
     # a banner is no longer obtainable if: someone owns at least ceil( (card num + 1)/2 )
     # aka own MORE than half
-    guaranteed_wins = 0
-    guaranteed_losses = 0
-    guaranteed_banners = [0,0,0,0,0,0,0]
-    for i in range(len(game[4][0])): # loop over length of cards
-        if (game[4][game[3]][i]) >= math.ceil((i+3)/2): # if your card pile owns more than half of that type, += 1
-            guaranteed_wins += 1
-            guaranteed_banners[i] = 1
-    for i in range(len(game[4][0])):
-        if (game[4][abs(game[3]-1)][i]) >= math.ceil((i+3)/2): # if opponent card pile owns more than half of that type, -= 1
-            guaranteed_losses += 1
-            guaranteed_banners[i] = 1
-
-    total += (7 - sum(guaranteed_banners)) # banners you could still get
-
-    # what if we weight guaranteed banners more
-    # 4 doesnt seem bad, no idea if there's a better value
-    total += (guaranteed_wins * 4)
-    total -= (guaranteed_losses * 4)
-
-    # taking the card total and adding weights to each differnt kind of cards
-    # and adding another part that goes over gauruanteed baneers that values
-    card_totals = [2, 3, 4, 5, 6, 7, 8]
-    for i in range(7):
-        # get the weight calculation
-        weight = 8 / card_totals[i]
-        total += game[4][game[3]][i] * weight
-        total -= game[4][abs(game[3]-1)][i] * weight
-        # check if banner at that index is not gauruanteed
-        if guaranteed_banners[i] == 0:
-            difference = game[4][game[3]][i] - game[4][abs(game[3]-1)][i]
-            total += difference
-
-    # make an endgmae banner grab, try to gai as many banners at end
-    cards_left = 36
-    for spot in game[0]:
-        if spot == 0:
-            cards_left -= 1
-    # this weighs having more banners way more
-    if cards_left < 15:
-        total += (your_banners - opponent_banners) * 8
-            # this really heavily weighs winning, need 4 or more banners to win
-        #if guaranteed_wins >= 4:
-            #total += guaranteed_wins * 10
+    guaranteed = 0
+    open_banners = len(your_cards)
+    # taking the card total for each different kind of card (lower numbers are weighted
+    # more because they are easier to get), and again for the banners that are not guaranteed
+    cards = [0] * 7
+    open_cards = [0] * 7
+    for i in range(len(your_cards)):
+        cards[i] = your_cards[i] - opponent_cards[i]
+        won = your_cards[i] >= math.ceil((i+3)/2)
+        lost = opponent_cards[i] >= math.ceil((i+3)/2)
+        guaranteed += won - lost
+        if won or lost:
+            open_banners -= 1
+        else:
+            open_cards[i] = cards[i]
 
+    # make an endgame banner grab, try to gain as many banners at end
+    cards_left = sum(1 for spot in game[0] if spot != 0)
+    endgame = banners if cards_left < 15 else 0
 
+    return [banners, open_banners, guaranteed, *cards, *open_cards, endgame]
+
+def evaluate(game):
+    """Score a game state for the player whose turn it is in game[3] (features times WEIGHTS).
+
+    The terms are added in the order of the original hand-written evaluation (floating
+    point sums depend on the order), so the default weights reproduce its scores exactly.
+    """
+    banner_weight, open_banner_weight, guaranteed_weight = WEIGHTS[:3]
+    card_weights, open_card_weights, endgame_weight = WEIGHTS[3:10], WEIGHTS[10:17], WEIGHTS[17]
+    your_cards = game[4][game[3]]
+    opponent_cards = game[4][abs(game[3]-1)]
+    your_banners = sum(game[5][game[3]])
+    opponent_banners = sum(game[5][abs(game[3]-1)])
+
+    total = 0
+    total += your_banners * banner_weight
+    total -= opponent_banners * banner_weight
+    won = [your_cards[i] >= math.ceil((i+3)/2) for i in range(len(your_cards))]
+    lost = [opponent_cards[i] >= math.ceil((i+3)/2) for i in range(len(your_cards))]
+    decided = [w or l for w, l in zip(won, lost)]
+    total += (len(your_cards) - sum(decided)) * open_banner_weight
+    total += sum(won) * guaranteed_weight
+    total -= sum(lost) * guaranteed_weight
+    for i in range(len(your_cards)):
+        total += your_cards[i] * card_weights[i]
+        total -= opponent_cards[i] * card_weights[i]
+        if not decided[i]:
+            total += (your_cards[i] - opponent_cards[i]) * open_card_weights[i]
+    cards_left = sum(1 for spot in game[0] if spot != 0)
+    if cards_left < 15:
+        total += (your_banners - opponent_banners) * endgame_weight
     return total
 
 
@@ -0,0 +1,39 @@
+# MOB's AI player, with a learned evaluation
+# the same minimax search as math_nerds_final, but the leaves are scored by the value
+# network in value_net.py, one batch of siblings at a time
+
+# the network is trained offline with "python value_net.py train" and loaded once, here
+
+import os
+import sys
+ROOT = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+if ROOT not in sys.path: # players are imported once, but avoid growing sys.path if reloaded
+    sys.path.append(ROOT)
+import math_nerds_final
+import value_net
+
+SUPPORTS_READONLY = True # choice() never modifies its inputs (math_nerds_final thaws them)
+SUPPORTS_SCORE = True # search() returns the chosen move together with its minimax utility
+# the search, its weights, and the network are part of this player (see registry.py)
+DEPENDENCIES = ['math_nerds_final.py', 'math_nerds_final_weights.json', 'value_net.py', 'math_nerds_net.npz']
+
+WEIGHTS_FILE = os.path.join(os.path.dirname(os.path.realpath(__file__)), 'math_nerds_net.npz')
+if not os.path.exists(WEIGHTS_FILE):
+    raise ImportError(f"No value network at {WEIGHTS_FILE} (train one with: python value_net.py train DATASET)")
+NET = value_net.ValueNet.load(WEIGHTS_FILE)
+
+def choice(board, rows, cols, turn, cards=[], banners=[]):
+    """Search for the best move based on the current game state.
+
+    Takes the same parameters as math_nerds_final.choice.
+
+    Output
+    ------
+    which_card : int
+        The linear index of the card to choose.
+    """
+    return search(board, rows, cols, turn, cards, banners)[0]
+
+def search(board, rows, cols, turn, cards=[], banners=[]):
+    """Search for the best move and return it with its minimax utility (see math_nerds_final.search)."""
+    return math_nerds_final.search(board, rows, cols, turn, cards, banners, NET.evaluate_games)
@@ -0,0 +1,190 @@
+# perft.py
+# Move generation benchmark and correctness tool for "Hand of the King".
+#
+# perft walks the complete game tree from a position to a fixed depth and counts the
+# nodes at every depth, applying every move (so it exercises both utils.get_valid_moves
+# and the capture logic). The counts of the reference positions in SUITE (one or more
+# for every board size from 3 to 8 colors) were computed with the reference backend, so
+# any change to the move generation or capture rules that alters them is a bug. Other
+# backends (see BACKENDS) can be checked against the reference node for node.
+#
+# Usage:
+#   python perft.py --suite
+#   python perft.py --num_colors 8 --seed 1 --depth 5
+#   python perft.py --board board.txt --depth 4 --check math_nerds_final
+
+import argparse
+import random
+import sys
+import time
+import utils
+
+def reference_children(board, rows, cols, turn, cards, banners):
+    """Return (move, board, cards, banners) for every move, using utils (the reference)."""
+    return [(move, *utils.apply_move(board, cols, move, turn, cards, banners))
+            for move in utils.get_valid_moves(board, rows, cols)]
+
+def math_nerds_children(board, rows, cols, turn, cards, banners):
+    """Return (move, board, cards, banners) for every move, using math_nerds_final.simulate_move."""
+    import math_nerds_final
+    game = [list(board), rows, cols, turn, [list(c) for c in cards], [list(b) for b in banners]]
+    return [(move, *utils.freeze(*[math_nerds_final.simulate_move(game, move, turn)[i] for i in (0, 4, 5)]))
+            for move in utils.get_valid_moves(game[0], rows, cols)]
+
+BACKENDS = {
+    'utils': reference_children,
+    'math_nerds_final': math_nerds_children,
+}
+
+# reference positions (shuffle_cards boards): (name, board rows, expected node counts at depths 1, 2, ...)
+SUITE = [
+    ('3 colors, seed 1', [[2, 3, 3], [1, 3, 2]],
+     [3, 5, 7, 11, 6]),
+    ('3 colors, seed 2', [[2, 3, 2], [3, 3, 1]],
+     [2, 3, 6, 6, 4]),
+    ('4 colors, seed 1', [[4, 4, 4, 4, 3], [3, 1, 3, 2, 2]],
+     [4, 11, 23, 41, 67, 84, 79, 45, 12]),
+    ('4 colors, seed 2', [[3, 4, 3, 3, 4], [4, 2, 4, 2, 1]],
+     [3, 7, 15, 31, 57, 85, 83, 44, 9]),
+    ('5 colors, seed 1', [[5, 5, 1, 5, 4], [3, 3, 4, 4, 5], [3, 2, 5, 4, 2]],
+     [5, 18, 64, 233, 766, 2234, 5773, 12975, 24877]),
+    ('5 colors, seed 2', [[4, 3, 4, 5, 5], [4, 4, 3, 2, 3], [5, 2, 1, 5, 5]],
+     [5, 19, 65, 219, 699, 2013, 5195, 11830, 23035]),
+    ('6 colors, seed 1', [[6, 6, 6, 5, 3, 4, 1], [5, 2, 6, 4, 5, 5, 4], [5, 6, 3, 4, 2, 6, 3]],
+     [6, 29, 143, 738, 3698, 17158]),
+    ('6 colors, seed 2', [[5, 6, 4, 4, 5, 5, 6], [4, 6, 6, 1, 5, 3, 6], [3, 4, 3, 5, 6, 2, 2]],
+     [7, 40, 200, 922, 4078, 17404]),
+    ('7 colors, seed 1', [[7, 7, 5, 5, 7, 2, 3], [7, 6, 5, 4, 6, 6, 1], [4, 7, 4, 5, 6, 5, 6], [3, 4, 2, 7, 7, 6, 3]],
+     [7, 44, 257, 1458, 8025, 42440]),
+    ('7 colors, seed 2', [[3, 6, 6, 6, 1, 7, 3], [4, 5, 6, 6, 7, 5, 6], [5, 5, 7, 7, 4, 4, 4], [7, 3, 5, 7, 2, 2, 7]],
+     [7, 42, 229, 1213, 6238, 30523]),
+    ('8 colors, seed 1', [[8, 7, 2, 8, 6, 7], [7, 6, 8, 5, 5, 6], [3, 2, 4, 8, 8, 8], [7, 5, 7, 1, 8, 3], [4, 7, 5, 6, 6, 5], [7, 8, 4, 6, 3, 4]],
+     [7, 55, 417, 3035, 21286]),
+    ('8 colors, seed 2', [[6, 7, 8, 8, 6, 8], [2, 6, 7, 8, 1, 3], [5, 4, 8, 5, 6, 5], [5, 8, 6, 2, 7, 4], [6, 4, 4, 7, 7, 7], [8, 5, 7, 8, 3, 3]],
+     [9, 69, 496, 3462, 23645]),
+]
+
+def start_state(board):
+    """Return the state (board, cards, banners) at the start of a game, as frozen tuples."""
+    num_colors = max(board)
+    return utils.freeze(board, [[0] * (num_colors - 1)] * 2, [[0] * (num_colors - 1)] * 2)
+
+def perft(board, rows, cols, depth, backend=reference_children):
+    """Count the nodes of the game tree at every depth.
+
+    Parameters
+    ----------
+    board : list of ints
+        The (flattened) starting board; player 1 moves first.
+    rows : int
+        Number of rows on the board.
+    cols : int
+        Number of columns on the board.
+    depth : int
+        Number of moves to look ahead.
+    backend : function, optional (default=reference_children)
+        Move generator (see BACKENDS).
+
+    Returns
+    -------
+    counts : list of ints
+        counts[d - 1] is the number of positions reached after exactly d moves. Games
+        that end earlier do not contribute to the deeper counts.
+    """
+    counts = [0] * depth
+
+    def walk(board, turn, cards, banners, ply):
+        children = backend(board, rows, cols, turn, cards, banners)
+        counts[ply] += len(children)
+        if ply + 1 < depth:
+            for _, board, cards, banners in children:
+                walk(board, 1 - turn, cards, banners, ply + 1)
+
+    if depth > 0:
+        board, cards, banners = start_state(board)
+        walk(board, 0, cards, banners, 0)
+    return counts
+
+def cross_check(board, rows, cols, depth, backend, reference=reference_children):
+    """Compare the children of every node generated by a backend with the reference.
+
+    Returns
+    -------
+    nodes : int
+        Number of nodes compared.
+    mismatch : tuple or None
+        (moves leading to the first differing node, reference children, backend
+        children), or None if the backends agree everywhere.
+    """
+    nodes = 0
+    board, cards, banners = start_state(board)
+    stack = [(board, 0, cards, banners, [])]
+    while stack:
+        board, turn, cards, banners, path = stack.pop()
+        expected = sorted(reference(board, rows, cols, turn, cards, banners))
+        actual = sorted(backend(board, rows, cols, turn, cards, banners))
+        nodes += 1
+        if expected != actual:
+            return nodes, (path, expected, actual)
+        if len(path) + 1 < depth:
+            stack.extend((board, 1 - turn, cards, banners, path + [move]) for move, board, cards, banners in expected)
+    return nodes, None
+
+def run(board, rows, cols, depth, backend, expected=None):
+    """Run perft to increasing depths, printing the counts and speed; returns True if they match expected."""
+    ok = True
+    for d in range(1, depth + 1):
+        start = time.perf_counter()
+        counts = perft(board, rows, cols, d, backend)
+        seconds = time.perf_counter() - start
+        nodes = sum(counts)
+        status = ''
+        if expected is not None:
+            status = 'ok' if expected[d - 1] == counts[-1] else f'FAIL (expected {expected[d - 1]})'
+            ok = ok and status == 'ok'
+        print(f"\tdepth {d:>2} {counts[-1]:>12} nodes {round(nodes / seconds) if seconds else 0:>10} nodes/s {status}")
+    return ok
+
+parser = argparse.ArgumentParser(description="Count (and time) the game tree of Hand of the King to a fixed depth")
+parser.add_argument('--board', type=str, help="Starting board setup file", default=None)
+parser.add_argument('--num_colors', type=int, help="Number of color sets of a shuffled board (default=8)", default=8)
+parser.add_argument('--seed', type=int, help="Random seed for the shuffled board", default=None)
+parser.add_argument('--depth', type=int, help="Number of moves to look ahead (default=4)", default=4)
+parser.add_argument('--suite', action='store_true', help="Run the reference positions and check their counts")
+parser.add_argument('--backend', choices=BACKENDS, help="Move generator to run (default=utils)", default='utils')
+parser.add_argument('--check', choices=BACKENDS, help="Compare this backend with the reference node for node", default=None)
+
+def main(args):
+    backend = BACKENDS[args.backend]
+    if args.suite:
+        failed = 0
+        for name, board_rows, expected in SUITE:
+            board = [square for row in board_rows for square in row]
+            rows, cols = len(board_rows), len(board_rows[0])
+            print(f"{name} ({rows}x{cols})")
+            failed += not run(board, rows, cols, len(expected), backend, expected)
+        print(f"{len(SUITE) - failed} of {len(SUITE)} positions passed")
+        sys.exit(1 if failed else 0)
+
+    if args.board:
+        board, rows, cols = utils.load_cards(args.board)
+    else:
+        random.seed(args.seed)
+        board, rows, cols = utils.shuffle_cards(args.num_colors)
+    utils.print_board(board, rows, cols)
+    if args.check:
+        start = time.perf_counter()
+        nodes, mismatch = cross_check(board, rows, cols, args.depth, BACKENDS[args.check])
+        print(f"Compared {nodes} nodes in {round(time.perf_counter() - start, 2)} s")
+        if mismatch:
+            path, expected, actual = mismatch
+            print(f"{args.check} differs from the reference after moves {path}")
+            print(f"\treference: {expected}")
+            print(f"\t{args.check}: {actual}")
+            sys.exit(1)
+        print(f"{args.check} matches the reference")
+        return
+    run(board, rows, cols, args.depth, backend)
+
+if __name__ == "__main__":
+    main(parser.parse_args())
@@ -0,0 +1,47 @@
+# greedy.py
+# Reference AI player for "Hand of the King": the best move one ply ahead.
+#
+# Greedy plays the move that leaves it with the most banners over its opponent, then
+# the most cards, looking no further than its own move. It is a fast but non-trivial
+# opponent for testing other players, and with randy.py a reference player for
+# benchmarking the simulator (see hotk_simulation.py --benchmark).
+
+import os
+import sys
+ROOT = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+if ROOT not in sys.path:
+    sys.path.append(ROOT)
+import utils
+
+SUPPORTS_READONLY = True # choice() never modifies its inputs
+
+def choice(board, rows, cols, turn, cards=[], banners=[]):
+    """Choose the move that maximizes the banner lead, then the cards owned, after it.
+
+    Parameters
+    ----------
+    board : list of ints
+        A flattened list of color indices for each card in the game.
+    rows : int
+        Number of rows on the board.
+    cols : int
+        Number of columns on the board.
+    turn : int {0, 1}
+        An integer that shows which player is the AI.
+    cards : list of lists of ints, optional (default=[])
+        How many cards does each player own? The syntax cards[i][j] = k
+        indicates that the ith player owns k cards of the jth color set.
+    banners : list of lists of ints, optional (default=[])
+        Which banners does each player own? The syntax banners[i][j] = 1
+        indicates that the ith player owns the banner of the jth color set.
+
+    Output
+    ------
+    which_card : int
+        The linear index of the card to choose (the first of equally good moves).
+    """
+    def value(move):
+        _, new_cards, new_banners = utils.apply_move(board, cols, move, turn, cards, banners)
+        return sum(new_banners[turn]) - sum(new_banners[1 - turn]), sum(new_cards[turn])
+
+    return max(utils.get_valid_moves(board, rows, cols), key=value)
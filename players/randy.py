@@ -0,0 +1,44 @@
+# randy.py
+# Reference AI player for "Hand of the King": a random valid move.
+#
+# Randy is as fast as a player can be, so games between reference players measure the
+# game engine and the simulator themselves (see hotk_simulation.py --benchmark). It
+# draws from the global random number generator, which the simulator seeds for every
+# game, so its games are repeatable.
+
+import os
+import sys
+ROOT = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+if ROOT not in sys.path:
+    sys.path.append(ROOT)
+import random
+import utils
+
+SUPPORTS_READONLY = True # choice() never modifies its inputs
+
+def choice(board, rows, cols, turn, cards=[], banners=[]):
+    """Choose a valid move at random.
+
+    Parameters
+    ----------
+    board : list of ints
+        A flattened list of color indices for each card in the game.
+    rows : int
+        Number of rows on the board.
+    cols : int
+        Number of columns on the board.
+    turn : int {0, 1}
+        An integer that shows which player is the AI.
+    cards : list of lists of ints, optional (default=[])
+        How many cards does each player own? The syntax cards[i][j] = k
+        indicates that the ith player owns k cards of the jth color set.
+    banners : list of lists of ints, optional (default=[])
+        Which banners does each player own? The syntax banners[i][j] = 1
+        indicates that the ith player owns the banner of the jth color set.
+
+    Output
+    ------
+    which_card : int
+        The linear index of the card to choose.
+    """
+    return random.choice(utils.get_valid_moves(board, rows, cols))
@@ -0,0 +1,216 @@
+# position_index.py
+# Position database over archived "Hand of the King" games.
+#
+# The index maps every position (board, turn, cards, banners) reached in a record file
+# (see records.py), keyed by its canonical packed form (see codec.py), to the games and
+# plies where it occurred, together with the final result of each of those games. Keys
+# are exact, so there are no collisions. The index is built in one streaming pass with an
+# external sort, so memory use stays bounded no matter how many games are archived.
+#
+# The index file is memory-mapped and never loaded into RAM. After a header with the
+# number of keys and postings, it holds two arrays of fixed-width records:
+#   keys      each distinct position once, sorted, with the offset and number of its
+#             postings (binary-searched: a lookup reads O(log n) keys)
+#   postings  (game, ply, result) of every occurrence, grouped by key in key order
+# so a position reached in many games costs one key and a few bytes per occurrence.
+#
+# Usage:
+#   python position_index.py build games.rec games.idx
+#   python position_index.py query games.idx games.rec GAME PLY
+
+import argparse
+import codec
+import heapq
+import mmap
+import os
+import records
+import shutil
+import struct
+import tempfile
+
+ENTRY = struct.Struct(f'>{codec.WIDTH}sIBB') # packed position, game id, ply, result (in the sorted runs)
+HEADER = struct.Struct('>8sQQ') # magic, number of keys, number of postings
+KEY = struct.Struct(f'>{codec.WIDTH}sQI') # packed position, offset and number of its postings
+POSTING = struct.Struct('>IBB') # game id, ply, result
+MAGIC = b'HOTKPIX2'
+RESULTS = ['player 1 wins', 'player 2 wins', 'tie']
+
+def game_entries(game, board, rows, cols, moves):
+    """Return the index entries (key, game, ply, result) of every position in one game."""
+    states = list(records.replay(board, rows, cols, moves))
+    banners = states[-1][-1]
+    score1, score2 = sum(banners[0]), sum(banners[1])
+    result = 0 if score1 > score2 else 1 if score2 > score1 else 2
+    return [(codec.pack_bytes(board, rows, cols, turn, cards, banners), game, ply, result)
+            for ply, turn, _, board, cards, banners in states]
+
+def _write_run(entries, folder):
+    """Sort a batch of entries and write it to a temporary run file."""
+    entries.sort()
+    fd, file = tempfile.mkstemp(dir=folder, suffix='.run')
+    with os.fdopen(fd, "wb") as f:
+        f.write(b''.join(ENTRY.pack(*entry) for entry in entries))
+    return file
+
+def _read_run(file, chunk=1 << 16):
+    """Stream the entries of a run file."""
+    with open(file, "rb") as f:
+        while True:
+            data = f.read(chunk * ENTRY.size)
+            if not data:
+                break
+            yield from ENTRY.iter_unpack(data)
+
+def build(record_file, index_file, run_size=1 << 20):
+    """Build the position index of a record file.
+
+    Parameters
+    ----------
+    record_file : str
+        Game record file (see records.py).
+    index_file : str
+        Output index filename.
+    run_size : int, optional (default=1048576)
+        Number of entries sorted in memory at a time.
+
+    Returns
+    -------
+    count : int
+        Number of postings (positions reached, counting repeats) in the index.
+    keys : int
+        Number of distinct positions in the index.
+    """
+    folder = os.path.dirname(os.path.abspath(index_file))
+    runs = []
+    entries = []
+    postings = None
+    try:
+        with records.RecordReader(record_file) as reader:
+            for game, (board, rows, cols, moves) in enumerate(reader):
+                entries.extend(game_entries(game, board, rows, cols, moves))
+                if len(entries) >= run_size:
+                    runs.append(_write_run(entries, folder))
+                    entries = []
+        runs.append(_write_run(entries, folder))
+
+        # Keys go straight to the index file, postings to a temporary file appended after them
+        count = keys = 0
+        fd, postings = tempfile.mkstemp(dir=folder, suffix='.postings')
+        with open(index_file, "wb") as f, os.fdopen(fd, "w+b") as p:
+            f.write(HEADER.pack(MAGIC, 0, 0))
+            key_buffer, posting_buffer = [], []
+            key, start = None, 0
+            for packed, game, ply, result in heapq.merge(*[_read_run(run) for run in runs]):
+                if packed != key:
+                    if key is not None:
+                        key_buffer.append(KEY.pack(key, start, count - start))
+                        keys += 1
+                    key, start = packed, count
+                posting_buffer.append(POSTING.pack(game, ply, result))
+                count += 1
+                if len(posting_buffer) >= 1 << 16:
+                    p.write(b''.join(posting_buffer))
+                    f.write(b''.join(key_buffer))
+                    key_buffer, posting_buffer = [], []
+            if key is not None:
+                key_buffer.append(KEY.pack(key, start, count - start))
+                keys += 1
+            p.write(b''.join(posting_buffer))
+            f.write(b''.join(key_buffer))
+            p.seek(0)
+            shutil.copyfileobj(p, f)
+            f.seek(0)
+            f.write(HEADER.pack(MAGIC, keys, count))
+    finally:
+        for run in runs:
+            os.remove(run)
+        if postings is not None:
+            os.remove(postings)
+    return count, keys
+
+class PositionIndex:
+    """Memory-mapped, binary-searched position index.
+
+    Parameters
+    ----------
+    file : str
+        Index file written by build.
+    """
+    def __init__(self, file):
+        self.f = open(file, "rb")
+        self.data = mmap.mmap(self.f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.keys, self.count = HEADER.unpack_from(self.data)
+        if magic != MAGIC:
+            self.close()
+            raise ValueError(f"{file} is not a position index (rebuild it with: python position_index.py build)")
+        self.postings = HEADER.size + self.keys * KEY.size # start of the postings array
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        return self.count
+
+    def lookup(self, key):
+        """Return the (game, ply, result) of every occurrence of a packed position (bytes or int)."""
+        target = key.to_bytes(codec.WIDTH, 'big') if isinstance(key, int) else key
+        lo, hi = 0, self.keys
+        while lo < hi: # find the first key that is >= target
+            mid = (lo + hi) // 2
+            offset = HEADER.size + mid * KEY.size
+            if self.data[offset:offset + codec.WIDTH] < target:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo == self.keys:
+            return []
+        found, start, count = KEY.unpack_from(self.data, HEADER.size + lo * KEY.size)
+        if found != target:
+            return []
+        offset = self.postings + start * POSTING.size
+        return list(POSTING.iter_unpack(self.data[offset:offset + count * POSTING.size]))
+
+    def lookup_state(self, board, rows, cols, turn, cards, banners):
+        """Return the (game, ply, result) of every occurrence of a game state."""
+        return self.lookup(codec.pack_bytes(board, rows, cols, turn, cards, banners))
+
+    def close(self):
+        self.data.close()
+        self.f.close()
+
+parser = argparse.ArgumentParser(description="Build or query the position index of archived games")
+subparsers = parser.add_subparsers(dest='command', required=True)
+command = subparsers.add_parser('build', help="index every position of a record file")
+command.add_argument('records', type=str, help="record file written by hotk_simulation.py --record")
+command.add_argument('index', type=str, help="output index file")
+command = subparsers.add_parser('query', help="find the games that reached a position")
+command.add_argument('index', type=str, help="index file")
+command.add_argument('records', type=str, help="record file the index was built from")
+command.add_argument('game', type=int, help="game id of a game that reached the position")
+command.add_argument('ply', type=int, help="number of moves into that game")
+
+def main(args):
+    if args.command == 'build':
+        count, keys = build(args.records, args.index)
+        print(f"Indexed {count} positions ({keys} distinct)")
+        return
+
+    with records.RecordReader(args.records) as reader:
+        board, rows, cols, moves = reader[args.game]
+    states = list(records.replay(board, rows, cols, moves))
+    if not 0 <= args.ply < len(states):
+        parser.error(f"game {args.game} only has plies 0 to {len(states) - 1}")
+    ply, turn, _, board, cards, banners = states[args.ply]
+    with PositionIndex(args.index) as index:
+        postings = index.lookup_state(board, rows, cols, turn, cards, banners)
+    print(f"Position reached {len(postings)} times in {len({game for game, _, _ in postings})} games")
+    for result, description in enumerate(RESULTS):
+        print(f"\t{description}: {sum(1 for _, _, outcome in postings if outcome == result)}")
+    for game, ply, result in postings[:20]:
+        print(f"\tgame {game}, ply {ply}: {RESULTS[result]}")
+
+if __name__ == "__main__":
+    main(parser.parse_args())
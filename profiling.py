@@ -0,0 +1,224 @@
+# profiling.py
+# Profiling of AI players for "Hand of the King", scoped to their choice() calls.
+#
+# ChoiceProfiler: where the time goes.
+# Each player gets its own cProfile profile, which is only enabled while that player is
+# deciding on a move, so the game loop, the GUI and the simulator do not show up in it.
+# At the same time, a sampling thread records the call stack of the player every few
+# milliseconds (with sys._current_frames) and counts identical stacks, which is the
+# "collapsed stack" format read by flamegraph tools (e.g. flamegraph.pl or speedscope).
+#
+# Output files, for a prefix such as "profile":
+#   profile.<player>.pstats   one per player (python -m pstats profile.<player>.pstats)
+#   profile.collapsed         stack samples of all players, each stack rooted at the player name
+#
+# MemoryProfiler: how much memory the players allocate while choosing, and where (see
+# the class). Per-move measurements can be written as JSON lines, and are summarized by
+# player across all games.
+
+import cProfile
+import collections
+import json
+import os
+import sys
+import threading
+import time
+import tracemalloc
+
+class ChoiceProfiler:
+    """Profile AI players while (and only while) they choose their moves.
+
+    Parameters
+    ----------
+    prefix : str
+        Prefix of the output files (see the top of this file).
+    interval : float, optional (default=0.001)
+        Seconds between stack samples.
+    """
+    def __init__(self, prefix, interval=0.001):
+        self.prefix = prefix
+        self.interval = interval
+        self.profiles = {} # cProfile.Profile by player name
+        self.stacks = collections.Counter() # collapsed stack -> number of samples
+        self.active = None # (player name, thread id, frame that called the player) during a choice
+        self.running = True
+        self.sampler = threading.Thread(target=self._sample, daemon=True)
+        self.sampler.start()
+
+    def profile(self, name):
+        """Return a context manager that profiles a player's choice inside it.
+
+        The frame that enters the context (e.g. utils.call_player) is the root of the
+        sampled stacks: it and everything above it are left out.
+        """
+        return _Scope(self, name)
+
+    def close(self):
+        """Stop sampling and write the output files; returns their names."""
+        self.running = False
+        self.sampler.join()
+        files = []
+        for name, profile in sorted(self.profiles.items()):
+            file = f"{self.prefix}.{name}.pstats"
+            profile.dump_stats(file)
+            files.append(file)
+        file = f"{self.prefix}.collapsed"
+        with open(file, "w") as f:
+            for stack, count in sorted(self.stacks.items()):
+                f.write(f"{stack} {count}\n")
+        files.append(file)
+        return files
+
+    def _sample(self):
+        """Sampling thread: record the stack of the active player every interval seconds."""
+        while self.running:
+            time.sleep(self.interval)
+            active = self.active
+            if active is None:
+                continue
+            name, thread, root = active
+            frame = sys._current_frames().get(thread)
+            stack = []
+            while frame is not None and frame is not root:
+                code = frame.f_code
+                stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                frame = frame.f_back
+            if frame is root and stack: # otherwise the player returned while we were sampling
+                self.stacks[';'.join([name] + stack[::-1])] += 1
+
+class _Scope:
+    """Context manager returned by ChoiceProfiler.profile."""
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.profile = self.profiler.profiles.setdefault(self.name, cProfile.Profile())
+        self.profiler.active = (self.name, threading.get_ident(), sys._getframe(1))
+        self.profile.enable()
+        return self
+
+    def __exit__(self, *exc):
+        self.profile.disable()
+        self.profiler.active = None
+
+class MemoryProfiler:
+    """Measure the memory AI players allocate while choosing their moves, with tracemalloc.
+
+    For every move, the peak of traced memory above what was in use when the player was
+    called, the memory still held when it returned, and the sites (file:line) holding
+    the most memory at the peak are recorded. The peak is found by a watcher thread that
+    takes a tracemalloc snapshot whenever the player's traced memory has grown by a
+    quarter since the last one, so short-lived garbage (e.g. deep copies of the state)
+    is attributed to the code that created it.
+
+    Parameters
+    ----------
+    out : str, optional (default=None)
+        File to which a JSON line is written for every move.
+    top : int, optional (default=10)
+        Number of allocation sites kept per move and in the summary.
+    frames : int, optional (default=1)
+        Frames of traceback stored by tracemalloc for each allocation (sites are
+        reported by their innermost frame).
+    interval : float, optional (default=0.005)
+        Seconds between checks of the traced memory by the watcher thread.
+    """
+    def __init__(self, out=None, top=10, frames=1, interval=0.005):
+        self.out = open(out, "w") if out else None
+        self.top = top
+        self.interval = interval
+        self.totals = {} # by player name: moves, peak (sum), max_peak, retained (sum), blocks (sum)
+        self.sites = {} # by player name: {site: [bytes, blocks]} summed over the peaks of every move
+        self.active = None # _MemoryScope of the player that is choosing
+        self.running = True
+        tracemalloc.start(frames)
+        self.watcher = threading.Thread(target=self._watch, daemon=True)
+        self.watcher.start()
+        self.snapshot() # matching the traces of the thread compiles the filters, which would otherwise be charged to the first move
+
+    def profile(self, name, game=None, ply=None):
+        """Return a context manager that measures a player's choice inside it (game and ply label the move)."""
+        return _MemoryScope(self, name, game, ply)
+
+    def snapshot(self):
+        """Take a tracemalloc snapshot without the traces of the profiler itself."""
+        return tracemalloc.take_snapshot().filter_traces([
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, __file__),
+        ])
+
+    def close(self):
+        """Stop tracing and return the summary (see summary)."""
+        self.running = False
+        self.watcher.join()
+        tracemalloc.stop()
+        if self.out:
+            self.out.close()
+        return self.summary()
+
+    def summary(self):
+        """Return {player: totals} across all moves so far, with the top allocation sites under 'sites'."""
+        summary = {}
+        for name, totals in self.totals.items():
+            sites = sorted(self.sites[name].items(), key=lambda item: -item[1][0])[:self.top]
+            summary[name] = dict(totals, sites=[[site, size, blocks] for site, (size, blocks) in sites])
+        return summary
+
+    def _record(self, scope, peak, retained, snapshot):
+        """Add one move's measurements to the totals (and the output file)."""
+        sites = []
+        for stat in snapshot.compare_to(scope.before, 'lineno'):
+            if stat.size_diff > 0:
+                frame = stat.traceback[0]
+                sites.append([f"{os.path.basename(frame.filename)}:{frame.lineno}", stat.size_diff, max(stat.count_diff, 0)])
+        totals = self.totals.setdefault(scope.name, {'moves': 0, 'peak': 0, 'max_peak': 0, 'retained': 0, 'blocks': 0})
+        totals['moves'] += 1
+        totals['peak'] += peak
+        totals['max_peak'] = max(totals['max_peak'], peak)
+        totals['retained'] += retained
+        totals['blocks'] += sum(blocks for _, _, blocks in sites)
+        player_sites = self.sites.setdefault(scope.name, {})
+        for site, size, blocks in sites:
+            total = player_sites.setdefault(site, [0, 0])
+            total[0] += size
+            total[1] += blocks
+        if self.out:
+            sites.sort(key=lambda site: -site[1])
+            self.out.write(json.dumps({'player': scope.name, 'game': scope.game, 'ply': scope.ply, 'peak': peak,
+                                       'retained': retained, 'sites': sites[:self.top]}) + "\n")
+
+    def _watch(self):
+        """Watcher thread: snapshot the traced memory of the active player as it grows."""
+        while self.running:
+            time.sleep(self.interval)
+            scope = self.active
+            if scope is None:
+                continue
+            used = tracemalloc.get_traced_memory()[0] - scope.base
+            if used > scope.peak_used * 1.25 and used > 0:
+                snapshot = self.snapshot()
+                if self.active is scope: # otherwise the player returned meanwhile
+                    scope.peak_used, scope.peak = used, snapshot
+
+class _MemoryScope:
+    """Context manager returned by MemoryProfiler.profile."""
+    def __init__(self, profiler, name, game, ply):
+        self.profiler = profiler
+        self.name = name
+        self.game = game
+        self.ply = ply
+
+    def __enter__(self):
+        self.before = self.profiler.snapshot()
+        self.peak, self.peak_used = None, 0 # largest snapshot taken by the watcher
+        tracemalloc.reset_peak()
+        self.base = tracemalloc.get_traced_memory()[0]
+        self.profiler.active = self
+        return self
+
+    def __exit__(self, *exc):
+        current, peak = tracemalloc.get_traced_memory()
+        self.profiler.active = None
+        after = self.profiler.snapshot()
+        self.profiler._record(self, peak - self.base, current - self.base, self.peak or after)
@@ -0,0 +1,297 @@
+# records.py
+# Compact binary archive format for "Hand of the King" games.
+#
+# Every game is stored as its board shape, its initial board packed at 4 bits per
+# square, and one byte per move (the linear index of the chosen card, or PASS for a
+# move that was rejected as invalid). Games are grouped into blocks that can be
+# compressed with zlib or lzma, and a block index at the end of the file lets a reader
+# jump straight to any game without decompressing the blocks before it.
+#
+# Blocks are self-delimiting, so a file whose writer was killed before it wrote the index
+# is still readable: the reader rebuilds the index by scanning the blocks, up to the last
+# complete one. A writer can also reopen a file to append games to it (e.g. when a
+# tournament resumes from its checkpoint); the index is rewritten when it is closed.
+#
+# File layout:
+#   header   MAGIC, version (u8), compression (u8)
+#   blocks   [stored length (u32), raw length (u32), games (u32), data] ...
+#   index    [offset (u64), first game (u64), games (u32)] per block
+#   footer   index offset (u64), number of blocks (u32), MAGIC
+
+import bisect
+import lzma
+import os
+import struct
+import utils
+import zlib
+
+MAGIC = b'HOTK'
+VERSION = 1
+PASS = 255 # move byte for a rejected (invalid) move; the turn simply passes
+COMPRESSION = {None: 0, 'zlib': 1, 'lzma': 2}
+
+_HEADER = struct.Struct('<4sBB')
+_BLOCK = struct.Struct('<III')
+_INDEX = struct.Struct('<QQI')
+_FOOTER = struct.Struct('<QI4s')
+_NIBBLES = [(byte & 0xF, byte >> 4) for byte in range(256)] # unpacked squares for every packed byte
+
+def encode_game(board, rows, cols, moves):
+    """Encode one game as bytes.
+
+    Parameters
+    ----------
+    board : list of ints
+        The initial (flattened) board.
+    rows : int
+        Number of rows on the board.
+    cols : int
+        Number of columns on the board.
+    moves : list of ints
+        The card chosen on each turn, in order. Anything that is not a square on the
+        board is stored as PASS.
+
+    Returns
+    -------
+    data : bytes
+        rows, cols, the packed board, the number of moves, and one byte per move.
+    """
+    size = rows * cols
+    if len(moves) > 255:
+        raise ValueError(f"Too many moves to encode ({len(moves)})")
+    padded = list(board) + [0] if size % 2 else board
+    packed = bytes(padded[i] | (padded[i + 1] << 4) for i in range(0, size, 2))
+    moves = bytes(move if 0 <= move < size else PASS for move in moves)
+    return bytes((rows, cols)) + packed + bytes((len(moves),)) + moves
+
+def decode_game(data, offset=0):
+    """Decode one game starting at the given offset.
+
+    Returns
+    -------
+    game : tuple
+        (board, rows, cols, moves), where PASS moves are returned as -1.
+    offset : int
+        The offset just after the decoded game.
+    """
+    rows, cols = data[offset], data[offset + 1]
+    size = rows * cols
+    start = offset + 2
+    board = [square for byte in data[start:start + (size + 1) // 2] for square in _NIBBLES[byte]]
+    del board[size:]
+    start += (size + 1) // 2
+    count = data[start]
+    moves = [move if move != PASS else -1 for move in data[start + 1:start + 1 + count]]
+    return (board, rows, cols, moves), start + 1 + count
+
+def replay(board, rows, cols, moves):
+    """Reconstruct every intermediate state of a recorded game.
+
+    Parameters
+    ----------
+    board : list of ints
+        The initial board.
+    rows : int
+        Number of rows on the board.
+    cols : int
+        Number of columns on the board.
+    moves : list of ints
+        The recorded moves (-1 or any invalid move is a pass).
+
+    Yields
+    ------
+    state : tuple
+        (ply, turn, move, board, cards, banners) before the first move (with move None)
+        and after each recorded move, where turn is the player who moves next.
+    """
+    num_colors = max(board)
+    cards = [[0] * (num_colors - 1) for _ in range(2)]
+    banners = [[0] * (num_colors - 1) for _ in range(2)]
+    board, cards, banners = utils.freeze(board, cards, banners)
+    turn = 0
+    yield 0, turn, None, board, cards, banners
+    for ply, move in enumerate(moves, 1):
+        if move in utils.get_valid_moves(board, rows, cols):
+            board, cards, banners = utils.apply_move(board, cols, move, turn, cards, banners)
+        turn = 1 - turn
+        yield ply, turn, move, board, cards, banners
+
+def _read_index(f):
+    """Return the block index of an open record file and the offset just after its last block.
+
+    The index is read from the footer if the file has one; otherwise (the writer did not
+    close it) it is rebuilt by scanning the blocks, and a torn last block is left out.
+    """
+    size = os.fstat(f.fileno()).st_size
+    if size >= _HEADER.size + _FOOTER.size:
+        f.seek(size - _FOOTER.size)
+        index_offset, blocks, magic = _FOOTER.unpack(f.read(_FOOTER.size))
+        if magic == MAGIC and index_offset + blocks * _INDEX.size + _FOOTER.size == size:
+            f.seek(index_offset)
+            data = f.read(blocks * _INDEX.size)
+            return [_INDEX.unpack_from(data, i * _INDEX.size) for i in range(blocks)], index_offset
+
+    index = []
+    offset = _HEADER.size
+    games = 0
+    while offset + _BLOCK.size <= size:
+        f.seek(offset)
+        stored, _, count = _BLOCK.unpack(f.read(_BLOCK.size))
+        if offset + _BLOCK.size + stored > size:
+            break
+        index.append((offset, games, count))
+        games += count
+        offset += _BLOCK.size + stored
+    return index, offset
+
+def _compress(data, compression):
+    if compression == 'zlib':
+        return zlib.compress(data, 6)
+    if compression == 'lzma':
+        return lzma.compress(data)
+    return data
+
+def _decompress(data, compression):
+    if compression == 'zlib':
+        return zlib.decompress(data)
+    if compression == 'lzma':
+        return lzma.decompress(data)
+    return data
+
+class RecordWriter:
+    """Write games to a record file.
+
+    Parameters
+    ----------
+    file : str
+        Output filename (overwritten if it exists, unless append is True).
+    compression : {None, 'zlib', 'lzma'}, optional (default=None)
+        Compression applied to each block (when appending, it must be the file's).
+    block_size : int, optional (default=4096)
+        Number of games per block. Smaller blocks make random access cheaper; larger
+        blocks compress better.
+    append : bool, optional (default=False)
+        Add games after those already in the file (if it exists), whether or not it was
+        closed properly. Game ids continue from the number of games already there.
+    """
+    def __init__(self, file, compression=None, block_size=4096, append=False):
+        if compression not in COMPRESSION:
+            raise ValueError(f"Unknown compression {compression}")
+        self.compression = compression
+        self.block_size = block_size
+        self.block = []
+        if append and os.path.exists(file) and os.path.getsize(file) > 0:
+            self.f = open(file, "r+b")
+            magic, version, stored = _HEADER.unpack(self.f.read(_HEADER.size))
+            if magic != MAGIC or version != VERSION:
+                self.f.close()
+                raise ValueError(f"{file} is not a version {VERSION} game record file")
+            if stored != COMPRESSION[compression]:
+                self.f.close()
+                raise ValueError(f"{file} was written with different compression than {compression}")
+            self.index, end = _read_index(self.f)
+            self.f.truncate(end) # drop the old index and footer (or a torn block), which close rewrites
+            self.f.seek(end)
+        else:
+            self.f = open(file, "wb")
+            self.index = []
+            self.f.write(_HEADER.pack(MAGIC, VERSION, COMPRESSION[compression]))
+            self.f.flush() # an empty record file is still a valid one
+        self.games = sum(entry[2] for entry in self.index)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def write(self, board, rows, cols, moves):
+        """Append a game (see encode_game) and return its game id."""
+        self.block.append(encode_game(board, rows, cols, moves))
+        self.games += 1
+        if len(self.block) >= self.block_size:
+            self.flush()
+        return self.games - 1
+
+    def flush(self):
+        """Write the current block to disk (as a block of its own, however few games it has).
+
+        The block is synced, so it survives a crash even if close is never called (see
+        _read_index); hotk_simulation flushes before saving each tournament checkpoint.
+        """
+        if not self.block:
+            return
+        raw = b''.join(self.block)
+        data = _compress(raw, self.compression)
+        self.index.append((self.f.tell(), self.games - len(self.block), len(self.block)))
+        self.f.write(_BLOCK.pack(len(data), len(raw), len(self.block)) + data)
+        self.f.flush()
+        os.fsync(self.f.fileno())
+        self.block = []
+
+    def close(self):
+        """Write the last block, the block index, and the footer."""
+        if self.f.closed:
+            return
+        self.flush()
+        index_offset = self.f.tell()
+        self.f.write(b''.join(_INDEX.pack(*entry) for entry in self.index))
+        self.f.write(_FOOTER.pack(index_offset, len(self.index), MAGIC))
+        self.f.close()
+
+class RecordReader:
+    """Read games from a record file, sequentially or by game id.
+
+    Parameters
+    ----------
+    file : str
+        Record filename written by RecordWriter.
+    """
+    def __init__(self, file):
+        self.f = open(file, "rb")
+        magic, version, compression = _HEADER.unpack(self.f.read(_HEADER.size))
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{file} is not a version {VERSION} game record file")
+        self.compression = {value: key for key, value in COMPRESSION.items()}[compression]
+        self.index, _ = _read_index(self.f)
+        self.firsts = [entry[1] for entry in self.index]
+        self.cached = (None, None) # (block number, decoded games) of the last block read
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        return sum(entry[2] for entry in self.index)
+
+    def __getitem__(self, game):
+        """Return game number `game` as (board, rows, cols, moves)."""
+        if not 0 <= game < len(self):
+            raise IndexError(f"game {game} is out of range")
+        block = bisect.bisect_right(self.firsts, game) - 1
+        return self.read_block(block)[game - self.firsts[block]]
+
+    def __iter__(self):
+        for block in range(len(self.index)):
+            yield from self.read_block(block)
+
+    def read_block(self, block):
+        """Decode all games of one block (the most recent block is cached)."""
+        if self.cached[0] == block:
+            return self.cached[1]
+        offset, _, _ = self.index[block]
+        self.f.seek(offset)
+        stored, _, count = _BLOCK.unpack(self.f.read(_BLOCK.size))
+        data = _decompress(self.f.read(stored), self.compression)
+        games = []
+        position = 0
+        for _ in range(count):
+            game, position = decode_game(data, position)
+            games.append(game)
+        self.cached = (block, games)
+        return games
+
+    def close(self):
+        self.f.close()
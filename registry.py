@@ -0,0 +1,201 @@
+# registry.py
+# Registry of the AI players available for "Hand of the King".
+#
+# The registry scans the players directory once and remembers, for every player file,
+# its name, a content hash of its source, and the capabilities it declares with
+# module-level constants such as SUPPORTS_PONDER = True or SUPPORTS_BATCH = True.
+# Capabilities are read from the source (without importing it), and the metadata is
+# cached on disk so that only new or modified files are read again. Players are
+# imported lazily, the first time they are used, and then shared by every caller.
+#
+# A player whose behavior also depends on other files (weights, networks, modules it
+# builds on) lists them, relative to its own directory, in DEPENDENCIES = [...]. Their
+# contents are part of the player's hash, so retuning the weights of a player changes
+# its hash just like editing its source (and invalidates its cached game results).
+
+import ast
+import hashlib
+import importlib.util
+import json
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.realpath(__file__))
+
+def read_capabilities(source):
+    """Find the capabilities a player declares with module-level SUPPORTS_* constants.
+
+    Parameters
+    ----------
+    source : bytes
+        Python source code of the player.
+
+    Returns
+    -------
+    capabilities : dict
+        Maps each capability (e.g. 'ponder' for SUPPORTS_PONDER) to its literal value.
+    """
+    capabilities = {}
+    try:
+        tree = ast.parse(source)
+    except SyntaxError:
+        return capabilities
+    for node in tree.body:
+        if isinstance(node, ast.Assign) and len(node.targets) == 1 and isinstance(node.targets[0], ast.Name):
+            name = node.targets[0].id
+            if name.startswith('SUPPORTS_'):
+                try:
+                    capabilities[name[len('SUPPORTS_'):].lower()] = ast.literal_eval(node.value)
+                except ValueError:
+                    pass
+    return capabilities
+
+def read_dependencies(source):
+    """Return the files a player lists in a module-level DEPENDENCIES = [...] constant."""
+    try:
+        tree = ast.parse(source)
+    except SyntaxError:
+        return []
+    for node in tree.body:
+        if isinstance(node, ast.Assign) and len(node.targets) == 1 and isinstance(node.targets[0], ast.Name) \
+                and node.targets[0].id == 'DEPENDENCIES':
+            try:
+                return [str(name) for name in ast.literal_eval(node.value)]
+            except ValueError:
+                pass
+    return []
+
+def file_stat(file):
+    """Return [mtime, size] of a file, or None if it does not exist."""
+    try:
+        stat = os.stat(file)
+    except OSError:
+        return None
+    return [stat.st_mtime_ns, stat.st_size]
+
+def describe(file):
+    """Return the metadata of one player file (name, file, hash, capabilities, mtime, size, dependencies).
+
+    The hash covers the source and the contents of every file in DEPENDENCIES (a missing
+    dependency hashes differently from any contents); 'dependencies' maps the path of
+    each to its file_stat, so the cached entry can be checked for changes.
+    """
+    with open(file, "rb") as f:
+        source = f.read()
+    stat = os.stat(file)
+    digest = hashlib.sha256(source)
+    dependencies = {}
+    for name in read_dependencies(source):
+        path = os.path.join(os.path.dirname(file), name)
+        dependencies[path] = file_stat(path)
+        digest.update(b'\0' + name.encode())
+        if dependencies[path] is None:
+            digest.update(b'\0missing')
+        else:
+            with open(path, "rb") as f:
+                digest.update(b'\0' + hashlib.sha256(f.read()).digest())
+    return {
+        'name': os.path.splitext(os.path.basename(file))[0],
+        'file': file,
+        'hash': digest.hexdigest(),
+        'capabilities': read_capabilities(source),
+        'mtime': stat.st_mtime_ns,
+        'size': stat.st_size,
+        'dependencies': dependencies,
+    }
+
+def is_current(info, path, stat):
+    """Is a cached entry (see describe) still valid for the player file at path with this os.stat?"""
+    return (info['file'] == path and info['mtime'] == stat.st_mtime_ns and info['size'] == stat.st_size
+            and all(file_stat(dependency) == known for dependency, known in info.get('dependencies', {}).items()))
+
+class PlayerRegistry:
+    """Lazily scanned and lazily imported collection of AI players.
+
+    Parameters
+    ----------
+    folder : str
+        Directory containing the AI player files.
+    cache : str, optional (default=None)
+        JSON file for the metadata cache. Defaults to .registry.json inside the folder.
+    """
+    def __init__(self, folder, cache=None):
+        self.folder = folder
+        self.cache = cache if cache else os.path.join(folder, '.registry.json')
+        self.players = None # metadata by name, filled in by scan
+        self.modules = {} # imported players by name
+
+    def scan(self):
+        """Read the metadata of every player file, reusing cached entries for unchanged files."""
+        cached = {}
+        if os.path.exists(self.cache):
+            try:
+                with open(self.cache, "r") as f:
+                    cached = json.load(f)
+            except (OSError, ValueError):
+                cached = {}
+
+        self.players = {}
+        changed = False
+        for entry in os.scandir(self.folder) if os.path.isdir(self.folder) else []:
+            if not entry.name.endswith('.py') or not entry.is_file():
+                continue
+            name = entry.name[:-3]
+            stat = entry.stat()
+            info = cached.get(name)
+            if info is None or 'dependencies' not in info or not is_current(info, entry.path, stat):
+                info = describe(entry.path)
+                changed = True
+            self.players[name] = info
+        if changed or set(cached) != set(self.players):
+            self._save()
+
+    def names(self):
+        """Return the names of all registered players, sorted."""
+        if self.players is None:
+            self.scan()
+        return sorted(self.players)
+
+    def info(self, name):
+        """Return the metadata of a player.
+
+        Players outside the players directory (e.g. importable from the repository root)
+        are looked up with importlib the first time they are requested.
+        """
+        if self.players is None:
+            self.scan()
+        if name not in self.players:
+            self._add_path()
+            spec = importlib.util.find_spec(name)
+            if spec is None or not spec.origin or not spec.origin.endswith('.py'):
+                raise ImportError(f"Cannot find AI player {name}")
+            self.players[name] = describe(spec.origin)
+        return self.players[name]
+
+    def is_loaded(self, name):
+        """Has this player already been imported?"""
+        return name in self.modules
+
+    def load(self, name):
+        """Import a player (only the first time) and return its module."""
+        if name not in self.modules:
+            self._add_path()
+            self.modules[name] = importlib.import_module(name)
+        return self.modules[name]
+
+    def _add_path(self):
+        """Make the players directory importable (only adds it to sys.path once)."""
+        if self.folder not in sys.path:
+            sys.path.append(self.folder)
+
+    def _save(self):
+        """Atomically write the metadata cache (silently skipped if the folder is read-only)."""
+        tmp = f"{self.cache}.{os.getpid()}.tmp"
+        try:
+            with open(tmp, "w") as f:
+                json.dump(self.players, f)
+            os.replace(tmp, self.cache)
+        except OSError:
+            pass
+
+REGISTRY = PlayerRegistry(os.path.join(ROOT, 'players'))
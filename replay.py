@@ -0,0 +1,83 @@
+# replay.py
+# Replay games stored in a record file (see records.py), either in the terminal or in the GUI.
+#
+# Usage:
+#   python replay.py games.rec 42            (print every board, card collection, and banner)
+#   python replay.py games.rec 42 --gui      (watch the game in the graphical user interface)
+#   python replay.py games.rec --summary     (final score of every game in the file)
+
+import argparse
+import records
+import time
+import utils
+
+parser = argparse.ArgumentParser(description="Replay recorded games of Hand of the King")
+parser.add_argument('file', type=str, help="record file written by hotk_simulation.py --record")
+parser.add_argument('game', type=int, nargs='?', help="game id to replay (default=0)", default=0)
+parser.add_argument('--gui', action='store_true', help="show the game in the GUI instead of the terminal")
+parser.add_argument('-d', '--delay', type=float, help="time (in seconds) to wait between moves in the GUI (default=1)", default=1)
+parser.add_argument('--summary', action='store_true', help="print the final score of every game in the file")
+
+def replay_terminal(board, rows, cols, moves):
+    """Print every intermediate state of a game."""
+    for ply, turn, move, board, cards, banners in records.replay(board, rows, cols, moves):
+        if move is not None:
+            print(f"ply {ply}: player {2 - turn} chose card {move}" if move >= 0 else f"ply {ply}: player {2 - turn} passed")
+        utils.print_board(board, rows, cols)
+        print("card collections")
+        print(*cards[0])
+        print(*cards[1])
+        print("banners")
+        print(*banners[0])
+        print(*banners[1])
+        print(f'score: {sum(banners[0])}-{sum(banners[1])}\n')
+
+def wait(gui, seconds):
+    """Wait while handling the window's events (redraws, keys, closing); returns False if the user quit."""
+    end = time.perf_counter() + seconds
+    while gui.isOpen():
+        if gui.checkKey() in ["Escape", "Ctrl+e"]: # checkKey also processes the pending events
+            return False
+        remaining = end - time.perf_counter()
+        if remaining <= 0:
+            return True
+        time.sleep(min(remaining, 0.02))
+    return False
+
+def replay_gui(board, rows, cols, moves, delay):
+    """Show a game move by move in the GUI, as hand_of_the_king.py would have played it."""
+    num_colors = max(board)
+    x0 = board.index(1)
+    gui = utils.make_gui(board, rows, cols)
+    cards = [[0] * (num_colors - 1) for i in range(2)]
+    banners = [[0] * (num_colors - 1) for i in range(2)]
+    turn = 0
+    for move in moves:
+        utils.status(gui, f'Player {turn + 1} chooses card {move}')
+        if not wait(gui, delay):
+            return
+        if move in utils.get_valid_moves(board, rows, cols):
+            color = board[move]
+            utils.make_move(gui, board, x0, move, cards[turn])
+            utils.update_banners(turn, color, cards, banners)
+        turn = abs(turn - 1)
+    utils.get_winner(gui, ["Player 1", "Player 2"], banners)
+    while wait(gui, 0.05):
+        pass
+
+def main(args):
+    with records.RecordReader(args.file) as reader:
+        if args.summary:
+            for game, (board, rows, cols, moves) in enumerate(reader):
+                *_, banners = list(records.replay(board, rows, cols, moves))[-1]
+                print(f"game {game}: {rows}x{cols}, {len(moves)} moves, score {sum(banners[0])}-{sum(banners[1])}")
+            return
+        board, rows, cols, moves = reader[args.game]
+
+    if args.gui:
+        replay_gui(board, rows, cols, moves, args.delay)
+    else:
+        replay_terminal(board, rows, cols, moves)
+
+if __name__ == "__main__":
+    main(parser.parse_args())
@@ -0,0 +1,275 @@
+# results_db.py
+# SQLite-backed storage and queries for simulated "Hand of the King" games.
+#
+# Games, moves, and per-move decision times are stored in an SQLite database (in WAL
+# mode, inserted in batched transactions). A per-player summary table is kept up to
+# date in the same transactions, as is a log-bucketed histogram of decision times, so
+# win rates, banners per win, and latency percentiles come back in milliseconds no
+# matter how many games have been stored.
+#
+# Usage:
+#   python results_db.py results.db winrates [--num_colors N]
+#   python results_db.py results.db latency [--player NAME]
+#   python results_db.py results.db games [--player NAME] [--seed S] [--num_colors N] [--since DATE]
+
+import argparse
+import datetime
+import json
+import math
+import sqlite3
+import time
+
+LATENCY_BASE = 1.05 # consecutive latency buckets differ by 5%
+LATENCY_MIN = 1e-6 # decision times below one microsecond all go in bucket 0
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS players (
+    id INTEGER PRIMARY KEY,
+    name TEXT UNIQUE NOT NULL
+);
+CREATE TABLE IF NOT EXISTS games (
+    id INTEGER PRIMARY KEY,
+    date TEXT NOT NULL,
+    game INTEGER,
+    player1 INTEGER NOT NULL REFERENCES players(id),
+    player2 INTEGER NOT NULL REFERENCES players(id),
+    seed INTEGER,
+    num_colors INTEGER,
+    board TEXT,
+    score1 INTEGER,
+    score2 INTEGER,
+    banners TEXT
+);
+CREATE INDEX IF NOT EXISTS games_player1 ON games(player1);
+CREATE INDEX IF NOT EXISTS games_player2 ON games(player2);
+CREATE INDEX IF NOT EXISTS games_seed ON games(seed);
+CREATE INDEX IF NOT EXISTS games_num_colors ON games(num_colors);
+CREATE INDEX IF NOT EXISTS games_date ON games(date);
+CREATE TABLE IF NOT EXISTS moves (
+    game_id INTEGER NOT NULL REFERENCES games(id),
+    ply INTEGER NOT NULL,
+    player INTEGER NOT NULL REFERENCES players(id),
+    card INTEGER,
+    seconds REAL,
+    PRIMARY KEY (game_id, ply)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS moves_player_seconds ON moves(player, seconds);
+CREATE TABLE IF NOT EXISTS player_stats (
+    player INTEGER NOT NULL REFERENCES players(id),
+    num_colors INTEGER NOT NULL,
+    games INTEGER DEFAULT 0,
+    wins INTEGER DEFAULT 0,
+    losses INTEGER DEFAULT 0,
+    ties INTEGER DEFAULT 0,
+    points INTEGER DEFAULT 0,
+    win_points INTEGER DEFAULT 0,
+    PRIMARY KEY (player, num_colors)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS latency_hist (
+    player INTEGER NOT NULL REFERENCES players(id),
+    bucket INTEGER NOT NULL,
+    moves INTEGER DEFAULT 0,
+    total REAL DEFAULT 0,
+    longest REAL DEFAULT 0,
+    PRIMARY KEY (player, bucket)
+) WITHOUT ROWID;
+"""
+
+def latency_bucket(seconds):
+    """Map a decision time to its histogram bucket (bucket b covers up to LATENCY_MIN * LATENCY_BASE**b)."""
+    if seconds <= LATENCY_MIN:
+        return 0
+    return math.ceil(math.log(seconds / LATENCY_MIN, LATENCY_BASE))
+
+class ResultStore:
+    """Append-only store of game records backed by an SQLite database.
+
+    Parameters
+    ----------
+    file : str
+        SQLite database filename. It is created (with all tables and indexes) if needed.
+    batch_size : int, optional (default=500)
+        Number of games buffered in memory before they are written in one transaction.
+    """
+    def __init__(self, file, batch_size=500):
+        self.db = sqlite3.connect(file)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.executescript(SCHEMA)
+        self.batch_size = batch_size
+        self.buffer = []
+        self.player_ids = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def add(self, record, moves=None):
+        """Buffer a game for insertion.
+
+        Parameters
+        ----------
+        record : dict
+            Game record (see tournament.make_record).
+        moves : list of tuples, optional (default=None)
+            (turn, which_card, seconds, ...) for each move of the game, if known (see
+            hotk_simulation.play_game; anything after seconds is ignored).
+        """
+        self.buffer.append((record, moves))
+        if len(self.buffer) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        """Write all buffered games in a single transaction.
+
+        Callers that record their progress elsewhere (e.g. a tournament checkpoint) must
+        flush first, or a crash could lose games the checkpoint says were played.
+        """
+        if not self.buffer:
+            return
+        date = datetime.datetime.now().isoformat(timespec='seconds')
+        move_rows = []
+        stats = {} # (player, num_colors) -> [games, wins, losses, ties, points, win_points]
+        hist = {} # (player, bucket) -> [moves, total, longest]
+        with self.db:
+            for record, moves in self.buffer:
+                players = [self.player_id(name) for name in record['players']]
+                cursor = self.db.execute(
+                    "INSERT INTO games (date, game, player1, player2, seed, num_colors, board, score1, score2, banners) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (date, record['game'], players[0], players[1], record['seed'], record['num_colors'],
+                     record['board'], record['score'][0], record['score'][1], json.dumps(record['banners'])))
+                for ply, (turn, card, seconds, *_) in enumerate(moves or []):
+                    move_rows.append((cursor.lastrowid, ply, players[turn], card, seconds))
+                    row = hist.setdefault((players[turn], latency_bucket(seconds)), [0, 0.0, 0.0])
+                    row[0] += 1
+                    row[1] += seconds
+                    row[2] = max(row[2], seconds)
+                for seat in range(2):
+                    mine, theirs = record['score'][seat], record['score'][1 - seat]
+                    row = stats.setdefault((players[seat], record['num_colors']), [0] * 6)
+                    for k, value in enumerate([1, mine > theirs, mine < theirs, mine == theirs, mine, mine if mine > theirs else 0]):
+                        row[k] += value
+
+            self.db.executemany("INSERT INTO moves (game_id, ply, player, card, seconds) VALUES (?, ?, ?, ?, ?)", move_rows)
+            self.db.executemany(
+                "INSERT INTO player_stats (player, num_colors, games, wins, losses, ties, points, win_points) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?) ON CONFLICT (player, num_colors) DO UPDATE SET "
+                "games = games + excluded.games, wins = wins + excluded.wins, losses = losses + excluded.losses, "
+                "ties = ties + excluded.ties, points = points + excluded.points, win_points = win_points + excluded.win_points",
+                [key + tuple(row) for key, row in stats.items()])
+            self.db.executemany(
+                "INSERT INTO latency_hist (player, bucket, moves, total, longest) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT (player, bucket) DO UPDATE SET moves = moves + excluded.moves, "
+                "total = total + excluded.total, longest = MAX(longest, excluded.longest)",
+                [key + tuple(row) for key, row in hist.items()])
+        self.buffer = []
+
+    def close(self):
+        """Write any buffered games and close the database."""
+        self.flush()
+        self.db.close()
+
+    def player_id(self, name):
+        """Return the id of a player, adding the player to the database if needed."""
+        if name not in self.player_ids:
+            self.db.execute("INSERT OR IGNORE INTO players (name) VALUES (?)", (name,))
+            self.player_ids[name] = self.db.execute("SELECT id FROM players WHERE name = ?", (name,)).fetchone()[0]
+        return self.player_ids[name]
+
+def win_rates(db, num_colors=None):
+    """Return (name, games, wins, losses, ties, points, win_points) for every player."""
+    where = "WHERE s.num_colors = ?" if num_colors else ""
+    return db.execute(
+        "SELECT p.name, SUM(games), SUM(wins), SUM(losses), SUM(ties), SUM(points), SUM(win_points) "
+        f"FROM player_stats s JOIN players p ON p.id = s.player {where} "
+        "GROUP BY p.name ORDER BY 1.0 * SUM(wins) / SUM(games) DESC",
+        (num_colors,) if num_colors else ()).fetchall()
+
+def latency(db, name, quantiles=(0.5, 0.9, 0.99)):
+    """Return the number of moves, mean, quantiles, and maximum of a player's decision times.
+
+    Quantiles come from the latency histogram, so they are accurate to within 5% and cost
+    the same no matter how many moves have been stored.
+    """
+    rows = db.execute(
+        "SELECT bucket, moves, total, longest FROM latency_hist h JOIN players p ON p.id = h.player "
+        "WHERE p.name = ? ORDER BY bucket", (name,)).fetchall()
+    count = sum(row[1] for row in rows)
+    if count == 0:
+        return 0, None, [], None
+    worst = max(row[3] for row in rows)
+    values = []
+    for q in quantiles:
+        seen = 0
+        for bucket, moves, _, longest in rows:
+            seen += moves
+            if seen > q * count:
+                values.append(min(longest, LATENCY_MIN * LATENCY_BASE ** bucket))
+                break
+        else:
+            values.append(worst)
+    return count, sum(row[2] for row in rows) / count, values, worst
+
+def find_games(db, name=None, seed=None, num_colors=None, since=None, limit=20):
+    """Return the most recent games matching all of the given filters."""
+    conditions, params = [], []
+    if name:
+        conditions.append("(p1.name = ? OR p2.name = ?)")
+        params += [name, name]
+    if seed is not None:
+        conditions.append("g.seed = ?")
+        params.append(seed)
+    if num_colors:
+        conditions.append("g.num_colors = ?")
+        params.append(num_colors)
+    if since:
+        conditions.append("g.date >= ?")
+        params.append(since)
+    where = "WHERE " + " AND ".join(conditions) if conditions else ""
+    return db.execute(
+        "SELECT g.id, g.date, p1.name, p2.name, g.seed, g.num_colors, g.score1, g.score2 FROM games g "
+        "JOIN players p1 ON p1.id = g.player1 JOIN players p2 ON p2.id = g.player2 "
+        f"{where} ORDER BY g.id DESC LIMIT ?", params + [limit]).fetchall()
+
+parser = argparse.ArgumentParser(description="Query simulated Hand of the King results stored in SQLite")
+parser.add_argument('file', type=str, help="SQLite database written by hotk_simulation.py --db")
+subparsers = parser.add_subparsers(dest='query', required=True)
+query = subparsers.add_parser('winrates', help="win rates and average banners per win")
+query.add_argument('-n', '--num_colors', type=int, help="only games with this many color sets", default=None)
+query = subparsers.add_parser('latency', help="distribution of decision times per move")
+query.add_argument('--player', type=str, help="only this player (default: every player)", default=None)
+query = subparsers.add_parser('games', help="list matching games, most recent first")
+query.add_argument('--player', type=str, default=None)
+query.add_argument('--seed', type=int, default=None)
+query.add_argument('-n', '--num_colors', type=int, default=None)
+query.add_argument('--since', type=str, help="ISO date, e.g. 2025-04-22", default=None)
+query.add_argument('--limit', type=int, default=20)
+
+def main(args):
+    db = sqlite3.connect(args.file)
+    start = time.perf_counter()
+    if args.query == 'winrates':
+        print(f"{'player':<24} {'games':>7} {'wins':>7} {'losses':>7} {'ties':>6} {'win %':>8} {'pts/game':>9} {'pts/win':>8}")
+        for name, games, wins, losses, ties, points, win_points in win_rates(db, args.num_colors):
+            print(f"{name:<24} {games:>7} {wins:>7} {losses:>7} {ties:>6} {round(wins / games * 100, 3):>8} {round(points / games, 3):>9} {round(win_points / wins, 3) if wins else 0:>8}")
+    elif args.query == 'latency':
+        names = [args.player] if args.player else [row[0] for row in db.execute("SELECT name FROM players ORDER BY name")]
+        print(f"{'player (ms per move)':<24} {'moves':>8} {'mean':>9} {'p50':>9} {'p90':>9} {'p99':>9} {'max':>9}")
+        for name in names:
+            count, mean, values, worst = latency(db, name)
+            if count == 0:
+                print(f"{name:<24} {count:>8}")
+                continue
+            p50, p90, p99 = (1000 * value for value in values)
+            print(f"{name:<24} {count:>8} {1000 * mean:>9.3f} {p50:>9.3f} {p90:>9.3f} {p99:>9.3f} {1000 * worst:>9.3f}")
+    else:
+        for row in find_games(db, args.player, args.seed, args.num_colors, args.since, args.limit):
+            print(*row)
+    print(f"(query took {(time.perf_counter() - start) * 1000:.1f} ms)")
+    db.close()
+
+if __name__ == "__main__":
+    main(parser.parse_args())
@@ -0,0 +1,162 @@
+# scheduler.py
+# Adaptive match scheduling for "Hand of the King" tournaments.
+#
+# Instead of a flat round robin, the adaptive scheduler rates every player after each
+# batch of games (Bradley-Terry model on the Elo scale) and spends the next batch on
+# the pairings whose rating confidence intervals overlap the most. Lopsided pairings
+# (e.g. alpha-beta vs random) stop receiving games as soon as their order is clear.
+
+import math
+import random
+import tournament
+
+ELO = 400 / math.log(10) # converts natural-log strength to Elo points
+
+def fit_ratings(names, results, prior=1):
+    """Fit Bradley-Terry ratings to game results.
+
+    Ties count as half a win for each side. A small prior (a virtual tie between every
+    pair of players) keeps the ratings finite when a player has won or lost every game.
+
+    Parameters
+    ----------
+    names : list of str
+        Player names.
+    results : dict
+        Completed game records, keyed by game index.
+    prior : float, optional (default=1)
+        Number of virtual tied games added to every pairing.
+
+    Returns
+    -------
+    ratings : dict
+        ratings[name] = (elo, se), the rating and its standard error in Elo points.
+        Ratings are centered so that their mean is zero.
+    games : dict
+        games[(a, b)] = number of real games played between players a and b (a < b).
+    """
+    index = {name: i for i, name in enumerate(names)}
+    n = len(names)
+    games = {}
+    for record in results.values():
+        key = tuple(sorted(record['players']))
+        games[key] = games.get(key, 0) + 1
+    if n <= 1: # nobody to compare with: a lone player is the mean, exactly
+        return {name: (0.0, 0.0) for name in names}, games
+
+    played = [[prior if i != j else 0 for j in range(n)] for i in range(n)]
+    wins = [prior * (n - 1) / 2] * n
+    for record in results.values():
+        a, b = (index[name] for name in record['players'])
+        score = record['score']
+        played[a][b] += 1
+        played[b][a] += 1
+        wins[a] += 1 if score[0] > score[1] else 0.5 if score[0] == score[1] else 0
+        wins[b] += 1 if score[1] > score[0] else 0.5 if score[0] == score[1] else 0
+
+    # Minorization-maximization updates (Hunter, 2004)
+    strength = [1.0] * n
+    for _ in range(200):
+        new = [wins[i] / sum(played[i][j] / (strength[i] + strength[j]) for j in range(n) if j != i) for i in range(n)]
+        scale = math.exp(sum(math.log(s) for s in new) / n)
+        new = [s / scale for s in new]
+        converged = max(abs(math.log(new[i] / strength[i])) for i in range(n)) < 1e-9
+        strength = new
+        if converged:
+            break
+
+    ratings = {}
+    for name, i in index.items():
+        information = sum(played[i][j] * strength[i] * strength[j] / (strength[i] + strength[j]) ** 2 for j in range(n) if j != i)
+        ratings[name] = (ELO * math.log(strength[i]), ELO / math.sqrt(information))
+    return ratings, games
+
+def overlap(a, b, z):
+    """Return the length of the overlap between the confidence intervals of two ratings."""
+    (ra, sa), (rb, sb) = a, b
+    return max(0.0, min(ra + z * sa, rb + z * sb) - max(ra - z * sa, rb - z * sb))
+
+class AdaptiveScheduler:
+    """Bandit-style scheduler that plays games where the ranking is still uncertain.
+
+    Parameters
+    ----------
+    names : list of str
+        Players in the tournament.
+    batch_size : int
+        Number of games scheduled at a time (use a multiple of the number of workers).
+    precision : float, optional (default=50)
+        Target half-width of every rating's confidence interval, in Elo points.
+    z : float, optional (default=1.96)
+        Confidence interval multiplier (1.96 for 95% intervals).
+    max_games : int, optional (default=1000)
+        Hard limit on the total number of games.
+    num_colors : int, optional (default=8)
+        Number of color sets on the board.
+    board : str, optional (default=None)
+        File containing the starting board setup. If None, the cards are shuffled.
+    seed : int, optional (default=None)
+        Seed for the per-game seeds (for repeatability). If None, one is drawn at random.
+    """
+    def __init__(self, names, batch_size, precision=50, z=1.96, max_games=1000, num_colors=8, board=None, seed=None):
+        self.names = list(names)
+        self.pairings = tournament.round_robin(self.names)
+        self.batch_size = max(1, batch_size)
+        self.precision = precision
+        self.z = z
+        self.max_games = max_games
+        self.num_colors = num_colors
+        self.board = board
+        self.seed = seed if seed is not None else random.SystemRandom().randrange(2**32)
+
+    def done(self, results):
+        """Is the ranking precise enough (or the game budget spent)?
+
+        The ranking is precise enough when every two neighbouring players either have
+        separate confidence intervals or both have intervals narrower than the target
+        precision (i.e. they are too close to tell apart at that precision).
+        """
+        if len(results) >= self.max_games:
+            return True
+        ratings, games = fit_ratings(self.names, results)
+        if any(games.get(tuple(sorted(pairing)), 0) == 0 for pairing in self.pairings):
+            return False
+        order = sorted(self.names, key=lambda name: ratings[name][0])
+        for a, b in zip(order, order[1:]):
+            if overlap(ratings[a], ratings[b], self.z) > 0 and self.z * max(ratings[a][1], ratings[b][1]) > self.precision:
+                return False
+        return True
+
+    def next_batch(self, schedule, results):
+        """Append the next batch of games to the schedule and return them.
+
+        Each game goes to the pairing with the highest priority, where the priority is the
+        overlap of the two confidence intervals divided by the square root of the number of
+        games already played (or scheduled) between them. Pairings that have never been
+        played come first.
+        """
+        ratings, games = fit_ratings(self.names, results)
+        for spec in tournament.pending_games(schedule, results):
+            key = tuple(sorted(spec['players']))
+            games[key] = games.get(key, 0) + 1
+
+        batch = []
+        for _ in range(min(self.batch_size, self.max_games - len(schedule))):
+            priority = []
+            for pairing in self.pairings:
+                n = games.get(tuple(sorted(pairing)), 0)
+                score = math.inf if n == 0 else overlap(ratings[pairing[0]], ratings[pairing[1]], self.z) / math.sqrt(n)
+                priority.append((score, -n))
+            best = max(range(len(self.pairings)), key=lambda k: priority[k])
+            if priority[best][0] == 0:
+                break
+            pairing = self.pairings[best]
+            key = tuple(sorted(pairing))
+            swapped = games.get(key, 0) % 2 == 1 # alternate seats within each pairing
+            game = len(schedule) + len(batch)
+            seed = random.Random(f"{self.seed}:{game}").randrange(2**32)
+            batch.append(tournament.make_spec(game, pairing, swapped, seed, self.num_colors, self.board))
+            games[key] = games.get(key, 0) + 1
+
+        schedule.extend(batch)
+        return batch
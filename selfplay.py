@@ -0,0 +1,262 @@
+# selfplay.py
+# Self-play dataset generator for "Hand of the King".
+#
+# Games between the configured AI players are played in parallel, and every position
+# in which a player had to move is stored with the final outcome of the game and, for
+# players that declare SUPPORTS_SCORE = True, the utility their search gave the chosen
+# move. Positions are written as columnar NumPy shards of a fixed number of rows: one
+# .npy file per column per shard, so training code can np.load(..., mmap_mode='r') any
+# column without parsing. A JSON manifest lists the shards; running the generator again
+# on the same folder appends new shards (and numbers their games after the old ones).
+# Each position also stores its canonical packed key (see codec.py), which identifies
+# repeated positions (see unique_positions).
+#
+# Usage:
+#   python selfplay.py data/selfplay --players math_nerds_final greedy --games 1000 -j 8 --noise 0.1
+
+import argparse
+import codec
+import json
+import math
+import multiprocessing
+import os
+import random
+import time
+import tournament
+import utils
+
+try:
+    import numpy as np
+except ImportError: # only needed to write or read datasets
+    np = None
+
+VERSION = 2
+SQUARES = 36 # boards are padded to the largest (8-color, 6x6) board
+SETS = 7 # card and banner counts are padded to 8 colors (7 sets)
+COLUMNS = { # name: (dtype, shape of one row)
+    'game': ('uint32', []),
+    'ply': ('uint8', []),
+    'rows': ('uint8', []),
+    'cols': ('uint8', []),
+    'board': ('uint8', [SQUARES]),
+    'cards': ('uint8', [2, SETS]),
+    'banners': ('uint8', [2, SETS]),
+    'turn': ('uint8', []),
+    'outcome': ('int8', []), # final result for the player to move: 1 win, 0 tie, -1 loss
+    'score': ('float32', []), # search utility of the chosen move for the player to move (NaN if unknown)
+    'key': ('uint8', [codec.WIDTH]), # the packed position (codec.pack_bytes)
+}
+MANIFEST = 'manifest.json'
+
+def play_selfplay(spec):
+    """Play one scheduled game and return the positions it went through.
+
+    Parameters
+    ----------
+    spec : dict
+        Scheduled game (see tournament.make_schedule) with an extra 'noise' entry: the
+        probability of replacing a player's move with a uniformly random valid move.
+
+    Returns
+    -------
+    positions : list of tuples
+        (ply, rows, cols, board, cards, banners, turn, outcome, score) for every move
+        requested from a player, in the order the columns are listed in COLUMNS.
+    """
+    random.seed(spec['seed'])
+    board, rows, cols = utils.load_cards(spec['board']) if spec['board'] else utils.shuffle_cards(spec['num_colors'])
+    num_colors = max(board)
+    cards = [[0] * (num_colors - 1) for _ in range(2)]
+    banners = [[0] * (num_colors - 1) for _ in range(2)]
+    board, cards, banners = utils.freeze(board, cards, banners)
+    ai = [utils.load_player(name) for name in spec['players']]
+    noise = random.Random(f"{spec['seed']}:{spec['game']}:noise")
+
+    positions = []
+    turn = 0
+    while True:
+        valid_moves = utils.get_valid_moves(board, rows, cols)
+        if not valid_moves:
+            break
+
+        explore = noise.random() < spec['noise']
+        score = math.nan
+        if getattr(ai[turn], 'SUPPORTS_SCORE', False): # the score is a useful label even if the move is replaced
+            move, utility = utils.call_player(ai[turn], board, rows, cols, turn, cards, banners, search=True)
+            score = math.nan if utility is None else utility
+        elif not explore:
+            move = utils.call_player(ai[turn], board, rows, cols, turn, cards, banners)
+        if explore:
+            move = noise.choice(valid_moves)
+        positions.append([len(positions), rows, cols, board, cards, banners, turn, 0, score])
+
+        if move in valid_moves:
+            board, cards, banners = utils.apply_move(board, cols, move, turn, cards, banners)
+        turn = 1 - turn
+
+    difference = sum(banners[0]) - sum(banners[1])
+    result = (difference > 0) - (difference < 0) # for player 1
+    for position in positions:
+        position[7] = result if position[6] == 0 else -result
+    return positions
+
+def to_arrays(game, positions):
+    """Convert the positions of one game into a dict of column arrays."""
+    count = len(positions)
+    arrays = {name: np.zeros([count] + shape, dtype) for name, (dtype, shape) in COLUMNS.items()}
+    arrays['game'][:] = game
+    for i, (ply, rows, cols, board, cards, banners, turn, outcome, score) in enumerate(positions):
+        arrays['ply'][i] = ply
+        arrays['rows'][i] = rows
+        arrays['cols'][i] = cols
+        arrays['board'][i, :len(board)] = board
+        arrays['cards'][i, :, :len(cards[0])] = cards
+        arrays['banners'][i, :, :len(banners[0])] = banners
+        arrays['turn'][i] = turn
+        arrays['outcome'][i] = outcome
+        arrays['score'][i] = score
+        arrays['key'][i] = list(codec.pack_bytes(board, rows, cols, turn, cards, banners))
+    return arrays
+
+class ShardWriter:
+    """Append positions to a sharded dataset folder.
+
+    Parameters
+    ----------
+    folder : str
+        Dataset folder (created if needed). Existing shards are kept; new shards and
+        games are numbered after them.
+    shard_size : int, optional (default=65536)
+        Number of positions per shard (only the last shard of a run may be smaller).
+    """
+    def __init__(self, folder, shard_size=65536):
+        os.makedirs(folder, exist_ok=True)
+        self.folder = folder
+        self.shard_size = shard_size
+        self.manifest = load_manifest(folder) if os.path.exists(os.path.join(folder, MANIFEST)) else {
+            'version': VERSION,
+            'columns': COLUMNS,
+            'games': 0,
+            'positions': 0,
+            'shards': [],
+            'runs': [],
+        }
+        self.buffer = []
+        self.buffered = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def add_game(self, positions):
+        """Add the positions of one game (see play_selfplay) and return its game id."""
+        game = self.manifest['games']
+        self.manifest['games'] += 1
+        self.buffer.append(to_arrays(game, positions))
+        self.buffered += len(positions)
+        while self.buffered >= self.shard_size:
+            self._write(self.shard_size)
+        return game
+
+    def add_run(self, **info):
+        """Record how a batch of games was generated (players, noise, seed...) in the manifest."""
+        self.manifest['runs'].append(dict(info, first_game=self.manifest['games']))
+
+    def close(self):
+        """Write the remaining positions as a (smaller) final shard."""
+        if self.buffered:
+            self._write(self.buffered)
+        else:
+            self._save()
+
+    def _write(self, count):
+        """Write the first count buffered positions as a new shard."""
+        columns = {name: np.concatenate([arrays[name] for arrays in self.buffer]) for name in COLUMNS}
+        name = f"shard-{len(self.manifest['shards']):05d}"
+        for column, values in columns.items():
+            file = os.path.join(self.folder, f"{name}.{column}.npy")
+            with open(file + ".tmp", "wb") as f:
+                np.save(f, values[:count])
+            os.replace(file + ".tmp", file)
+        rest = {column: values[count:] for column, values in columns.items()}
+        self.buffer = [rest] if len(rest['game']) else []
+        self.buffered -= count
+        self.manifest['shards'].append({'name': name, 'positions': count})
+        self.manifest['positions'] += count
+        self._save()
+
+    def _save(self):
+        """Atomically rewrite the manifest (shards not yet listed in it are ignored by readers)."""
+        tournament.write_json(os.path.join(self.folder, MANIFEST), self.manifest)
+
+def load_manifest(folder):
+    """Read the manifest of a dataset folder."""
+    with open(os.path.join(folder, MANIFEST), "r") as f:
+        manifest = json.load(f)
+    if manifest.get('version') != VERSION:
+        raise ValueError(f"{folder} is not a version {VERSION} self-play dataset")
+    return manifest
+
+def iter_shards(folder, columns=None, mmap=True):
+    """Yield each shard of a dataset as a dict of (memory-mapped) column arrays.
+
+    Parameters
+    ----------
+    folder : str
+        Dataset folder.
+    columns : list of str, optional (default=None)
+        Columns to load (all of them by default).
+    mmap : bool, optional (default=True)
+        Memory-map the arrays instead of reading them into memory.
+    """
+    manifest = load_manifest(folder)
+    for shard in manifest['shards']:
+        yield {column: np.load(os.path.join(folder, f"{shard['name']}.{column}.npy"), mmap_mode='r' if mmap else None)
+               for column in (columns if columns else manifest['columns'])}
+
+def load_dataset(folder, columns=None):
+    """Load whole columns of a dataset into memory, concatenating all shards."""
+    shards = list(iter_shards(folder, columns))
+    if not shards:
+        return {column: np.zeros([0] + COLUMNS[column][1], COLUMNS[column][0]) for column in (columns if columns else COLUMNS)}
+    return {column: np.concatenate([shard[column] for shard in shards]) for column in shards[0]}
+
+def unique_positions(data):
+    """Return the (sorted) indices of the first occurrence of each distinct position in a dataset."""
+    keys = np.ascontiguousarray(data['key']).view(f'V{codec.WIDTH}')[:, 0]
+    return np.sort(np.unique(keys, return_index=True)[1])
+
+parser = argparse.ArgumentParser(description="Generate a self-play dataset of labelled Hand of the King positions")
+parser.add_argument('folder', type=str, help="Dataset folder (new shards are appended to an existing dataset)")
+parser.add_argument('--players', type=str, nargs='+', help="AI players; every pairing of them (including self-play) is played", required=True)
+parser.add_argument('--games', type=int, help="Number of games per pairing (default=100)", default=100)
+parser.add_argument('--board', type=str, help="Starting board setup file", default=None)
+parser.add_argument('--num_colors', type=int, help="Number of color sets (default=8)", default=8)
+parser.add_argument('--seed', type=int, help="Random seed", default=None)
+parser.add_argument('--noise', type=float, help="Probability of playing a random valid move instead of the player's choice (default=0)", default=0)
+parser.add_argument('--shard_size', type=int, help="Positions per shard (default=65536)", default=65536)
+parser.add_argument('-j', '--jobs', type=int, help="Number of games to play in parallel (default=number of CPUs)", default=os.cpu_count())
+
+def main(args):
+    if np is None:
+        parser.error("selfplay.py requires NumPy")
+    pairings = [[a, b] for i, a in enumerate(args.players) for b in args.players[i:]]
+    seed = args.seed if args.seed is not None else random.randrange(2 ** 31)
+    schedule = tournament.make_schedule(pairings, args.games, args.num_colors, args.board, seed, alternate=True)
+    for spec in schedule:
+        spec['noise'] = args.noise
+
+    start = time.perf_counter()
+    with ShardWriter(args.folder, args.shard_size) as writer, multiprocessing.Pool(args.jobs) as pool:
+        writer.add_run(players=args.players, games=len(schedule), noise=args.noise, seed=seed,
+                       num_colors=args.num_colors, board=args.board)
+        for played, positions in enumerate(pool.imap_unordered(play_selfplay, schedule), 1):
+            writer.add_game(positions)
+            if played % 100 == 0 or played == len(schedule):
+                print(f"{played}/{len(schedule)} games, {writer.manifest['positions'] + writer.buffered} positions, {round(time.perf_counter() - start, 1)} s")
+    print(f"Dataset {args.folder} now has {writer.manifest['games']} games, {writer.manifest['positions']} positions in {len(writer.manifest['shards'])} shards")
+
+if __name__ == "__main__":
+    main(parser.parse_args())
@@ -0,0 +1,165 @@
+# texel.py
+# Texel-style tuning of the evaluation weights of math_nerds_final.
+#
+# math_nerds_final.evaluate is a weighted sum of features (see its FEATURES). Given a
+# self-play dataset (see selfplay.py), the tuner predicts the result of each position
+# as sigmoid(K * evaluate) and fits the weights that minimize the mean squared error
+# against the actual final outcomes (1 for a win, 0.5 for a tie, 0 for a loss). The
+# features of every position are computed once as a NumPy matrix, so each step of the
+# optimizer is a couple of matrix-vector products over the whole dataset.
+#
+# Usage:
+#   python texel.py data/selfplay --out math_nerds_final_weights.json
+
+import argparse
+import math_nerds_final
+import numpy as np
+import os
+import selfplay
+import time
+import tournament
+
+def batch_features(data):
+    """Compute the features of math_nerds_final.evaluate for a whole dataset at once.
+
+    Parameters
+    ----------
+    data : dict of arrays
+        Dataset columns (see selfplay.COLUMNS); needs board, rows, cols, cards, banners,
+        and turn.
+
+    Returns
+    -------
+    X : array of shape (positions, len(math_nerds_final.FEATURES))
+        The features of each position, for the player to move. The features are small
+        integers, so they are stored exactly as float32, in column-major order (which
+        roughly halves the time of each pass of the tuner).
+    """
+    n = len(data['turn'])
+    index = np.arange(n)
+    turn = data['turn'].astype(np.intp)
+    mine = data['cards'][index, turn].astype(np.int16)
+    theirs = data['cards'][index, 1 - turn].astype(np.int16)
+    banners = data['banners'][index, turn].sum(1, dtype=np.int16) - data['banners'][index, 1 - turn].sum(1, dtype=np.int16)
+
+    # a board with n color sets has n(n+1)/2 squares
+    squares = data['rows'].astype(np.int32) * data['cols']
+    sets = np.rint((np.sqrt(8 * squares + 1) - 1) / 2).astype(np.int16) - 1
+    needed = np.ceil((np.arange(selfplay.SETS) + 3) / 2) # cards needed to be sure of each banner
+    won = mine >= needed
+    lost = theirs >= needed
+    cards = mine - theirs
+    open_cards = np.where(won | lost, 0, cards)
+    open_banners = sets - (won | lost).sum(1)
+    cards_left = np.count_nonzero(data['board'], axis=1)
+    endgame = np.where(cards_left < 15, banners, 0)
+
+    X = np.column_stack([banners, open_banners, won.sum(1) - lost.sum(1), cards, open_cards, endgame])
+    return np.asfortranarray(X, dtype=np.float32)
+
+def targets(data):
+    """Convert the outcomes of a dataset (1, 0, -1) into win probabilities (1, 0.5, 0)."""
+    return (data['outcome'].astype(np.float32) + 1) / 2
+
+def loss(X, y, weights, k):
+    """Mean squared error between sigmoid(k * X @ weights) and the outcomes y."""
+    p = 1 / (1 + np.exp(-k * (X @ weights.astype(X.dtype))))
+    return float(np.mean((p - y) ** 2))
+
+def gradient(X, y, weights, k):
+    """Loss and its gradient with respect to the weights."""
+    p = 1 / (1 + np.exp(-k * (X @ weights.astype(X.dtype))))
+    error = p - y
+    return float(np.mean(error ** 2)), (X.T @ (2 * error * p * (1 - p) * k)).astype(np.float64) / len(y)
+
+def fit_k(X, y, weights, low=1e-4, high=10, iterations=100):
+    """Find the sigmoid scale K that best fits the outcomes for fixed weights (golden-section search)."""
+    ratio = (np.sqrt(5) - 1) / 2
+    for _ in range(iterations):
+        a = high - ratio * (high - low)
+        b = low + ratio * (high - low)
+        if loss(X, y, weights, a) < loss(X, y, weights, b):
+            high = b
+        else:
+            low = a
+    return (low + high) / 2
+
+def tune(X, y, weights, k, epochs=1000, rate=0.01, regularization=0):
+    """Fit the weights with full-batch Adam.
+
+    Parameters
+    ----------
+    X : array of shape (positions, features)
+        Features of every position (see batch_features).
+    y : array of shape (positions,)
+        Outcomes as win probabilities (see targets).
+    weights : array of shape (features,)
+        Starting weights.
+    k : float
+        Sigmoid scale (see fit_k), kept fixed while the weights are tuned.
+    epochs : int, optional (default=1000)
+        Number of optimizer steps.
+    rate : float, optional (default=0.01)
+        Adam step size.
+    regularization : float, optional (default=0)
+        L2 penalty on the distance from the starting weights.
+
+    Returns
+    -------
+    weights : array of shape (features,)
+        The tuned weights.
+    """
+    start = weights.copy()
+    weights = weights.copy()
+    m = np.zeros_like(weights)
+    v = np.zeros_like(weights)
+    beta1, beta2, epsilon = 0.9, 0.999, 1e-8
+    for epoch in range(1, epochs + 1):
+        _, g = gradient(X, y, weights, k)
+        g += 2 * regularization * (weights - start)
+        m = beta1 * m + (1 - beta1) * g
+        v = beta2 * v + (1 - beta2) * g ** 2
+        weights -= rate * (m / (1 - beta1 ** epoch)) / (np.sqrt(v / (1 - beta2 ** epoch)) + epsilon)
+    return weights
+
+parser = argparse.ArgumentParser(description="Tune the evaluation weights of math_nerds_final on a self-play dataset")
+parser.add_argument('dataset', type=str, help="Dataset folder written by selfplay.py")
+parser.add_argument('--out', type=str, help="Weight file to write (default=the file math_nerds_final loads at import)", default=math_nerds_final.WEIGHTS_FILE)
+parser.add_argument('--epochs', type=int, help="Number of optimizer steps (default=1000)", default=1000)
+parser.add_argument('--rate', type=float, help="Optimizer step size (default=0.01)", default=0.01)
+parser.add_argument('--regularization', type=float, help="L2 penalty on changes from the current weights (default=0)", default=0)
+parser.add_argument('--validation', type=float, help="Fraction of games held out to measure the loss (default=0.1)", default=0.1)
+
+def main(args):
+    start = time.perf_counter()
+    data = selfplay.load_dataset(args.dataset, ['game', 'board', 'rows', 'cols', 'cards', 'banners', 'turn', 'outcome'])
+    if len(data['turn']) == 0:
+        parser.error(f"{args.dataset} has no positions")
+    X = batch_features(data)
+    y = targets(data)
+    games = np.random.default_rng(0).random(int(data['game'].max()) + 1) < args.validation
+    held_out = games[data['game']] # split by game, so positions of a game stay together
+    print(f"Loaded {len(y)} positions ({np.count_nonzero(held_out)} held out) in {round(time.perf_counter() - start, 2)} s")
+
+    weights = np.array(math_nerds_final.WEIGHTS, dtype=np.float64)
+    k = fit_k(X[~held_out], y[~held_out], weights)
+    before = loss(X[held_out], y[held_out], weights, k) if held_out.any() else loss(X, y, weights, k)
+    start = time.perf_counter()
+    weights = tune(X[~held_out], y[~held_out], weights, k, args.epochs, args.rate, args.regularization)
+    after = loss(X[held_out], y[held_out], weights, k) if held_out.any() else loss(X, y, weights, k)
+    print(f"Tuned {len(weights)} weights in {round(time.perf_counter() - start, 2)} s (K={k:.4f})")
+    print(f"{'held-out' if held_out.any() else 'training'} loss: {before:.6f} -> {after:.6f}")
+    for name, old, new in zip(math_nerds_final.FEATURES, math_nerds_final.WEIGHTS, weights):
+        print(f"\t{name:<20} {old:>9.4f} -> {new:>9.4f}")
+
+    tournament.write_json(args.out, {
+        'weights': dict(zip(math_nerds_final.FEATURES, weights.tolist())),
+        'k': k,
+        'loss': after,
+        'positions': len(y),
+        'dataset': os.path.abspath(args.dataset),
+    })
+    print(f"Wrote {args.out}")
+
+if __name__ == "__main__":
+    main(parser.parse_args())
@@ -0,0 +1,287 @@
+# tournament.py
+# Schedules, checkpoints, and statistics for "Hand of the King" tournaments.
+#
+# A tournament is a fixed schedule of games (who plays whom, in which seats, on which
+# seed) plus the records of the games that have finished so far. Both are stored in a
+# checkpoint file that every finished game is appended to (see Checkpoint), so a
+# tournament that is killed can be restarted and will pick up exactly where it stopped.
+
+import hashlib
+import itertools
+import json
+import os
+import random
+import registry
+import tempfile
+
+def make_schedule(pairings, games, num_colors=8, board=None, seed=None, alternate=False):
+    """Create the list of games to play in a tournament.
+
+    Parameters
+    ----------
+    pairings : list of lists of str
+        Pairs of player names [player1, player2] that should play each other.
+    games : int
+        Number of games to play for each pairing.
+    num_colors : int, optional (default=8)
+        Number of color sets on the board.
+    board : str, optional (default=None)
+        File containing the starting board setup. If None, the cards are shuffled.
+    seed : int, optional (default=None)
+        Seed used to draw the per-game seeds (for repeatability of the whole schedule).
+    alternate : bool, optional (default=False)
+        If True, the players swap seats every other game.
+
+    Returns
+    -------
+    schedule : list of dicts
+        One entry per game with its index, the players in seat order, whether the seats
+        are swapped relative to the pairing, the game seed, num_colors, and board file.
+    """
+    rng = random.Random(seed)
+    schedule = []
+    for pairing in pairings:
+        for i in range(games):
+            swapped = alternate and i % 2 == 1
+            schedule.append(make_spec(len(schedule), pairing, swapped, rng.randrange(2**32), num_colors, board))
+    return schedule
+
+def make_spec(game, pairing, swapped, seed, num_colors=8, board=None):
+    """Describe one scheduled game; see make_schedule for the meaning of each field."""
+    return {
+        'game': game,
+        'players': list(reversed(pairing)) if swapped else list(pairing),
+        'swapped': swapped,
+        'seed': seed,
+        'num_colors': num_colors,
+        'board': board,
+    }
+
+def round_robin(names):
+    """Return every pairing of distinct players from a list of player names."""
+    return [list(pairing) for pairing in itertools.combinations(names, 2)]
+
+def make_record(spec, banners):
+    """Combine a scheduled game with its final banners into a game record."""
+    record = dict(spec)
+    record['banners'] = [list(banners[0]), list(banners[1])]
+    record['score'] = [sum(banners[0]), sum(banners[1])]
+    return record
+
+class Checkpoint:
+    """Append-only tournament checkpoint.
+
+    The file is a JSON lines log: each line holds a 'schedule' (the whole schedule, on the
+    first line), 'games' (games added to the schedule later, e.g. by adaptive
+    scheduling), and/or 'results' (finished game records). Saving only appends what is
+    new since the last save, so checkpointing a game costs the same however long the
+    tournament is; loading replays the log. A checkpoint written in one piece by older
+    versions (a single line with the schedule and all results) is read the same way.
+
+    Parameters
+    ----------
+    file : str
+        Checkpoint filename.
+    """
+    def __init__(self, file):
+        self.file = file
+        self.games = 0 # number of scheduled games in the log
+        self.results = set() # games whose results are in the log
+
+    def load(self):
+        """Replay the checkpoint.
+
+        Returns
+        -------
+        schedule : list of dicts (or None if the file does not exist)
+            The games of the tournament, as created by make_schedule.
+        results : dict
+            Completed game records, keyed by game index.
+        """
+        if not os.path.exists(self.file):
+            return None, {}
+        schedule, results = None, {}
+        with open(self.file, "r") as f:
+            lines = f.read().splitlines()
+        for i, line in enumerate(lines):
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                if i == len(lines) - 1: # the last save was cut short; that game is played again
+                    break
+                raise
+            if 'schedule' in entry:
+                schedule = entry['schedule']
+            schedule.extend(entry.get('games', []))
+            for record in entry.get('results', []):
+                results[record['game']] = record
+        if schedule is None: # nothing usable
+            return None, {}
+        # rewrite the log in one piece, dropping a torn last line and compacting the appends
+        write_json(self.file, {'schedule': schedule, 'results': [results[i] for i in sorted(results)]})
+        self.games, self.results = len(schedule), set(results)
+        return schedule, results
+
+    def save(self, schedule, results):
+        """Append the games and results that are not in the checkpoint yet."""
+        entry = {}
+        if self.games == 0:
+            entry['schedule'] = schedule
+        elif len(schedule) > self.games:
+            entry['games'] = schedule[self.games:]
+        new = sorted(set(results) - self.results)
+        if new:
+            entry['results'] = [results[i] for i in new]
+        if not entry:
+            return
+        if self.games == 0:
+            write_json(self.file, entry) # a new checkpoint replaces any old file
+        else:
+            with open(self.file, "a") as f:
+                f.write(json.dumps(entry) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+        self.games = len(schedule)
+        self.results.update(new)
+
+def write_json(file, data):
+    """Atomically write data to a JSON file.
+
+    The data is written to a temporary file in the same directory and then renamed over
+    the old file, so the file on disk is always either the old or the new version.
+    """
+    folder = os.path.dirname(os.path.abspath(file))
+    fd, tmp = tempfile.mkstemp(dir=folder, prefix=".checkpoint-", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w") as f:
+            json.dump(data, f)
+            f.write("\n") # so that lines can be appended (see Checkpoint and ResultCache)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, file)
+    except BaseException:
+        os.remove(tmp)
+        raise
+
+def file_hash(file):
+    """Return the SHA-256 hex digest of the contents of a file."""
+    with open(file, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+class ResultCache:
+    """Game results keyed by the source code of the players and the game setup.
+
+    A game is identified by the content hashes of both players' source files (in pairing
+    order), the seed, the seat order, num_colors, and the board file (if any). Changing
+    one player therefore only invalidates the games that player was in.
+
+    The file is a JSON lines log of {key: banners} objects: put appends one line, and
+    loading merges them all (a cache written in one piece is a single such line).
+
+    Parameters
+    ----------
+    file : str
+        JSON file where the cache is stored. It is created if it does not exist.
+    """
+    def __init__(self, file):
+        self.file = file
+        self.entries = {}
+        if os.path.exists(file):
+            with open(file, "r") as f:
+                text = f.read()
+            lines = text.splitlines()
+            for i, line in enumerate(lines):
+                try:
+                    self.entries.update(json.loads(line))
+                except ValueError:
+                    if i < len(lines) - 1: # only the last line can be torn by a crash
+                        raise
+            if text and not text.endswith("\n"): # a torn last line, or an older cache written in one piece
+                write_json(self.file, self.entries) # so that lines can be appended again
+
+    def player_hash(self, name):
+        """Return the content hash of a player's source file (see registry.py)."""
+        return registry.REGISTRY.info(name)['hash']
+
+    def key(self, spec):
+        """Return the cache key of a scheduled game."""
+        pairing = spec['players'][::-1] if spec['swapped'] else spec['players']
+        board = file_hash(spec['board']) if spec['board'] else ''
+        return ':'.join([self.player_hash(pairing[0]), self.player_hash(pairing[1]),
+                         str(spec['seed']), str(int(spec['swapped'])), str(spec['num_colors']), board])
+
+    def get(self, spec):
+        """Return the cached banners of a scheduled game, or None if it has not been played."""
+        return self.entries.get(self.key(spec))
+
+    def put(self, spec, banners):
+        """Store the final banners of a game and append it to the cache file."""
+        key = self.key(spec)
+        self.entries[key] = [list(banners[0]), list(banners[1])]
+        with open(self.file, "a") as f:
+            f.write(json.dumps({key: self.entries[key]}) + "\n")
+
+def pending_games(schedule, results):
+    """Return the scheduled games that do not have a result yet, in schedule order."""
+    return [spec for spec in schedule if spec['game'] not in results]
+
+def standings(results):
+    """Accumulate per-player statistics over all games, regardless of pairing or seat.
+
+    Parameters
+    ----------
+    results : dict
+        Completed game records, keyed by game index.
+
+    Returns
+    -------
+    table : dict
+        table[name] holds the games, wins, losses, ties, and points (banners) of each player.
+    """
+    table = {}
+    for i in sorted(results):
+        record = results[i]
+        for seat in range(2):
+            row = table.setdefault(record['players'][seat], dict(games=0, wins=0, losses=0, ties=0, points=0))
+            mine, theirs = record['score'][seat], record['score'][1 - seat]
+            row['games'] += 1
+            row['points'] += mine
+            if mine > theirs:
+                row['wins'] += 1
+            elif mine < theirs:
+                row['losses'] += 1
+            else:
+                row['ties'] += 1
+    return table
+
+def summarize(results):
+    """Accumulate win/loss/tie statistics for both sides of a pairing.
+
+    Side 0 is the first player of the pairing (player1 on the command line) and side 1
+    the second, regardless of which seat they occupied in a particular game.
+
+    Parameters
+    ----------
+    results : dict
+        Completed game records, keyed by game index.
+
+    Returns
+    -------
+    stats : list of dicts
+        stats[k] holds the wins, win_points, losses, loss_points, and ties of side k.
+    """
+    stats = [dict(wins=0, win_points=0, losses=0, loss_points=0, ties=0) for _ in range(2)]
+    for i in sorted(results):
+        record = results[i]
+        score = record['score'][::-1] if record['swapped'] else record['score']
+        for side in range(2):
+            mine, theirs = score[side], score[1 - side]
+            if mine > theirs:
+                stats[side]['wins'] += 1
+                stats[side]['win_points'] += mine
+            elif mine < theirs:
+                stats[side]['losses'] += 1
+                stats[side]['loss_points'] += mine
+            else:
+                stats[side]['ties'] += 1
+    return stats
@@ -3,47 +3,117 @@
 #
 # Author: Matthew Eicholtz
 
-from graphics import *
-import importlib
 import math
 import os
-import pdb
 import random
-import sys
+import registry
 import time
 
 ROOT = os.path.dirname(os.path.realpath(__file__))
 
-def ask_human(gui):
-    """Query human player to make a choice.
+# Functions that need a display live in gui_utils.py, which is only imported (along with
+# graphics and tkinter) the first time one of them is used, e.g. utils.make_gui(...).
+# This keeps simulations and AI players that import utils free of any Tk startup cost.
+GUI_FUNCTIONS = ['ask_ai', 'ask_human', 'get_winner', 'make_gui', 'make_move', 'status']
+
+def __getattr__(name):
+    """Load GUI functions from gui_utils on first use."""
+    if name in GUI_FUNCTIONS:
+        import gui_utils
+        return getattr(gui_utils, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+def apply_move(board, cols, which_card, turn, cards, banners):
+    """Compute the game state after a move without modifying the current state.
+
+    This is the same capture logic as gui_utils.make_move, without the graphics.
 
     Parameters
     ----------
-    gui : GraphWin object
-        The main graphical user interface object (relies on graphics library).
+    board : sequence of ints
+        A flattened version of the board (list or tuple).
+    cols : int
+        Number of columns on the board.
+    which_card : int
+        Linear index to move the 1-card to (must be a valid move).
+    turn : int {0, 1}
+        Whose turn is it?
+    cards : sequence of sequences of ints
+        How many cards does each player own? The syntax cards[i][j] = k
+        indicates that the ith player owns k cards of the jth color set.
+    banners : sequence of sequences of ints
+        Which banners does each player own? The syntax banners[i][j] = 1
+        indicates that the ith player owns the banner of the jth color set.
+
+    Returns
+    -------
+    board, cards, banners : tuples
+        The new state as read-only tuples (see freeze).
+    """
+    board = list(board)
+    x1 = board.index(1) # index of the 1-card on the board
+    color = board[which_card] # color of the main captured card
+    if abs(which_card - x1) < cols: # move is either left or right
+        possible = range(which_card + 1, x1) if which_card < x1 else range(x1 + 1, which_card)
+    else: # move is either up or down
+        possible = range(which_card + cols, x1, cols) if which_card < x1 else range(x1 + cols, which_card, cols)
+
+    captured = 1
+    for i in possible:
+        if board[i] == color:
+            board[i] = 0 # there is no card in this position anymore
+            captured += 1
+    board[which_card] = 1 # the 1-card moves here
+    board[x1] = 0
+
+    cards = [list(cards[0]), list(cards[1])]
+    banners = [list(banners[0]), list(banners[1])]
+    cards[turn][color - 2] += captured # index decreases by 2 due to 0-indexing and the first color set being 2 (not 1)
+    update_banners(turn, color, cards, banners)
+    return freeze(board, cards, banners)
+
+def call_player(player, board, rows, cols, turn, cards, banners, search=False, context=None):
+    """Ask an AI player for its choice without exposing the game's own state.
+
+    Players that declare SUPPORTS_READONLY = True promise not to modify their inputs, so
+    they receive read-only tuples (which costs nothing if the state is already frozen).
+    Every other player receives its own mutable copy of the state, as before.
+
+    Parameters
+    ----------
+    player : module or object with a choice function
+        The AI player.
+    board, rows, cols, turn, cards, banners
+        The game state; see the choice function of any AI player for details.
+    search : bool, optional (default=False)
+        Call the player's search function instead of choice. Players that declare
+        SUPPORTS_SCORE = True provide search, which returns (which_card, utility).
+    context : context manager, optional (default=None)
+        Entered around the player's own call only (not the copying of the state), e.g.
+        profiling.ChoiceProfiler.profile.
 
     Returns
     -------
     which_card : int
-        The linear index of the card to choose. If there are any errors, the output will be -1.
+        The linear index of the card chosen by the player (or (which_card, utility) if
+        search is True).
     """
-    which_card = -1 # default value
-    while gui.isOpen():
-        # Check for mouse input
-        pt = gui.checkMouse()
-        if pt:
-            x, y = int(pt.getX()), int(pt.getY())
-            row = max(0, min(gui.rows - 1, (y - gui.margin // 2) // (gui.card_size + gui.margin)))
-            col = max(0, min(gui.cols - 1, (x - gui.margin // 2) // (gui.card_size + gui.margin)))
-            # print(f'(x,y)=({x},{y}), (row,col)=({row},{col})')
-            which_card = sub2ind(row, col, gui.rows, gui.cols)
-            break
+    if getattr(player, 'SUPPORTS_READONLY', False):
+        board, cards, banners = freeze(board, cards, banners)
+    else:
+        board, cards, banners = thaw(board, cards, banners)
+    decide = player.search if search else player.choice
+    if context is None:
+        return decide(board, rows, cols, turn, cards, banners)
+    with context:
+        return decide(board, rows, cols, turn, cards, banners)
 
-        # Check for keyboard input
-        if gui.checkKey() in ["Escape", "Ctrl+e"]:
-            break
+def freeze(board, cards, banners):
+    """Return read-only (tuple) views of the board, cards, and banners.
 
-    return which_card
+    The board and any rows that are already tuples are reused, not copied.
+    """
+    return tuple(board), tuple(map(tuple, cards)), tuple(map(tuple, banners))
 
 def get_valid_moves(board, rows, cols):
     """Compute the possible remaining moves based on current board state.
@@ -107,42 +177,6 @@ def get_valid_moves(board, rows, cols):
     
     return moves
 
-def get_winner(gui, players, banners):
-    """Determine the winner based on total number of banners and display result.
-
-    Parameters
-    ----------
-    gui : GraphWin object
-        The main graphical user interface object (relies on graphics library).
-    players : list of str
-        List of player names.
-    banners : list of lists of ints
-        List identifying which player owns each banner. The syntax banners[i][j]
-        indicates the ith player has the jth banner.
-
-    Returns
-    -------
-    None
-    """
-    # Process player names (this is because "human def human" looks weirder than "Player 1 def Player 2")
-    player1 = "Player 1" if players[0] == "human" or players[0] == players[1] else players[0]
-    player2 = "Player 2" if players[1] == "human" or players[0] == players[1] else players[1]
-
-    # Compute the score for each player
-    score1 = sum(banners[0])
-    score2 = sum(banners[1])
-
-    # The player with the higher score wins
-    if score1 > score2:
-        status(gui, f"{player1} wins!")
-        print(f'{player1} def {player2} {score1}-{score2}')
-    elif score2 > score1:
-        status(gui, f"{player2} wins!")
-        print(f'{player2} def {player1} {score2}-{score1}')
-    else:
-        status(gui, "It's a tie!")
-        print(f'{player1} ties {player2} {score1}-{score2}')
-
 def ind2sub(index, rows, cols):
     """Convert a linear index to 2D row and column subscripts.
 
@@ -238,12 +272,13 @@ def load_player(name):
     player : importlib module (or 0 for error)
         Module of AI player that must contain a function called "choice".
         If the player was not loaded correctly, the output will be 0.
+        Players are imported once (see registry.py); later calls return the same module.
     """
     if name is not None:
-        print(f"Loading AI player: {name}")
+        if not registry.REGISTRY.is_loaded(name):
+            print(f"Loading AI player: {name}")
         try:
-            sys.path.append(os.path.join(ROOT, 'players')) # add directory containing AI player to system path
-            player = importlib.import_module(name)
+            player = registry.REGISTRY.load(name)
         except ImportError:
             print(f"\tERROR: Cannot import AI player")
             return 0
@@ -257,139 +292,6 @@ def load_player(name):
         print(f"\tERROR: No AI player name was provided. Check inputs.")
         return 0
 
-def make_gui(board, rows, cols, card_size=60, margin=10):
-    """Create the graphical user interface for the game.
-
-    Parameters
-    ----------
-    board : list of ints
-        A flattened version of the board.
-    rows : int
-        Number of rows on the board.
-    cols : int
-        Number of columns on the board.
-    card_size : int, optional (default=60)
-        Height and width of cards, in pixels.
-    margin : int, optional (default=10)
-        Space in between cards, in pixels.
-
-    Returns
-    -------
-    gui : GraphWin object
-        The main graphical user interface object (relies on graphics library).
-    """
-
-    # Read colors from file
-    colors = load_colors()
-
-    # Make game window
-    wid = cols * card_size + margin * (cols + 1)
-    hei = rows * card_size + margin * (rows + 1) + 30 # the extra 30 is for instructions at the bottom
-    gui = GraphWin("A Game of Thrones: Hand of the King", wid, hei)
-    
-    # Make card objects
-    for row in range(rows):
-        for col in range(cols):
-            # Compute position and color of card
-            x1 = margin * (col + 1) + card_size * col
-            y1 = margin * (row + 1) + card_size * row
-            x2 = x1 + card_size
-            y2 = y1 + card_size
-            whichcolor = board[cols * row + col] # index of the color for the card in the current (row, col)
-            # print(f'row={row}, col={col}, index={cols * row + col}, color={whichcolor}')
-            
-            # Create rectangle
-            card = Rectangle(Point(x1, y1), Point(x2, y2))
-            card.setFill(colors[whichcolor - 1][0])
-            card.setOutline(colors[whichcolor - 1][1])
-            card.setWidth(4)
-            card.draw(gui)
-
-            # Add text identifier
-            txt = Text(Point(x1 + 8, y1 + 6), whichcolor)
-            txt.setSize(18)
-            txt.setTextColor(colors[whichcolor - 1][1])
-            txt.draw(gui)
-
-    # Add text message at bottom
-    txt = Text(Point(wid // 2, hei - 20), "")
-    txt._reconfig("anchor", "c")
-    txt.setSize(12)
-    txt.draw(gui)
-
-    # Attach relevant properties to the gui
-    gui.rows = rows
-    gui.cols = cols
-    gui.card_size = card_size
-    gui.margin = margin
-
-    return gui
-
-def make_move(gui, board, x0, x, collection):
-    """Move the 1-card in the GUI to the position on the board specified by the input index,
-    capturing cards of the same color along the way. Update the player's card collection accordingly.
-    
-    Parameters
-    ----------
-    gui : GraphWin object
-        The main graphical user interface object (relies on graphics library).
-    board : list of ints
-        A flattened version of the board.
-    x0 : int
-        The initial (at the start of the game) linear index of the 1-card.
-        This is important because it defines where the card is in the list
-        of objects embedded in the GUI.
-    x : int
-        Linear index to move the 1-card to.
-    collection : list of ints
-        The array of card counts for each color set owned by the current player.
-
-    Returns
-    -------
-    None
-    """
-    # Get relevant data
-    items = gui.items[:-1]
-    cards = items[::2]
-    txt = items[1::2]
-
-    x1 = board.index(1) # index of the 1-card on the board
-    # print(f'moving from {x1} to {x}')
-
-    # Remove captured cards from board
-    d = gui.width + 100 # distance to move cards (the 100 ensures they move off the board)
-    color = board[x] # color of the main captured card
-    cards[x].move(d, 0)
-    txt[x].move(d, 0)
-    board[x] = 1 # the 1-card moves here
-    collection[color - 2] += 1 # index decreases by 2 due to 0-indexing and the first color set being 2 (not 1)
-    if abs(x - x1) < gui.cols: # move is either left or right
-        dx = (x - x1) * (gui.card_size + gui.margin)
-        dy = 0
-        if x < x1: # left
-            possible = range(x + 1, x1)
-        else: # right
-            possible = range(x1 + 1, x)
-    else: # move is either up or down
-        dx = 0
-        dy = ((x - x1) // gui.cols) * (gui.card_size + gui.margin)
-        if x < x1: # up
-            possible = range(x + gui.cols, x1, gui.cols)
-        else: # down
-            possible = range(x1 + gui.cols, x, gui.cols)
-
-    for i in possible:
-        if board[i] == color:
-            cards[i].move(d, 0)
-            txt[i].move(d, 0)
-            board[i] = 0  # there is no card in this position anymore
-            collection[color - 2] += 1
-
-    # Move the 1-card to the correct position
-    cards[x0].move(dx, dy)
-    txt[x0].move(dx, dy)
-    board[x1] = 0
-
 def print_board(board, rows, cols):
     """Display the board in the terminal in 2D.
     
@@ -475,6 +377,9 @@ def run_tests():
         print(*board)
         print(f'rows={rows}, columns={cols}')
 
+    import gui_utils
+    make_gui = gui_utils.make_gui
+
     print()
     print("Testing make_gui() function:")
     board, rows, cols = load_cards(os.path.join(ROOT, "data", "board0.txt"))
@@ -497,23 +402,12 @@ def run_tests():
         #         break
         gui.close()
 
-def status(gui, msg):
-    """Update the text status in the GUI.
-
-    Parameters
-    ----------
-    gui : GraphWin object
-        The main graphical user interface object (relies on graphics library).
-    msg : str
-        The string message to display in the gui.
+def thaw(board, cards=[], banners=[]):
+    """Return private, mutable (list) copies of the board, cards, and banners.
 
-    Returns
-    -------
-    None
+    AI players that receive read-only views can use this to get state they may modify.
     """
-    if gui.isOpen():
-        txt = gui.items[-1] # the text to update should be the last object created
-        txt.setText(msg)
+    return list(board), [list(c) for c in cards], [list(b) for b in banners]
 
 def triangular_factors(n):
     """Map an integer to a tuple of integers such that the product 
@@ -0,0 +1,294 @@
+# value_net.py
+# Small value network for "Hand of the King", in pure NumPy.
+#
+# The network maps the evaluation features of math_nerds_final (plus the number of
+# cards of each color still on the board) to the expected result of the game for the
+# player to move, between -1 (loss) and 1 (win). It is a multilayer perceptron with
+# ReLU hidden layers (or a linear model if there are none) and a tanh output, trained
+# offline on a self-play dataset (see selfplay.py). The search player math_nerds_net
+# uses it to score all sibling leaves of its search tree with one matrix multiply. Large
+# batches of leaves are stacked into dataset columns and encoded with the same vectorized
+# code as the training data; small ones (most sibling batches have 3 to 7 leaves) are
+# encoded one by one, which is faster than the fixed cost of the array operations.
+# Finished games are scored by their result (1, 0 or -1), which is the scale the network
+# predicts, so the search can compare the two.
+#
+# Usage:
+#   python value_net.py train data/selfplay --out math_nerds_net.npz --hidden 32
+#   python value_net.py bench data/selfplay --weights math_nerds_net.npz
+#   python hotk_simulation.py --player1 math_nerds_net --player2 math_nerds_final --games 100 --alternate -j 8
+
+import argparse
+import math_nerds_final
+import numpy as np
+import os
+import selfplay
+import texel
+import time
+import utils
+
+COLORS = range(2, 9) # colors whose remaining cards on the board are counted
+INPUTS = [*math_nerds_final.FEATURES, *[f'board_{color}' for color in COLORS]]
+VECTORIZE = 10 # batches of at least this many game states are encoded with array operations
+
+def encode(data):
+    """Compute the network inputs for a whole dataset (see selfplay.COLUMNS) at once."""
+    counts = (data['board'][:, :, None] == np.array(COLORS, dtype=np.uint8)).sum(1)
+    return np.column_stack([texel.batch_features(data), counts]).astype(np.float32)
+
+def encode_game(game):
+    """Compute the network inputs of one game state [board, rows, cols, turn, cards, banners]."""
+    return math_nerds_final.features(game) + [game[0].count(color) for color in COLORS]
+
+def result(game):
+    """Return the result of a finished game for the player in game[3] (1, 0 or -1), or None if it is not finished."""
+    if utils.get_valid_moves(game[0], game[1], game[2]):
+        return None
+    difference = sum(game[5][game[3]]) - sum(game[5][abs(game[3] - 1)])
+    return (difference > 0) - (difference < 0)
+
+def stack_games(games):
+    """Stack game states of the same board size into dataset columns (see selfplay.COLUMNS).
+
+    The board is not padded to selfplay.SQUARES (encode does not need it), but the card
+    and banner counts are padded to selfplay.SETS.
+    """
+    n = len(games)
+    sets = len(games[0][4][0])
+    cards = np.zeros((n, 2, selfplay.SETS), np.uint8)
+    banners = np.zeros((n, 2, selfplay.SETS), np.uint8)
+    cards[:, :, :sets] = [game[4] for game in games]
+    banners[:, :, :sets] = [game[5] for game in games]
+    return {'board': np.array([game[0] for game in games], np.uint8), 'rows': np.full(n, games[0][1], np.uint8),
+            'cols': np.full(n, games[0][2], np.uint8), 'cards': cards, 'banners': banners,
+            'turn': np.array([game[3] for game in games], np.uint8)}
+
+def encode_games(games):
+    """Compute the network inputs of game states of the same board size at once (see encode_game)."""
+    return encode(stack_games(games))
+
+def results(data):
+    """Find the finished games in dataset columns of one board size.
+
+    Returns
+    -------
+    finished : array of bools
+        Does the 1-card have no card left in its row and column (so no valid moves)?
+    outcome : array of floats
+        Result for the player to move: 1 (more banners), 0 (as many) or -1 (fewer).
+    """
+    board, cols = data['board'], int(data['cols'][0])
+    square = np.arange(board.shape[1])
+    position = np.argmax(board == 1, axis=1)[:, None]
+    line = (square // cols == position // cols) | (square % cols == position % cols)
+    finished = ~np.any((board > 1) & line, axis=1)
+    index = np.arange(len(board))
+    turn = data['turn'].astype(np.intp)
+    difference = data['banners'][index, turn].sum(1, dtype=np.int16) - data['banners'][index, 1 - turn].sum(1, dtype=np.int16)
+    return finished, np.sign(difference).astype(np.float32)
+
+class ValueNet:
+    """Multilayer perceptron value function.
+
+    Parameters
+    ----------
+    layers : list of (array, array)
+        Weight matrix and bias vector of each layer, the last of which has one output.
+    mean, std : arrays
+        Input normalization (inputs are scaled to (x - mean) / std).
+    """
+    def __init__(self, layers, mean, std):
+        self.layers = layers
+        self.mean = mean
+        self.std = std
+
+    @classmethod
+    def load(cls, file):
+        """Load a network saved with save."""
+        with np.load(file) as data:
+            if list(data['inputs']) != INPUTS:
+                raise ValueError(f"{file} was trained on different inputs")
+            layers = [(data[f'W{i}'], data[f'b{i}']) for i in range(int(data['depth']))]
+            return cls(layers, data['mean'], data['std'])
+
+    def save(self, file):
+        """Save the network as a .npz file."""
+        arrays = {'depth': len(self.layers), 'mean': self.mean, 'std': self.std, 'inputs': np.array(INPUTS)}
+        for i, (W, b) in enumerate(self.layers):
+            arrays[f'W{i}'] = W
+            arrays[f'b{i}'] = b
+        np.savez(file, **arrays)
+
+    def predict(self, X):
+        """Return the value (between -1 and 1) of each row of inputs."""
+        X = (X - self.mean) / self.std
+        for W, b in self.layers[:-1]:
+            X = np.maximum(X @ W + b, 0)
+        W, b = self.layers[-1]
+        return np.tanh(X @ W + b)[:, 0]
+
+    def evaluate_games(self, games):
+        """Score a list of game states of the same board size at once, for the player in game[3].
+
+        This is a search evaluator (see math_nerds_final.search): finished games get their
+        result (1, 0 or -1), and the others the network's prediction, between -1 and 1.
+        """
+        if len(games) < VECTORIZE:
+            values = self.predict(np.array([encode_game(game) for game in games], dtype=np.float32)).tolist()
+            return [value if outcome is None else float(outcome) for value, outcome in zip(values, map(result, games))]
+        data = stack_games(games)
+        finished, outcome = results(data)
+        return np.where(finished, outcome, self.predict(encode(data))).tolist()
+
+def train(X, y, hidden=[32], epochs=20, batch_size=1024, rate=0.001, seed=0):
+    """Fit a network to the outcomes of a dataset with minibatch Adam on the squared error.
+
+    Parameters
+    ----------
+    X : array of shape (positions, len(INPUTS))
+        Network inputs (see encode).
+    y : array of shape (positions,)
+        Outcomes for the player to move (-1, 0, or 1).
+    hidden : list of ints, optional (default=[32])
+        Sizes of the hidden layers (none for a linear model).
+    epochs : int, optional (default=20)
+        Passes over the dataset.
+    batch_size : int, optional (default=1024)
+        Positions per optimizer step.
+    rate : float, optional (default=0.001)
+        Adam step size.
+    seed : int, optional (default=0)
+        Seed for the initial weights and the order of the positions.
+
+    Returns
+    -------
+    net : ValueNet
+        The trained network.
+    """
+    rng = np.random.default_rng(seed)
+    sizes = [X.shape[1], *hidden, 1]
+    layers = [(rng.normal(0, np.sqrt(2 / n), (n, m)).astype(np.float32), np.zeros(m, np.float32))
+              for n, m in zip(sizes[:-1], sizes[1:])]
+    net = ValueNet(layers, X.mean(0), X.std(0) + 1e-6)
+    X = (X - net.mean) / net.std
+    y = y.astype(np.float32)[:, None]
+
+    params = [array for layer in layers for array in layer]
+    m = [np.zeros_like(p) for p in params]
+    v = [np.zeros_like(p) for p in params]
+    beta1, beta2, epsilon = 0.9, 0.999, 1e-8
+    step = 0
+    for epoch in range(epochs):
+        order = rng.permutation(len(X))
+        for start in range(0, len(X), batch_size):
+            batch = order[start:start + batch_size]
+            # forward pass, remembering the input of every layer
+            activations = [X[batch]]
+            for W, b in layers[:-1]:
+                activations.append(np.maximum(activations[-1] @ W + b, 0))
+            W, b = layers[-1]
+            out = np.tanh(activations[-1] @ W + b)
+
+            # backward pass
+            delta = 2 * (out - y[batch]) * (1 - out ** 2) / len(batch)
+            grads = []
+            for i in range(len(layers) - 1, -1, -1):
+                grads[:0] = [activations[i].T @ delta, delta.sum(0)]
+                if i:
+                    delta = (delta @ layers[i][0].T) * (activations[i] > 0)
+
+            step += 1
+            for p, g, m_, v_ in zip(params, grads, m, v):
+                m_ *= beta1
+                m_ += (1 - beta1) * g
+                v_ *= beta2
+                v_ += (1 - beta2) * g ** 2
+                p -= rate * (m_ / (1 - beta1 ** step)) / (np.sqrt(v_ / (1 - beta2 ** step)) + epsilon)
+    return net
+
+def benchmark(net, games, batch_sizes=(1, 4, 16, 64, 256)):
+    """Measure positions per second of the network (in batches of each size) and of evaluate.
+
+    Parameters
+    ----------
+    net : ValueNet
+        Network to benchmark.
+    games : list
+        Game states [board, rows, cols, turn, cards, banners] to score.
+    batch_sizes : tuple of ints, optional
+        Batch sizes to time.
+
+    Returns
+    -------
+    rates : dict
+        Positions per second for 'evaluate' and for each batch size.
+    """
+    start = time.perf_counter()
+    for game in games:
+        math_nerds_final.evaluate(game)
+    rates = {'evaluate': len(games) / (time.perf_counter() - start)}
+    for size in batch_sizes:
+        start = time.perf_counter()
+        for i in range(0, len(games), size):
+            net.evaluate_games(games[i:i + size])
+        rates[size] = len(games) / (time.perf_counter() - start)
+    return rates
+
+def dataset_games(data, count):
+    """Convert up to count 8-color positions of a dataset into game states for the search."""
+    games = []
+    for i in np.flatnonzero(data['rows'].astype(np.int32) * data['cols'] == selfplay.SQUARES)[:count]:
+        games.append([data['board'][i].tolist(), int(data['rows'][i]), int(data['cols'][i]), int(data['turn'][i]),
+                      data['cards'][i].tolist(), data['banners'][i].tolist()])
+    return games
+
+parser = argparse.ArgumentParser(description="Train or benchmark the NumPy value network")
+subparsers = parser.add_subparsers(dest='command', required=True)
+command = subparsers.add_parser('train', help="train a network on a self-play dataset")
+command.add_argument('dataset', type=str, help="Dataset folder written by selfplay.py")
+command.add_argument('--out', type=str, help="Weight file to write (default=math_nerds_net.npz, which math_nerds_net loads)",
+                     default=os.path.join(os.path.dirname(os.path.realpath(__file__)), 'math_nerds_net.npz'))
+command.add_argument('--hidden', type=int, nargs='*', help="Hidden layer sizes (none for a linear model; default=32)", default=[32])
+command.add_argument('--epochs', type=int, help="Passes over the dataset (default=20)", default=20)
+command.add_argument('--batch', type=int, help="Positions per optimizer step (default=1024)", default=1024)
+command.add_argument('--rate', type=float, help="Optimizer step size (default=0.001)", default=0.001)
+command.add_argument('--validation', type=float, help="Fraction of games held out to measure the error (default=0.1)", default=0.1)
+command = subparsers.add_parser('bench', help="compare batched and single inference speed with evaluate")
+command.add_argument('dataset', type=str, help="Dataset folder to take positions from")
+command.add_argument('--weights', type=str, help="Network to benchmark (default=math_nerds_net.npz)",
+                     default=os.path.join(os.path.dirname(os.path.realpath(__file__)), 'math_nerds_net.npz'))
+command.add_argument('--positions', type=int, help="Number of positions (default=20000)", default=20000)
+
+def main(args):
+    if args.command == 'bench':
+        net = ValueNet.load(args.weights)
+        games = dataset_games(selfplay.load_dataset(args.dataset), args.positions)
+        if not games:
+            parser.error(f"{args.dataset} has no 8-color positions")
+        rates = benchmark(net, games)
+        print(f"{len(games)} positions")
+        print(f"\t{'evaluate':<16} {round(rates.pop('evaluate')):>10} positions/s")
+        for size, rate in rates.items():
+            print(f"\t{'batch of ' + str(size):<16} {round(rate):>10} positions/s")
+        return
+
+    data = selfplay.load_dataset(args.dataset)
+    if len(data['turn']) == 0:
+        parser.error(f"{args.dataset} has no positions")
+    X = encode(data)
+    y = data['outcome'].astype(np.float32)
+    games = np.random.default_rng(0).random(int(data['game'].max()) + 1) < args.validation
+    held_out = games[data['game']] # split by game, so positions of a game stay together
+    start = time.perf_counter()
+    net = train(X[~held_out], y[~held_out], args.hidden, args.epochs, args.batch, args.rate)
+    print(f"Trained on {np.count_nonzero(~held_out)} positions in {round(time.perf_counter() - start, 2)} s")
+    for name, mask in [('training', ~held_out), ('held-out', held_out)]:
+        if mask.any():
+            prediction = net.predict(X[mask])
+            accuracy = np.mean(np.sign(prediction[y[mask] != 0]) == y[mask][y[mask] != 0])
+            print(f"\t{name} error {np.mean((prediction - y[mask]) ** 2):.4f}, decisive results predicted {100 * accuracy:.1f}%")
+    net.save(args.out)
+    print(f"Wrote {args.out}")
+
+if __name__ == "__main__":
+    main(parser.parse_args())
@@ -0,0 +1,123 @@
+# workers.py
+# Long-lived worker processes that host AI players for "Hand of the King".
+#
+# Each worker imports its player module exactly once and then answers move requests
+# sent over a pipe, so module-level caches (transposition tables, opening books, etc.)
+# stay warm across moves and games. Because every player lives in its own process,
+# a player that hangs or crashes can be killed and restarted without taking down the
+# game loop that is using it. Game states are sent in their packed form (see codec.py).
+
+import codec
+import multiprocessing
+import struct
+import time
+import traceback
+import utils
+
+_REPLY = struct.Struct('<id') # the chosen move (or -1 if the player failed to answer), and the CPU seconds it took
+
+def _serve(name, conn):
+    """Main loop of a worker process: load the player once, then answer requests until told to stop."""
+    player = utils.load_player(name)
+    conn.send_bytes(b'\x01' if player else b'\x00')
+    if not player:
+        return
+
+    while True:
+        try:
+            msg = conn.recv_bytes()
+        except (EOFError, KeyboardInterrupt):
+            break
+        if not msg: # an empty message is the shutdown signal
+            break
+
+        start = time.thread_time()
+        try:
+            which_card = player.choice(*codec.unpack(msg))
+        except Exception:
+            traceback.print_exc()
+            which_card = -1
+        conn.send_bytes(_REPLY.pack(which_card, time.thread_time() - start))
+
+class PlayerWorker:
+    """An AI player running in its own long-lived process.
+
+    A PlayerWorker can be used anywhere a player module is expected because it exposes
+    the same choice(board, rows, cols, turn, cards, banners) function. If the player does
+    not answer within the timeout (or dies), the process is killed and restarted, and the
+    move is reported as -1 so that the game loop treats it as invalid.
+
+    Parameters
+    ----------
+    name : str
+        Filename in 'players' directory for the AI player to load.
+    timeout : float, optional (default=None)
+        Maximum time (in seconds) to wait for each move. None means wait forever.
+    """
+    SUPPORTS_READONLY = True # the state is only read, to encode it for the worker
+
+    def __init__(self, name, timeout=None):
+        self.name = name
+        self.timeout = timeout
+        self.process = None
+        self.conn = None
+        self.cpu_seconds = None # CPU time the player spent on the last move (None if it failed)
+        self.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def start(self):
+        """Start the worker process and wait until the player has been imported."""
+        self.conn, child_conn = multiprocessing.Pipe()
+        self.process = multiprocessing.Process(target=_serve, args=(self.name, child_conn), daemon=True)
+        self.process.start()
+        child_conn.close()
+        try:
+            ready = self.conn.recv_bytes()
+        except EOFError:
+            ready = b'\x00'
+        if ready != b'\x01':
+            self.kill()
+            raise RuntimeError(f"Cannot load AI player {self.name} in worker process")
+
+    def choice(self, board, rows, cols, turn, cards=[], banners=[]):
+        """Ask the worker for a move; see the choice function of any AI player for details."""
+        try:
+            self.conn.send_bytes(codec.pack_bytes(board, rows, cols, turn, cards, banners))
+            if self.conn.poll(self.timeout):
+                which_card, self.cpu_seconds = _REPLY.unpack(self.conn.recv_bytes())
+                return which_card
+        except (EOFError, OSError):
+            pass
+
+        # The player took too long or died, so replace it with a fresh process
+        self.cpu_seconds = None
+        print(f"\tWARNING: AI player {self.name} did not answer in time; restarting worker")
+        self.kill()
+        self.start()
+        return -1
+
+    def close(self):
+        """Ask the worker to exit, killing it if it does not comply."""
+        if self.process is None:
+            return
+        try:
+            self.conn.send_bytes(b'')
+        except OSError:
+            pass
+        self.process.join(1)
+        self.kill()
+
+    def kill(self):
+        """Terminate the worker process immediately."""
+        if self.process is None:
+            return
+        if self.process.is_alive():
+            self.process.kill()
+        self.process.join()
+        self.conn.close()
+        self.process = None